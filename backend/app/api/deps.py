@@ -1,19 +1,160 @@
-from typing import Annotated
+from typing import Annotated, AsyncIterator
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException, Request, WebSocket, WebSocketException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import HTTPConnection
 
 from core import exceptions
+from core.admission import client_limiter
+from core.config import settings
+from core.deadline import set_statement_timeout
+from core.hub import AUTH_SUBPROTOCOL, CLOSE_POLICY_VIOLATION
+from core.metrics import metrics
+from core.permissions import Permission
+from core.session_manager import db_manager
 from schemas.auth import TokenUserData
-from services.helpers.security import oauth2_scheme, get_token_user
+from services.helpers.permissions import permission_cache
+from services.helpers.security import (
+    get_token_user,
+    oauth2_scheme,
+    oauth2_scheme_optional,
+)
+
+
+def sticky_key(request: Request) -> str | None:
+    """Ключ клиента для read-your-writes: id пользователя из токена.
+
+    Ключ не зависит от токена: после обновления токенов клиент
+    по-прежнему видит свои изменения.
+    """
+    if not db_manager.replicas:
+        return None
+    # токен уже мог быть разобран в `limit_client_concurrency`
+    user = getattr(request.state, "token_user", None)
+    if user is None:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            user = get_token_user(token)
+        except HTTPException:
+            return None
+        request.state.token_user = user
+    return f"user:{user.id}"
+
+
+def last_write(request: Request) -> str | None:
+    """Время последней записи клиента из cookie или заголовка."""
+    return request.cookies.get(
+        settings.DB_READ_YOUR_WRITES_COOKIE
+    ) or request.headers.get(settings.DB_READ_YOUR_WRITES_HEADER)
+
+
+async def get_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """Возвращает сеанс базы данных для использования с fastapi Depends"""
+    # noinspection PyArgumentList
+    async with db_manager.session() as session:
+        session.info["sticky_key"] = sticky_key(request)
+        yield session
+
+
+async def get_read_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """Возвращает сеанс базы данных только для чтения (реплика, если есть)"""
+    async with db_manager.read_session(
+        sticky_key(request), last_write(request)
+    ) as session:
+        yield session
 
 
 def get_current_user(
+    connection: HTTPConnection,
     token: Annotated[str, Depends(oauth2_scheme)],
 ):
-    user = get_token_user(token)
+    # токен уже мог быть разобран в `limit_client_concurrency`
+    user = getattr(connection.state, "token_user", None)
+    if user is None:
+        user = get_token_user(token)
     return user
 
 
+def get_websocket_user(
+    websocket: WebSocket,
+    header_token: Annotated[str | None, Depends(oauth2_scheme_optional)],
+) -> TokenUserData:
+    """Пользователь WebSocket-соединения по access токену.
+
+    Токен передается в заголовке `Authorization` или, для браузерного
+    `WebSocket`, подпротоколами `["bearer", <token>]` (`Sec-WebSocket-Protocol`).
+    В строке запроса токен не принимается: она попадает в логи доступа.
+    Ошибка закрывает соединение до `accept` с кодом 1008.
+    """
+    token = header_token
+    subprotocols = websocket.scope.get("subprotocols", ())
+    if not token and len(subprotocols) == 2 and subprotocols[0] == AUTH_SUBPROTOCOL:
+        token = subprotocols[1]
+    if not token:
+        raise WebSocketException(CLOSE_POLICY_VIOLATION, "Not authenticated")
+    try:
+        user = get_token_user(token, "access")
+    except HTTPException as e:
+        raise WebSocketException(CLOSE_POLICY_VIOLATION, e.detail)
+    if user.is_deleted:
+        raise WebSocketException(
+            CLOSE_POLICY_VIOLATION, exceptions.USER_EXCEPTION_INACTIVE_USER.detail
+        )
+    return user
+
+
+def statement_timeout(seconds: float):
+    """Зависимость: таймаут запросов к БД эндпоинта вместо `DB_STATEMENT_TIMEOUT`.
+
+    Args:
+        seconds: Таймаут в секундах, 0 - без ограничения.
+    """
+
+    async def dependency() -> None:
+        set_statement_timeout(seconds)
+
+    return dependency
+
+
+def client_key(connection: HTTPConnection) -> str:
+    """Ключ клиента: id пользователя из токена или адрес."""
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            user = get_token_user(token)
+        except HTTPException:
+            pass
+        else:
+            connection.state.token_user = user
+            return f"user:{user.id}"
+    return f"addr:{connection.client.host if connection.client else ''}"
+
+
+def client_ip(connection: HTTPConnection) -> str | None:
+    """Адрес клиента (для журнала аудита)."""
+    return connection.client.host if connection.client else None
+
+
+async def limit_client_concurrency(
+    connection: HTTPConnection,
+) -> AsyncIterator[None]:
+    """Ограничивает число одновременных запросов клиента.
+
+    Лимит - `CLIENT_MAX_CONCURRENCY` для пользователя из токена и
+    `CLIENT_MAX_CONCURRENCY_ANONYMOUS` для запросов без токена (ключ - адрес).
+    """
+    key = client_key(connection)
+    if not client_limiter.acquire(key, anonymous=key.startswith("addr:")):
+        metrics.inc("admission_shed_total", reason="client")
+        raise exceptions.EXCEPTION_TOO_MANY_REQUESTS
+    try:
+        yield
+    finally:
+        client_limiter.release(key)
+
+
 def get_current_active_user(
     current_user: Annotated[TokenUserData, Depends(get_current_user)],
 ):
@@ -22,8 +163,24 @@ def get_current_active_user(
     return current_user
 
 
-def check_admin_role(
-    user: Annotated[TokenUserData, Depends(get_current_active_user)],
-):
-    if not user.is_superuser:
-        raise exceptions.USER_EXCEPTION_PERMISSION_REQUIRED
+def require_permissions(*permissions: Permission):
+    """Зависимость: у текущего пользователя есть все `permissions`.
+
+    Права берутся из `permission_cache` (по текущим ролям в БД, а не из токена),
+    проверка - одна побитовая операция.
+
+    Args:
+        permissions: Требуемые права.
+    """
+    required = 0
+    for permission in permissions:
+        required |= int(permission)
+
+    async def dependency(
+        user: Annotated[TokenUserData, Depends(get_current_active_user)],
+    ) -> TokenUserData:
+        if await permission_cache.permissions(user.id) & required != required:
+            raise exceptions.USER_EXCEPTION_PERMISSION_REQUIRED
+        return user
+
+    return dependency
@@ -1,12 +1,27 @@
 """FastAPI route definitions."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
+from api.deps import limit_client_concurrency
 from core.config import settings
-from .v1 import health, auth, user
+from .v1 import health, auth, user, role, audit, debug, ws
 
 api_v1_router = APIRouter(prefix=settings.API_V1_STR)
 
-api_v1_router.include_router(user.router)
-api_v1_router.include_router(auth.router)
+api_v1_router.include_router(
+    user.router, dependencies=[Depends(limit_client_concurrency)]
+)
+api_v1_router.include_router(
+    auth.router, dependencies=[Depends(limit_client_concurrency)]
+)
+api_v1_router.include_router(
+    role.router, dependencies=[Depends(limit_client_concurrency)]
+)
+api_v1_router.include_router(
+    audit.router, dependencies=[Depends(limit_client_concurrency)]
+)
+api_v1_router.include_router(ws.router)
 api_v1_router.include_router(health.router)
+
+if settings.SQL_PROFILER_DEBUG:
+    api_v1_router.include_router(debug.router)
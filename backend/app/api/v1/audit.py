@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.deps import require_permissions, get_read_session
+from core.config import settings
+from core.permissions import Permission
+from repositories.audit import AuditRepository
+from schemas.audit import AuditPageResponse
+
+router = APIRouter(
+    prefix="/audit",
+    tags=["audit"],
+    dependencies=[Depends(require_permissions(Permission.AUDIT_READ))],
+)
+
+
+@router.get("/", response_model=AuditPageResponse, summary="Audit log")
+async def get_audit_events(
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+    before: Annotated[int | None, Query(ge=1)] = None,
+    limit: Annotated[int, Query(ge=1, le=settings.AUDIT_PAGE_MAX_SIZE)] = 100,
+    action: str | None = None,
+    actor_id: int | None = None,
+    target_id: int | None = None,
+    since: datetime | None = None,
+):
+    """Журнал аудита, новые события первыми.
+
+    Страницы по `id` (keyset): следующая страница - `before=next_before`.
+
+    Args:
+        session: Сессия БД,
+        before: `next_before` предыдущей страницы,
+        limit: Размер страницы,
+        action: Действие (`login`, `login_failed`, `logout`, `user_update`, `user_delete`),
+        actor_id: Кто выполнил действие,
+        target_id: Над кем,
+        since: Только события не раньше этого времени.
+    """
+    filters = {
+        key: value
+        for key, value in (
+            ("action", action),
+            ("actor_id", actor_id),
+            ("target_id", target_id),
+        )
+        if value is not None
+    }
+    events = await AuditRepository(session).find_before(before, limit, since, **filters)
+    return AuditPageResponse(
+        events=events,
+        next_before=events[-1].id if len(events) == limit else None,
+    )
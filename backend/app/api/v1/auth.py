@@ -4,8 +4,8 @@ from fastapi import Depends, status
 from fastapi.routing import APIRouter
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.session_manager import get_session
-from schemas.auth import TokenResponse
+from api.deps import client_ip, get_session
+from schemas.auth import TokenResponse, ForgotPasswordSchema, ResetPasswordSchema
 from schemas.user import UserCreateSchema, UserResponse
 from services.auth import AuthService
 from services.helpers.security import OAuth2PasswordAndRefreshRequestForm, oauth2_scheme
@@ -43,14 +43,16 @@ async def register_user(
 async def login_for_tokens(
     session: Annotated[AsyncSession, Depends(get_session)],
     form_data: Annotated[OAuth2PasswordAndRefreshRequestForm, Depends()],
+    ip: Annotated[str | None, Depends(client_ip)],
 ):
     """Аутентификация, создание токенов и обновление.
 
     Args:
         session: Сессия БД,
-        form_data: Данные аутентификации.
+        form_data: Данные аутентификации,
+        ip: Адрес клиента для журнала аудита.
     """
-    return await AuthService(session).login(form_data)
+    return await AuthService(session).login(form_data, ip)
 
 
 @router.post(
@@ -60,11 +62,51 @@ async def login_for_tokens(
 async def logout(
     session: Annotated[AsyncSession, Depends(get_session)],
     token: Annotated[str, Depends(oauth2_scheme)],
+    ip: Annotated[str | None, Depends(client_ip)],
 ):
     """Выход пользователя из учетной запись и удаление токена.
 
     Args:
         session: Сессия БД,
-        token: Данные токена.
+        token: Данные токена,
+        ip: Адрес клиента для журнала аудита.
     """
-    return await AuthService(session).logout(token)
+    return await AuthService(session).logout(token, ip)
+
+
+@router.post(
+    "/forgot-password",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Request a password reset link",
+)
+async def forgot_password(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    form: Annotated[ForgotPasswordSchema, Depends()],
+):
+    """Отправка ссылки для сброса пароля на email (в фоне).
+
+    Args:
+        session: Сессия БД,
+        form: Email пользователя.
+    """
+    return await AuthService(session).forgot_password(form)
+
+
+@router.post(
+    "/reset-password",
+    summary="Set a new password by reset link token",
+)
+async def reset_password(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    form: ResetPasswordSchema,
+):
+    """Установка нового пароля по токену из ссылки.
+
+    Токен и пароли передаются в JSON-теле, а не в строке запроса,
+    чтобы не попадать в логи доступа и историю браузера.
+
+    Args:
+        session: Сессия БД,
+        form: Токен и новый пароль с подтверждением.
+    """
+    return await AuthService(session).reset_password(form)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+
+from core.sql_profiler import sql_profiler
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/sql", summary="SQL profiles of recent requests")
+async def sql_profiles(limit: int = 20):
+    """Профили SQL-запросов последних HTTP-запросов.
+
+    Доступно только при `SQL_PROFILER_DEBUG=true`.
+
+    Args:
+        limit: Количество последних профилей.
+    """
+    profiles = list(sql_profiler.recent)[-limit:]
+    return [
+        profile.to_dict(sql_profiler.n_plus_one_threshold)
+        for profile in reversed(profiles)
+    ]
@@ -1,9 +1,59 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Request, status
+from fastapi.responses import ORJSONResponse
+
+from core.health import readiness_probe
+from core.metrics import metrics
+from core.monitoring import loop_lag_monitor
 
 router = APIRouter(tags=["health"])
 
 
 @router.get("/ping", status_code=status.HTTP_200_OK)
-async def status():
+async def ping():
     """Проверка работоспособности"""
     return {"detail": "pong"}
+
+
+@router.get("/health/startup", status_code=status.HTTP_200_OK)
+async def startup(request: Request):
+    """Проверка завершения запуска (startup probe).
+
+    Возвращает 503, пока `lifespan` не завершил инициализацию приложения.
+    """
+    started_in = getattr(request.app.state, "started_in", None)
+    if started_in is None:
+        return ORJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "starting"},
+        )
+    return {"detail": "started", "started_in": started_in}
+
+
+@router.get("/health/live", status_code=status.HTTP_200_OK)
+async def live():
+    """Проверка жизнеспособности процесса (liveness probe).
+
+    Не обращается к БД: перезапуск пода не поможет, если недоступна база.
+    """
+    return {"detail": "alive", "event_loop_lag": round(loop_lag_monitor.lag, 4)}
+
+
+@router.get("/health/ready", status_code=status.HTTP_200_OK)
+async def ready():
+    """Проверка готовности к приему трафика (readiness probe).
+
+    Проверяет доступность БД, заполненность пула соединений,
+    задержку event loop и возвращает p99 длительности запросов.
+    """
+    result = await readiness_probe.check()
+    if not result["ready"]:
+        return ORJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=result
+        )
+    return result
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK)
+async def get_metrics():
+    """Метрики процесса: счетчики и перцентили задержек."""
+    return metrics.snapshot()
@@ -0,0 +1,120 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.deps import require_permissions, get_session
+from core.permissions import Permission
+from schemas.role import RoleCreateSchema, RoleResponse, RoleUpdateSchema
+from services.role import RoleService
+
+router = APIRouter(
+    prefix="/roles",
+    tags=["roles"],
+    dependencies=[Depends(require_permissions(Permission.ROLE_MANAGE))],
+)
+
+
+@router.get("/permissions", summary="Available permissions")
+async def get_permissions() -> dict[str, int]:
+    """Все права и их биты."""
+    return {permission.name: int(permission) for permission in Permission}
+
+
+@router.get("/", response_model=list[RoleResponse], summary="Get all roles")
+async def get_roles(session: Annotated[AsyncSession, Depends(get_session)]):
+    """Список ролей.
+
+    Args:
+        session: Сессия БД.
+    """
+    return await RoleService(session).find_all()
+
+
+@router.post(
+    "/",
+    response_model=RoleResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create role",
+)
+async def create_role(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    form: RoleCreateSchema,
+):
+    """Создание роли.
+
+    Args:
+        session: Сессия БД,
+        form: Имя, описание и права роли.
+    """
+    return await RoleService(session).create_one(form)
+
+
+@router.patch("/{role_id}", response_model=RoleResponse, summary="Update role")
+async def update_role(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    role_id: int,
+    form: RoleUpdateSchema,
+):
+    """Редактирование роли; новые права действуют для всех пользователей с ролью.
+
+    Args:
+        session: Сессия БД,
+        role_id: Идентификатор роли,
+        form: Изменяемые поля.
+    """
+    return await RoleService(session).edit_one(role_id, form)
+
+
+@router.delete("/{role_id}", summary="Delete role")
+async def delete_role(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    role_id: int,
+):
+    """Удаление роли вместе с ее назначениями.
+
+    Args:
+        session: Сессия БД,
+        role_id: Идентификатор роли.
+    """
+    return await RoleService(session).delete_one(role_id)
+
+
+@router.put(
+    "/{role_id}/users/{user_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Assign role to user",
+)
+async def assign_role(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    role_id: int,
+    user_id: int,
+):
+    """Назначение роли пользователю.
+
+    Args:
+        session: Сессия БД,
+        role_id: Идентификатор роли,
+        user_id: Идентификатор пользователя.
+    """
+    await RoleService(session).assign(role_id, user_id)
+
+
+@router.delete(
+    "/{role_id}/users/{user_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Revoke role from user",
+)
+async def revoke_role(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    role_id: int,
+    user_id: int,
+):
+    """Снятие роли с пользователя.
+
+    Args:
+        session: Сессия БД,
+        role_id: Идентификатор роли,
+        user_id: Идентификатор пользователя.
+    """
+    await RoleService(session).unassign(role_id, user_id)
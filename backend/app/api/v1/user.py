@@ -1,38 +1,85 @@
 from typing import Annotated
 
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, UploadFile, File, Header, Query, Response
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.deps import get_current_active_user, check_admin_role
-from core.session_manager import get_session
+from api.deps import (
+    get_current_active_user,
+    require_permissions,
+    statement_timeout,
+    get_session,
+    get_read_session,
+)
+from core.config import settings
+from core.permissions import Permission
 from schemas.auth import TokenUserData
+from schemas.outbox import ChangesResponse
 from schemas.page import PageResponse, PagedParamsSchema
-from schemas.user import UserUpdateSchema, UserFilterSchema, UserResponse
+from schemas.user import (
+    UserBatchResponse,
+    UserBatchSelectSchema,
+    UserBatchUpdateSchema,
+    UserFilterSchema,
+    UserResponse,
+    UserUpdateSchema,
+)
+from services.helpers.etag import (
+    cache_headers,
+    entity_etag,
+    etag_matches,
+    if_match_version,
+    not_modified,
+)
 from services.user import UserService
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
+async def _read_user(
+    session: AsyncSession,
+    user_id: int,
+    response: Response,
+    if_none_match: str | None,
+    route: str,
+):
+    """Условный GET пользователя: при совпадении ETag строка целиком не читается."""
+    headers = cache_headers(route)
+    service = UserService(session)
+    if if_none_match:
+        etag = await service.find_etag(user_id)
+        if etag and etag_matches(if_none_match, etag):
+            return not_modified(etag, headers)
+    user = await service.find_one(user_id)
+    response.headers.update({**headers, "ETag": entity_etag(user.id, user.version)})
+    return user
+
+
 @router.get(
     "/me",
     response_model=UserResponse,
     summary="Get current user info",
 )
 async def read_user_me(
-    session: Annotated[AsyncSession, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_read_session)],
     current_user: Annotated[TokenUserData, Depends(get_current_active_user)],
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
     """Данные текущего пользователя.
 
     Args:
         session: Сессия БД,
-        current_user: Текущий пользователь.
+        current_user: Текущий пользователь,
+        response: Ответ (заголовок `ETag`),
+        if_none_match: ETag из кэша клиента, при совпадении ответ 304.
 
     Returns:
         UserResponse: Схема возвращаемых данных о пользователе.
     """
-    return await UserService(session).find_one(current_user.id)
+    return await _read_user(
+        session, current_user.id, response, if_none_match, "users.me"
+    )
 
 
 @router.patch(
@@ -44,7 +91,9 @@ async def update_me(
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[UserResponse, Depends(get_current_active_user)],
     data: Annotated[UserUpdateSchema, Depends()],
+    response: Response,
     image_file: UploadFile | str | None = File(None, media_type="image/*"),
+    if_match: Annotated[str | None, Header()] = None,
 ):
     """Редактирование своих данных.
 
@@ -52,9 +101,37 @@ async def update_me(
         session: Сессия БД,
         current_user: Текущий пользователь,
         data: Данные для обновления,
-        image_file: Загрузка фото пользователя.
+        response: Ответ (заголовок `ETag`),
+        image_file: Загрузка фото пользователя,
+        if_match: ETag изменяемой версии, при несовпадении ответ 412.
     """
-    return await UserService(session).edit_me(current_user, data, image_file)
+    version = if_match_version(if_match, current_user.id)
+    user = await UserService(session).edit_me(current_user, data, image_file, version)
+    response.headers["ETag"] = entity_etag(user.id, user.version)
+    return user
+
+
+@router.get(
+    "/changes",
+    response_model=ChangesResponse,
+    dependencies=[Depends(require_permissions(Permission.USER_CHANGES_READ))],
+    summary="Stream of user change events",
+)
+async def get_changes(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    since: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=settings.OUTBOX_BATCH_SIZE)] = 100,
+    timeout: Annotated[float, Query(ge=0, le=settings.OUTBOX_LONG_POLL_MAX)] = 0,
+):
+    """События изменений пользователей после `since` (для Админа).
+
+    Args:
+        session: Сессия БД,
+        since: `last_seq` предыдущего ответа,
+        limit: Максимальное количество событий,
+        timeout: Ожидание новых событий в секундах, если их нет (long-poll).
+    """
+    return await UserService(session).find_changes(since, limit, timeout)
 
 
 @router.get(
@@ -63,16 +140,20 @@ async def update_me(
     summary="Get user info",
 )
 async def get_one(
-    session: Annotated[AsyncSession, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_read_session)],
     user_id: int,
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
     """Возвращает данных пользователя.
 
     Args:
         session: Сессия БД,
-        user_id: Идентификатор пользователя.
+        user_id: Идентификатор пользователя,
+        response: Ответ (заголовок `ETag`),
+        if_none_match: ETag из кэша клиента, при совпадении ответ 304.
     """
-    return await UserService(session).find_one(user_id)
+    return await _read_user(session, user_id, response, if_none_match, "users.one")
 
 
 @router.get(
@@ -81,54 +162,136 @@ async def get_one(
     summary="View user data by filters",
 )
 async def get_many(
-    session: Annotated[AsyncSession, Depends(get_session, use_cache=True)],
+    session: Annotated[AsyncSession, Depends(get_read_session, use_cache=True)],
     limit_offset: Annotated[PagedParamsSchema, Depends()],
     filter_schema: Annotated[UserFilterSchema, Depends()],
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
     """Возвращает список пользователей.
 
     Args:
         session: Сессия БД,
         limit_offset: Параметры для постраничного отображения,
-        filter_schema: Критерий отбора списка данных.
+        filter_schema: Критерий отбора списка данных,
+        response: Ответ (заголовки `ETag`, `Cache-Control`),
+        if_none_match: ETag из кэша клиента, при совпадении ответ 304.
+    """
+    headers = cache_headers("users.list")
+    service = UserService(session)
+    etag, total = await service.list_state(limit_offset, filter_schema)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, headers)
+    page = await service.find_all(limit_offset, filter_schema, total)
+    response.headers.update({**headers, "ETag": etag})
+    return page
+
+
+@router.patch(
+    "/",
+    response_model=UserBatchResponse,
+    dependencies=[
+        Depends(statement_timeout(settings.USER_BATCH_STATEMENT_TIMEOUT)),
+    ],
+    summary="Batch update of users by Admin",
+)
+async def update_many(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    form: UserBatchUpdateSchema,
+    actor: Annotated[
+        TokenUserData, Depends(require_permissions(Permission.USER_UPDATE))
+    ],
+):
+    """Пакетное редактирование Админом пользователей по списку id или фильтру.
+
+    Args:
+        session: Сессия БД,
+        form: `ids` или `filter` и новые значения,
+        actor: Админ.
+
+    Returns:
+        Результат по каждому id (`updated` или `not_found`).
     """
-    return await UserService(session).find_all(limit_offset, filter_schema)
+    return await UserService(session).edit_many(form, actor.id)
+
+
+@router.delete(
+    "/",
+    response_model=UserBatchResponse,
+    dependencies=[
+        Depends(statement_timeout(settings.USER_BATCH_STATEMENT_TIMEOUT)),
+    ],
+    summary="Batch deletion (hiding) of users by Admin",
+)
+async def delete_many(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    selector: UserBatchSelectSchema,
+    actor: Annotated[
+        TokenUserData, Depends(require_permissions(Permission.USER_DELETE))
+    ],
+):
+    """Пакетное удаление (скрытие) Админом пользователей по списку id или фильтру.
+
+    Refresh токены удаленных пользователей отзываются, их WebSocket-соединения закрываются.
+
+    Args:
+        session: Сессия БД,
+        selector: `ids` или `filter`,
+        actor: Админ.
+
+    Returns:
+        Результат по каждому id (`deleted` или `not_found`).
+    """
+    return await UserService(session).delete_many(selector, actor.id)
 
 
 @router.patch(
     "/{user_id}",
     response_model=UserResponse,
-    dependencies=[Depends(check_admin_role)],
     summary="Updating user data by Admin",
 )
 async def update_one_by_id(
     session: Annotated[AsyncSession, Depends(get_session)],
+    actor: Annotated[
+        TokenUserData, Depends(require_permissions(Permission.USER_UPDATE))
+    ],
     user_id: int,
+    response: Response,
     data: UserUpdateSchema = Depends(),
+    if_match: Annotated[str | None, Header()] = None,
 ):
     """Редактирование Админом данных пользователя.
 
     Args:
         session: Сессия БД,
+        actor: Админ,
         user_id: Идентификатор пользователя,
-        data: Данные для обновления.
+        response: Ответ (заголовок `ETag`),
+        data: Данные для обновления,
+        if_match: ETag изменяемой версии, при несовпадении ответ 412.
     """
-    return await UserService(session).edit_one(user_id, data)
+    version = if_match_version(if_match, user_id)
+    user = await UserService(session).edit_one(user_id, data, version, actor.id)
+    response.headers["ETag"] = entity_etag(user.id, user.version)
+    return user
 
 
 @router.delete(
     "/{user_id}",
-    dependencies=[Depends(check_admin_role)],
     summary="Deletion (hiding) of user data by Admin",
 )
 async def delete_by_id(
     session: Annotated[AsyncSession, Depends(get_session)],
+    actor: Annotated[
+        TokenUserData, Depends(require_permissions(Permission.USER_DELETE))
+    ],
     user_id: int,
 ):
     """Удаление (скрытие) Админом данных пользователя.
 
     Args:
         session: Сессия БД,
+        actor: Админ,
         user_id: Идентификатор пользователя.
     """
-    return await UserService(session).delete_one(user_id)
+    return await UserService(session).delete_one(user_id, actor.id)
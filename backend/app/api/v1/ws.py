@@ -0,0 +1,34 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, WebSocket
+
+from api.deps import get_websocket_user
+from core.hub import hub
+from schemas.auth import TokenUserData
+
+router = APIRouter(tags=["ws"])
+
+
+@router.websocket("/ws")
+async def notifications(
+    websocket: WebSocket,
+    current_user: Annotated[TokenUserData, Depends(get_websocket_user)],
+):
+    """Уведомления текущего пользователя.
+
+    Сервер отправляет JSON-сообщения: `{"type": "user.updated", "seq", "data"}`
+    при изменении профиля и `{"type": "ping"}` раз в `WS_HEARTBEAT_INTERVAL`.
+    Клиент должен отвечать на `ping` (любым сообщением), иначе соединение
+    закрывается через `WS_HEARTBEAT_TIMEOUT`.
+
+    Args:
+        websocket: Соединение,
+        current_user: Пользователь из access токена.
+    """
+    connection = await hub.connect(websocket, current_user.id)
+    if connection is None:
+        return
+    try:
+        await connection.run()
+    finally:
+        hub.disconnect(connection)
@@ -0,0 +1,105 @@
+"""Контроль допуска запросов (admission control).
+
+- `TimedQueuePool` измеряет время ожидания соединения в пуле;
+- `PoolWaitTracker` хранит сглаженное время ожидания для сброса нагрузки;
+- `ClientLimiter` ограничивает число одновременных запросов одного клиента.
+"""
+
+import time
+
+from sqlalchemy import AsyncAdaptedQueuePool
+
+from core.logging import add_timing
+from core.metrics import metrics
+
+
+class PoolWaitTracker:
+    """Экспоненциально сглаженное время ожидания соединения.
+
+    Значение старше `window` секунд не учитывается: когда запросы
+    отклоняются и к пулу никто не обращается, следующий запрос
+    пропускается и обновляет оценку.
+    """
+
+    def __init__(self, alpha: float = 0.2, window: float = 1.0) -> None:
+        self.alpha = alpha
+        self.window = window
+        self._value = 0.0
+        self._updated = 0.0
+
+    def observe(self, wait: float) -> None:
+        now = time.monotonic()
+        if now - self._updated > self.window:
+            self._value = wait
+        else:
+            self._value += self.alpha * (wait - self._value)
+        self._updated = now
+        metrics.observe("db_pool_wait_seconds", wait)
+
+    @property
+    def value(self) -> float:
+        if time.monotonic() - self._updated > self.window:
+            return 0.0
+        return self._value
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который записывает время ожидания соединения в `pool_wait`."""
+
+    # ожидание в пуле - признак перегрузки для `AdmissionMiddleware`
+    shed = True
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            if self.shed:
+                pool_wait.observe(waited)
+            else:
+                metrics.observe("db_writer_wait_seconds", waited)
+            add_timing("pool_wait", waited)
+
+
+class WriterQueuePool(TimedQueuePool):
+    """Пул писателя SQLite из одного соединения.
+
+    Очередь к писателю - обычный режим работы, а не перегрузка: ожидание
+    в нем не попадает в `pool_wait`, иначе очередь записей отклоняла бы
+    и запросы, которым писатель не нужен.
+    """
+
+    shed = False
+
+
+class ClientLimiter:
+    """Счетчики одновременных запросов по ключу клиента.
+
+    Анонимные клиенты различаются только адресом, за которым может быть NAT
+    или прокси многих пользователей, поэтому для них свой лимит.
+    """
+
+    def __init__(self, limit: int = 8, anonymous_limit: int = 64) -> None:
+        self.limit = limit
+        self.anonymous_limit = anonymous_limit
+        self._active: dict[str, int] = {}
+
+    def acquire(self, key: str, anonymous: bool = False) -> bool:
+        active = self._active.get(key, 0)
+        limit = self.anonymous_limit if anonymous else self.limit
+        if limit and active >= limit:
+            return False
+        self._active[key] = active + 1
+        return True
+
+    def release(self, key: str) -> None:
+        active = self._active.get(key, 0) - 1
+        if active > 0:
+            self._active[key] = active
+        else:
+            self._active.pop(key, None)
+
+
+pool_wait = PoolWaitTracker()
+client_limiter = ClientLimiter()
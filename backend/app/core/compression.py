@@ -0,0 +1,115 @@
+"""Сжатие ответов: gzip (stdlib), brotli и zstd (если установлены).
+
+Кодировщик работает и целиком (`process(body, flush=False)` + `finish()`),
+и потоково: `process(chunk)` сбрасывает блок, чтобы клиент получал данные сразу.
+"""
+
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class GzipEncoder:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def process(self, data: bytes, flush: bool = True) -> bytes:
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level)
+
+    def process(self, data: bytes, flush: bool = True) -> bytes:
+        out = self._compressor.process(data)
+        return out + self._compressor.flush() if flush else out
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def process(self, data: bytes, flush: bool = True) -> bytes:
+        out = self._compressor.compress(data)
+        if flush:
+            out += self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return out
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# в порядке предпочтения сервера при равном q
+ENCODERS = {"gzip": GzipEncoder}
+if zstandard is not None:
+    ENCODERS = {"zstd": ZstdEncoder, **ENCODERS}
+if brotli is not None:
+    ENCODERS = {"br": BrotliEncoder, **ENCODERS}
+
+DEFAULT_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+
+
+def negotiate(accept_encoding: str, available=ENCODERS) -> str | None:
+    """Выбирает кодировку по `Accept-Encoding` (с учетом q)."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for name in available:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(encoding: str, level: int, body: bytes) -> bytes:
+    encoder = ENCODERS[encoding](level)
+    return encoder.process(body, flush=False) + encoder.finish()
+
+
+class CompressedCache:
+    """LRU уже сжатых тел ответов с `ETag` (ключ включает путь и кодировку)."""
+
+    def __init__(self, size: int = 256, max_body: int = 1024 * 1024) -> None:
+        self.size = size
+        self.max_body = max_body
+        self._items: OrderedDict[tuple, bytes] = OrderedDict()
+
+    def get(self, key: tuple) -> bytes | None:
+        body = self._items.get(key)
+        if body is not None:
+            self._items.move_to_end(key)
+        return body
+
+    def put(self, key: tuple, body: bytes) -> None:
+        if self.size <= 0 or len(body) > self.max_body:
+            return
+        self._items[key] = body
+        self._items.move_to_end(key)
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
@@ -3,6 +3,8 @@ from pathlib import Path
 
 from pydantic_settings import SettingsConfigDict, BaseSettings
 
+from core.const import AppEnvironment
+
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
 
@@ -13,12 +15,21 @@ class Settings(BaseSettings):
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
+    ENVIRONMENT: AppEnvironment = AppEnvironment.LOCAL
+
     # FastAPI
     PROJECT_TITLE: str = "Project Name"
     PROJECT_DESCRIPTION: str = "Fastapi project description"
     VERSION: str = "0.0.1"
     API_V1_STR: str = "/api/v1"
 
+    # server
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int | None = None  # None - по количеству доступных CPU
+    SERVER_GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+    SERVER_WS_PER_MESSAGE_DEFLATE: bool = False  # zlib-контекст на каждое соединение
+
     # db
     DB_SCHEMA: str | None = None
     DB_ECHO: bool = False
@@ -29,20 +40,166 @@ class Settings(BaseSettings):
     DB_SESSION_EXPIRE_ON_COMMIT: bool = False
     DB_CONNECT_ARGS: dict = {}
 
+    # admission
+    PAGE_MAX_SIZE: int = 100
+    CLIENT_MAX_CONCURRENCY: int = 8  # 0 - без ограничения
+    # запросы без токена по адресу клиента (NAT, прокси), 0 - без ограничения
+    CLIENT_MAX_CONCURRENCY_ANONYMOUS: int = 64
+    ADMISSION_MAX_IN_FLIGHT: int = 256  # на воркер, 0 - без ограничения
+    ADMISSION_POOL_WAIT_MAX: float = 0.5  # seconds, 0 - не учитывать
+    ADMISSION_RETRY_AFTER: int = 1  # seconds
+    ADMISSION_EXEMPT_PATHS: list[str] = [
+        "/api/v1/health",
+        "/api/v1/metrics",
+        "/api/v1/ping",
+    ]
+
+    # statement timeouts
+    DB_STATEMENT_TIMEOUT: float = 5.0  # seconds, 0 - без ограничения
+    # шаблон маршрута (`/api/v1/users/`) -> таймаут, важнее значения эндпоинта
+    DB_STATEMENT_TIMEOUT_ROUTES: dict[str, float] = {}
+    # методы, обработка которых отменяется при отключении клиента
+    DB_CANCEL_ON_DISCONNECT_METHODS: list[str] = ["GET", "HEAD"]
+
+    # batch
+    USER_BATCH_CHUNK_SIZE: int = 500  # строк на UPDATE и транзакцию
+    USER_BATCH_MAX_IDS: int = 10000
+    USER_BATCH_STATEMENT_TIMEOUT: float = 30.0  # seconds, на UPDATE порции
+
+    # http cache
+    HTTP_CACHE_CONTROL_DEFAULT: str = "private, no-cache"
+    HTTP_CACHE_CONTROL: dict[str, str] = {}  # маршрут -> Cache-Control
+
+    # compression
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes
+    COMPRESSION_THREAD_MIN_SIZE: int = 256 * 1024  # сжатие в потоке
+    COMPRESSION_CACHE_SIZE: int = 256  # сжатых ответов с ETag
+    # тип содержимого (префикс) -> уровень по кодировке
+    COMPRESSION_LEVELS: dict[str, dict[str, int]] = {
+        "application/json": {"br": 4, "zstd": 3, "gzip": 3},
+        "text/": {"br": 5, "zstd": 3, "gzip": 6},
+    }
+
+    # logging
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False  # JSON-строки для сбора логов
+    LOG_ENQUEUE: bool = True  # запись в отдельном потоке
+    LOG_SAMPLING: dict[str, float] = {}  # уровень -> доля записей, {"INFO": 0.1}
+    LOG_SLOW_REQUEST_SECONDS: float = 1.0  # 0 - не записывать
+    REQUEST_ID_HEADER: str = "X-Request-ID"
+
+    # sql profiler
+    SQL_PROFILER_ENABLED: bool = True
+    SQL_SLOW_QUERY_SECONDS: float = 0.2
+    SQL_N_PLUS_ONE_THRESHOLD: int = 3
+    # заголовок `X-SQL-Profile` и `GET /debug/sql` (пути и запросы всех клиентов,
+    # без аутентификации) - только для локальной отладки
+    SQL_PROFILER_DEBUG: bool = False
+
     SQLITE_FILENAME: str = "db_project"
     SQLITE_DATABASE_URI: str = f"sqlite+aiosqlite:///./{SQLITE_FILENAME}.db"
     SQLALCHEMY_DATABASE_URI: str = SQLITE_DATABASE_URI
+    SQLALCHEMY_REPLICA_URIS: list[str] = []
+    DB_REPLICA_STRATEGY: str = "round_robin"  # или least_connections
+    DB_REPLICA_CHECK_INTERVAL: float = 5.0
+    DB_REPLICA_CHECK_TIMEOUT: float = 1.0
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0
+    # время последней записи клиента для других воркеров (cookie и заголовок)
+    DB_READ_YOUR_WRITES_COOKIE: str = "last_write"
+    DB_READ_YOUR_WRITES_HEADER: str = "X-Last-Write"
+    # пул читателей и один писатель на процесс (`core/sqlite.py`), включается явно
+    DB_SQLITE_PROFILE: bool = False
+    DB_SQLITE_READ_POOL_SIZE: int = 4
+    DB_SQLITE_WRITE_TIMEOUT: float = 30.0
+    DB_SQLITE_PRAGMAS: dict = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # KiB
+        "busy_timeout": 5000,  # ms
+        "temp_store": "MEMORY",
+    }
+
+    # health
+    HEALTH_DB_TIMEOUT: float = 1.0
+    HEALTH_CACHE_SECONDS: float = 2.0
+    HEALTH_POOL_SATURATION_MAX: float = 1.0
+    HEALTH_LOOP_LAG_MAX: float = 0.5
+    LOOP_LAG_INTERVAL: float = 0.5
+
+    # monitoring
+    LOOP_BLOCK_DETECTOR_ENABLED: bool = False
+    LOOP_BLOCK_THRESHOLD: float = 0.1
 
     # auth
     SECRET_KEY: str = ""
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 2
     REFRESH_TOKEN_EXPIRE_HOURS: int = 24 * 2
+    AUTH_WRITE_BEHIND_ENABLED: bool = False
+    AUTH_WRITE_BEHIND_INTERVAL: float = 0.5
+    AUTH_WRITE_BEHIND_BATCH_SIZE: int = 500
 
     # Email
-    EMAIL_FROM: str = ""
+    EMAIL_FROM: str = "noreply@localhost"
     EMAIL_PASSWORD: str = ""
     FORGET_PASSWORD_LINK_EXPIRE_MINUTES: int = 10
+    FORGET_PASSWORD_LINK: str = "http://localhost:8000/reset-password?token={token}"
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 1025
+    SMTP_TLS: bool = False
+    SMTP_TIMEOUT: float = 10.0
+
+    # permissions
+    PERMISSION_CACHE_TTL: float = 60.0  # seconds
+    PERMISSION_CACHE_SIZE: int = 100_000
+
+    # audit
+    AUDIT_ENABLED: bool = True
+    AUDIT_BUFFER_SIZE: int = 10000  # событий в памяти, при переполнении старые теряются
+    AUDIT_BATCH_SIZE: int = 500  # строк на INSERT
+    AUDIT_FLUSH_INTERVAL: float = 1.0  # seconds
+    AUDIT_PAGE_MAX_SIZE: int = 500
+
+    # outbox
+    OUTBOX_RELAY_ENABLED: bool = True
+    OUTBOX_RELAY_INTERVAL: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_GAP_TIMEOUT: float = 5.0  # seconds
+    OUTBOX_LONG_POLL_MAX: float = 30.0  # seconds
+
+    # websocket
+    WS_MAX_CONNECTIONS: int = 20000  # на воркер, 0 - без ограничения
+    WS_QUEUE_SIZE: int = 64  # сообщений, при переполнении соединение закрывается
+    WS_HEARTBEAT_INTERVAL: float = 30.0  # seconds
+    WS_HEARTBEAT_TIMEOUT: float = 90.0  # seconds без сообщений от клиента
+    WS_REDIS_URL: str | None = None  # backplane между воркерами
+    WS_REDIS_CHANNEL: str = "ws:notifications"
+
+    # purge
+    # необратимо удаляет данные: включается явно
+    USER_PURGE_ENABLED: bool = False
+    USER_PURGE_MODE: str = "archive"  # или delete
+    USER_PURGE_RETENTION_DAYS: int = 30
+    USER_PURGE_INTERVAL: float = 3600.0  # seconds
+    USER_PURGE_BATCH_SIZE: int = 200
+    USER_PURGE_SLEEP: float = 0.2  # seconds между порциями
+    USER_PURGE_FILE_GRACE: float = 3600.0  # возраст файла без ссылок, seconds
+
+    # data migrations
+    DATA_MIGRATION_BATCH_SIZE: int = 1000  # диапазон id на транзакцию
+    DATA_MIGRATION_SLEEP: float = 0.1  # seconds между порциями
+
+    # jobs
+    JOBS_ENABLED: bool = True
+    JOBS_CONCURRENCY: int = 4
+    JOBS_MAX_ATTEMPTS: int = 5
+    JOBS_BACKOFF_SECONDS: float = 2.0
+    JOBS_BACKOFF_MAX_SECONDS: float = 300.0
+    JOBS_POLL_INTERVAL: float = 1.0
+    JOBS_STALE_SECONDS: float = 300.0
+    JOBS_SHUTDOWN_TIMEOUT: float = 10.0
 
 
 @lru_cache
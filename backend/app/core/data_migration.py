@@ -0,0 +1,187 @@
+"""Онлайн-миграции данных (backfill) отдельно от схемных миграций Alembic.
+
+Alembic меняет схему (быстрые DDL), а заполнение и исправление данных
+выполняет `DataMigrationRunner` порциями по диапазонам первичного ключа:
+каждая порция - отдельная короткая транзакция, между порциями пауза,
+позиция хранится в `checkpoint`, поэтому запуск можно прервать и продолжить.
+"""
+
+import asyncio
+from typing import ClassVar
+
+from loguru import logger
+from sqlalchemy import Index, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.metrics import metrics
+from core.session_manager import db_manager
+from repositories.checkpoint import CheckpointRepository
+
+
+class DataMigration:
+    """Миграция данных таблицы `model` с целочисленным `id`.
+
+    Подкласс задает `name`, `model` и реализует `batch` (изменения строк
+    с `start <= id < end`) и/или перечисляет `indexes`, которые создаются
+    после заполнения без блокировки записи, где это поддерживает СУБД.
+    """
+
+    name: ClassVar[str]
+    model: ClassVar[type]
+    description: ClassVar[str] = ""
+    indexes: ClassVar[tuple[Index, ...]] = ()
+
+    async def batch(self, session: AsyncSession, start: int, end: int) -> int:
+        """Изменяет строки диапазона в транзакции `session`.
+
+        Returns:
+            Количество измененных строк.
+        """
+        return 0
+
+    async def pending(self, session: AsyncSession) -> int | None:
+        """Сколько строк осталось изменить (для `--dry-run`), если это известно."""
+        return None
+
+
+async def create_index(index: Index) -> None:
+    """Создает индекс, если его нет.
+
+    PostgreSQL: `CREATE INDEX CONCURRENTLY` вне транзакции, не блокирует запись;
+    невалидный индекс от прерванного построения удаляется и строится заново.
+    Остальные СУБД: обычный `CREATE INDEX` в транзакции.
+    """
+    async with db_manager.connect() as connection:
+        dialect = connection.dialect.name
+    if dialect != "postgresql":
+        async with db_manager.connect() as connection:
+            await connection.run_sync(lambda conn: index.create(conn, checkfirst=True))
+        return
+    async with db_manager.connect(autocommit=True) as connection:
+        valid = await connection.scalar(
+            text(
+                "SELECT i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+            ),
+            {"name": index.name},
+        )
+        if valid is False:
+            logger.warning("Dropping invalid index {}", index.name)
+            await connection.exec_driver_sql(
+                f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'
+            )
+        # индекс модели: CONCURRENTLY только для этого вызова
+        options = index.dialect_options["postgresql"]
+        options["concurrently"] = True
+        try:
+            await connection.run_sync(lambda conn: index.create(conn, checkfirst=True))
+        finally:
+            options["concurrently"] = False
+
+
+class DataMigrationRunner:
+    """Выполняет миграции данных с продолжением по `checkpoint`.
+
+    Запись `checkpoint` миграции называется `migration:<name>`;
+    ее аренда не дает запустить ту же миграцию в двух процессах.
+    """
+
+    lease = 300.0
+
+    def __init__(self, batch_size: int = 1000, sleep: float = 0.1) -> None:
+        self.batch_size = batch_size
+        self.sleep = sleep
+
+    @staticmethod
+    def checkpoint_name(migration: DataMigration) -> str:
+        return f"migration:{migration.name}"
+
+    async def status(self, migration: DataMigration) -> dict:
+        async with db_manager.session() as session:
+            checkpoint = await CheckpointRepository(session).find_one_or_none(
+                name=self.checkpoint_name(migration)
+            )
+        if checkpoint is None:
+            return {"status": "new", "position": 0, "processed": 0}
+        return {
+            "status": "done" if checkpoint.finished_at else "started",
+            "position": checkpoint.position,
+            "processed": checkpoint.processed,
+        }
+
+    async def run(self, migration: DataMigration, restart: bool = False) -> dict:
+        """Выполняет или продолжает миграцию.
+
+        Args:
+            migration: Миграция,
+            restart: Выполнить заново завершенную миграцию.
+
+        Returns:
+            Статистика: `status` - `done`, `skipped` (уже выполнена) или `locked`.
+        """
+        name = self.checkpoint_name(migration)
+        async with db_manager.session() as session:
+            repository = CheckpointRepository(session)
+            checkpoint = await repository.acquire(name, self.lease)
+            if checkpoint is None:
+                return {"status": "locked"}
+            if checkpoint.finished_at is not None and not restart:
+                await repository.release(name)
+                await session.commit()
+                return {"status": "skipped"}
+            if checkpoint.finished_at is not None or restart:
+                await repository.restart(name)
+                position = 0
+            else:
+                position = checkpoint.position
+            await session.commit()
+        try:
+            changed = 0
+            if type(migration).batch is not DataMigration.batch:
+                changed = await self._backfill(migration, name, position)
+            for index in migration.indexes:
+                logger.info("Creating index {}", index.name)
+                await create_index(index)
+        except BaseException:
+            async with db_manager.session() as session:
+                await CheckpointRepository(session).release(name)
+                await session.commit()
+            raise
+        async with db_manager.session() as session:
+            await CheckpointRepository(session).finish(name)
+            await session.commit()
+        return {"status": "done", "resumed_from": position, "changed": changed}
+
+    async def _backfill(
+        self, migration: DataMigration, name: str, position: int
+    ) -> int:
+        model = migration.model
+        async with db_manager.session() as session:
+            low, high = (
+                await session.execute(select(func.min(model.id), func.max(model.id)))
+            ).one()
+        if high is None:
+            return 0
+        # строки, добавленные после начала, пишет уже новый код приложения
+        start = max(position, low)
+        changed = 0
+        while start <= high:
+            end = start + self.batch_size
+            async with db_manager.session() as session:
+                count = await migration.batch(session, start, end)
+                await CheckpointRepository(session).advance(
+                    name, end, count, self.lease
+                )
+                await session.commit()
+            changed += count
+            metrics.inc("data_migration_rows_total", count, migration=migration.name)
+            logger.info(
+                "Migration {}: ids [{}, {}) changed {}",
+                migration.name,
+                start,
+                end,
+                count,
+            )
+            start = end
+            await asyncio.sleep(self.sleep)
+        return changed
@@ -0,0 +1,169 @@
+"""Ограничение времени SQL-запросов в рамках HTTP-запроса.
+
+- PostgreSQL: `SET LOCAL statement_timeout` в начале каждой транзакции,
+  запрос прерывает сам сервер; при отмене задачи asyncpg отправляет
+  серверу cancel request;
+- SQLite: `sqlite3_interrupt` соединения по таймеру, а также при
+  отключении клиента (`StatementDeadline.cancel`).
+
+Ошибка прерванного запроса заменяется на `StatementTimeout` или
+`StatementCancelled`. Вне HTTP-запросов (фоновые задачи, скрипты)
+время запросов не ограничивается.
+"""
+
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import Scope
+
+from core.metrics import metrics
+from core.monitoring import route_name
+
+PG_QUERY_CANCELED = "57014"
+
+
+class StatementTimeout(Exception):
+    """Запрос к БД выполнялся дольше таймаута маршрута."""
+
+
+class StatementCancelled(Exception):
+    """Запрос к БД прерван: клиент отключился."""
+
+
+class StatementDeadline:
+    """Таймаут запросов одного HTTP-запроса и выполняющиеся запросы SQLite."""
+
+    __slots__ = ("scope", "endpoint_timeout", "cancelled", "_deadlines", "_running")
+
+    def __init__(self, deadlines: "StatementDeadlines", scope: Scope) -> None:
+        self.scope = scope
+        self.endpoint_timeout: float | None = None
+        self.cancelled = False
+        self._deadlines = deadlines
+        self._running: set = set()
+
+    @property
+    def timeout(self) -> float:
+        """Таймаут запроса в секундах, 0 - без ограничения.
+
+        Настройка маршрута (`DB_STATEMENT_TIMEOUT_ROUTES`) важнее значения
+        эндпоинта (`statement_timeout`), оно - значения по умолчанию.
+        """
+        timeout = self._deadlines.routes.get(route_name(self.scope))
+        if timeout is None:
+            timeout = self.endpoint_timeout
+        return self._deadlines.timeout if timeout is None else timeout
+
+    def cancel(self) -> None:
+        """Прерывает выполняющиеся запросы (клиент отключился)."""
+        self.cancelled = True
+        for connection in list(self._running):
+            connection.interrupt()
+
+
+_current: ContextVar[StatementDeadline | None] = ContextVar(
+    "statement_deadline", default=None
+)
+
+
+def set_statement_timeout(seconds: float) -> None:
+    """Таймаут запросов текущего HTTP-запроса (переопределение эндпоинтом)."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.endpoint_timeout = seconds
+
+
+def _sqlite_connection(conn):
+    # aiosqlite.Connection хранит sqlite3.Connection в `_conn`
+    driver_connection = conn.connection.driver_connection
+    return getattr(driver_connection, "_conn", driver_connection)
+
+
+def _interrupted(dialect_name: str, error: BaseException | None) -> bool:
+    if dialect_name == "postgresql":
+        code = getattr(error, "sqlstate", None) or getattr(error, "pgcode", None)
+        return code == PG_QUERY_CANCELED
+    return dialect_name == "sqlite" and str(error) == "interrupted"
+
+
+class StatementDeadlines:
+    """Таймауты запросов к БД; `request` задает таймаут HTTP-запроса."""
+
+    def __init__(self, timeout: float = 0.0) -> None:
+        self.timeout = timeout
+        self.routes: dict[str, float] = {}
+
+    @contextmanager
+    def request(self, scope: Scope) -> Iterator[StatementDeadline]:
+        deadline = StatementDeadline(self, scope)
+        token = _current.set(deadline)
+        try:
+            yield deadline
+        finally:
+            _current.reset(token)
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        sync_engine = engine.sync_engine
+        if event.contains(sync_engine, "handle_error", self._handle_error):
+            return
+        event.listen(sync_engine, "handle_error", self._handle_error)
+        if sync_engine.dialect.name == "postgresql":
+            event.listen(sync_engine, "begin", self._set_local_timeout)
+        elif sync_engine.dialect.name == "sqlite":
+            event.listen(sync_engine, "before_cursor_execute", self._before)
+            event.listen(sync_engine, "after_cursor_execute", self._after)
+
+    @staticmethod
+    def _set_local_timeout(conn) -> None:
+        deadline = _current.get()
+        if deadline is not None and deadline.timeout:
+            conn.exec_driver_sql(
+                f"SET LOCAL statement_timeout = {int(deadline.timeout * 1000)}"
+            )
+
+    @staticmethod
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        deadline = _current.get()
+        if deadline is None:
+            return
+        if deadline.cancelled:
+            raise StatementCancelled()
+        connection = _sqlite_connection(conn)
+        timer = None
+        if deadline.timeout:
+            timer = asyncio.get_running_loop().call_later(
+                deadline.timeout, connection.interrupt
+            )
+        deadline._running.add(connection)
+        conn.info["statement_deadline"] = (deadline, connection, timer)
+
+    @staticmethod
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        running = conn.info.pop("statement_deadline", None)
+        if running is not None:
+            deadline, connection, timer = running
+            deadline._running.discard(connection)
+            if timer is not None:
+                timer.cancel()
+
+    def _handle_error(self, exception_context) -> None:
+        if exception_context.connection is not None:
+            self._after(exception_context.connection, None, None, None, None, False)
+        deadline = _current.get()
+        if deadline is None or not _interrupted(
+            exception_context.dialect.name, exception_context.original_exception
+        ):
+            return
+        if deadline.cancelled:
+            raise StatementCancelled() from exception_context.sqlalchemy_exception
+        metrics.inc("db_statement_timeouts_total", route=route_name(deadline.scope))
+        raise StatementTimeout(
+            f"Statement exceeded {deadline.timeout}s"
+        ) from exception_context.sqlalchemy_exception
+
+
+statement_deadlines = StatementDeadlines()
@@ -1,5 +1,6 @@
 from fastapi import HTTPException, status
 
+from core.config import settings
 from core.const import PWD_SPECIAL_CHARS
 
 CREDENTIALS_EXCEPTION_INVALID = HTTPException(
@@ -39,6 +40,10 @@ CREDENTIALS_EXCEPTION_LOGIN = HTTPException(
     detail="Login failed",
     headers={"WWW-Authenticate": "Bearer"},
 )
+CREDENTIALS_EXCEPTION_RESET = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Password reset link is invalid or already used",
+)
 
 USER_EXCEPTION_WRONG_PARAMETER = HTTPException(
     status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -83,9 +88,30 @@ USER_EXCEPTION_INACTIVE_USER = HTTPException(
     status_code=status.HTTP_400_BAD_REQUEST,
     detail="Inactive user",
 )
+USER_EXCEPTION_BATCH_SELECTOR = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Specify either ids or a non-empty filter",
+)
+USER_EXCEPTION_BATCH_EMPTY = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Nothing to update",
+)
 USER_EXCEPTION_PERMISSION_REQUIRED = HTTPException(
     status_code=status.HTTP_403_FORBIDDEN,
-    detail="Superuser permission required",
+    detail="Permission required",
+)
+
+ROLE_EXCEPTION_NOT_FOUND = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail="Role not found",
+)
+ROLE_EXCEPTION_CONFLICT_NAME = HTTPException(
+    status_code=status.HTTP_409_CONFLICT,
+    detail="Role already exists",
+)
+ROLE_EXCEPTION_UNKNOWN_PERMISSION = HTTPException(
+    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    detail="Unknown permission",
 )
 
 EXCEPTION_UPLOAD_IMAGE = HTTPException(
@@ -96,3 +122,16 @@ EXCEPTION_ID_NOT_FOUND = HTTPException(
     status_code=status.HTTP_404_NOT_FOUND,
     detail="Not Found",
 )
+EXCEPTION_PRECONDITION_FAILED = HTTPException(
+    status_code=status.HTTP_412_PRECONDITION_FAILED,
+    detail="Resource was modified, reload it and retry",
+)
+EXCEPTION_TOO_MANY_REQUESTS = HTTPException(
+    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+    detail="Too many concurrent requests",
+    headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+)
+EXCEPTION_STATEMENT_TIMEOUT = HTTPException(
+    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+    detail="Database query timed out",
+)
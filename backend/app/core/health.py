@@ -0,0 +1,81 @@
+"""Проверки готовности приложения к приему трафика."""
+
+import asyncio
+import time
+
+from loguru import logger
+from sqlalchemy import text
+
+from core.config import settings
+from core.metrics import metrics
+from core.monitoring import loop_lag_monitor
+from core.session_manager import db_manager
+
+
+class ReadinessProbe:
+    """Проверка готовности (readiness) с кэшированием результата.
+
+    Результат хранится `HEALTH_CACHE_SECONDS`, поэтому частые запросы
+    балансировщика не создают нагрузку на БД. Одновременные запросы
+    ждут одну и ту же проверку.
+    """
+
+    def __init__(self) -> None:
+        self._lock = asyncio.Lock()
+        self._result: dict | None = None
+        self._checked_at: float = 0.0
+
+    async def check(self) -> dict:
+        if self._is_fresh():
+            return self._result
+        async with self._lock:
+            if not self._is_fresh():
+                self._result = await self._run_checks()
+                self._checked_at = time.monotonic()
+        return self._result
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._result is not None
+            and time.monotonic() - self._checked_at < settings.HEALTH_CACHE_SECONDS
+        )
+
+    async def _run_checks(self) -> dict:
+        database = await self._check_database()
+        pool = db_manager.pool_status()
+        loop_lag = round(loop_lag_monitor.lag, 4)
+        p99 = metrics.percentile("http_request_duration_seconds", 99)
+
+        saturation = pool.get("saturation")
+        ready = (
+            database["ok"]
+            and (saturation is None or saturation < settings.HEALTH_POOL_SATURATION_MAX)
+            and loop_lag <= settings.HEALTH_LOOP_LAG_MAX
+        )
+        result = {
+            "ready": ready,
+            "database": database,
+            "pool": pool,
+            "event_loop_lag": loop_lag,
+            "request_p99": round(p99, 4) if p99 is not None else None,
+        }
+        if db_manager.replicas:
+            result["replicas"] = db_manager.replicas.status()
+        return result
+
+    @staticmethod
+    async def _check_database() -> dict:
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(settings.HEALTH_DB_TIMEOUT):
+                async with db_manager.connect(readonly=True) as connection:
+                    await connection.execute(text("SELECT 1"))
+        except TimeoutError:
+            return {"ok": False, "error": "timeout"}
+        except Exception as e:
+            logger.warning("Readiness database check failed {}", e)
+            return {"ok": False, "error": type(e).__name__}
+        return {"ok": True, "latency": round(time.perf_counter() - started, 4)}
+
+
+readiness_probe = ReadinessProbe()
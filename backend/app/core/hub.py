@@ -0,0 +1,276 @@
+"""Рассылка уведомлений по WebSocket-соединениям пользователей.
+
+Каждое соединение получает сообщения через свою ограниченную очередь:
+отправка в медленный сокет не задерживает остальных. Если очередь
+переполнена, клиент не успевает читать - соединение закрывается,
+клиент переподключается и дочитывает пропущенное через `/users/changes`.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+
+import orjson
+from loguru import logger
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from core.metrics import metrics
+
+try:
+    from redis import asyncio as redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+# закрытие соединения сервером (RFC 6455)
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_GOING_AWAY = 1001
+CLOSE_TRY_AGAIN_LATER = 1013
+
+PING = orjson.dumps({"type": "ping"}).decode()
+
+# браузерный клиент передает токен подпротоколами: `["bearer", <token>]`,
+# сервер подтверждает только `bearer`
+AUTH_SUBPROTOCOL = "bearer"
+
+
+class Connection:
+    """Соединение пользователя с очередью исходящих сообщений."""
+
+    __slots__ = ("websocket", "user_id", "queue", "last_seen", "_closing")
+
+    def __init__(self, websocket: WebSocket, user_id: int, queue_size: int) -> None:
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(queue_size)
+        self.last_seen = time.monotonic()
+        self._closing: asyncio.Task | None = None
+
+    def send(self, message: str) -> bool:
+        """Ставит сообщение в очередь. `False`, если очередь переполнена."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self, code: int, reason: str) -> None:
+        if self._closing is None:
+            self._closing = asyncio.create_task(self._close(code, reason))
+
+    async def _close(self, code: int, reason: str) -> None:
+        try:
+            await self.websocket.close(code, reason)
+        except Exception:
+            pass
+
+    async def _send_loop(self) -> None:
+        while True:
+            message = await self.queue.get()
+            await self.websocket.send_text(message)
+
+    async def run(self) -> None:
+        """Передает сообщения из очереди и читает клиента до отключения.
+
+        Любое сообщение клиента (например, ответ на `ping`) продлевает
+        соединение для проверки heartbeat.
+        """
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            while self._closing is None:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                self.last_seen = time.monotonic()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            if self._closing is not None:
+                await self._closing
+
+
+class RedisBackplane:
+    """Передача сообщений `hub.publish` между воркерами через Redis pub/sub."""
+
+    def __init__(self, url: str, channel: str) -> None:
+        if redis is None:
+            raise RuntimeError("WS_REDIS_URL requires the `redis` package")
+        self.channel = channel
+        self._client = redis.from_url(url)
+        self._task: asyncio.Task | None = None
+
+    async def publish(self, user_id: int, message: str) -> None:
+        await self._client.publish(
+            self.channel, orjson.dumps({"user_id": user_id, "message": message})
+        )
+
+    async def _listen(self, hub: "NotificationHub") -> None:
+        while True:
+            try:
+                async with self._client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for item in pubsub.listen():
+                        if item["type"] != "message":
+                            continue
+                        data = orjson.loads(item["data"])
+                        hub.deliver(data["user_id"], data["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("WebSocket backplane failed {}", e)
+                await asyncio.sleep(1)
+
+    def start(self, hub: "NotificationHub") -> None:
+        self._task = asyncio.create_task(self._listen(hub), name="ws-backplane")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._client.aclose()
+
+
+class NotificationHub:
+    """Соединения процесса по `user_id`.
+
+    - события пользователей приходят от `outbox_relay` (релей каждого
+      воркера читает общую таблицу, поэтому доходят до всех воркеров);
+    - `publish` для остальных уведомлений идет через `backplane`, если он задан;
+    - раз в `heartbeat_interval` клиентам отправляется `ping`, соединения
+      без сообщений от клиента дольше `heartbeat_timeout` закрываются.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20000,
+        queue_size: int = 64,
+        heartbeat_interval: float = 30.0,
+        heartbeat_timeout: float = 90.0,
+    ) -> None:
+        self.max_connections = max_connections
+        self.queue_size = queue_size
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.backplane: RedisBackplane | None = None
+        self._connections: dict[int, set[Connection]] = defaultdict(set)
+        self._count = 0
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    async def connect(self, websocket: WebSocket, user_id: int) -> Connection | None:
+        """Принимает соединение. `None`, если достигнут `max_connections`."""
+        if self.max_connections and self._count >= self.max_connections:
+            metrics.inc("ws_rejected_total")
+            await websocket.close(CLOSE_TRY_AGAIN_LATER, "too many connections")
+            return None
+        # без подтверждения запрошенного подпротокола браузер разрывает соединение
+        subprotocol = (
+            AUTH_SUBPROTOCOL
+            if AUTH_SUBPROTOCOL in websocket.scope.get("subprotocols", ())
+            else None
+        )
+        await websocket.accept(subprotocol)
+        connection = Connection(websocket, user_id, self.queue_size)
+        self._connections[user_id].add(connection)
+        self._count += 1
+        metrics.inc("ws_connections")
+        return connection
+
+    def disconnect(self, connection: Connection) -> None:
+        connections = self._connections.get(connection.user_id)
+        if connections is None or connection not in connections:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self._connections[connection.user_id]
+        self._count -= 1
+        metrics.inc("ws_connections", -1)
+
+    def evict(self, connection: Connection, reason: str, code: int) -> None:
+        metrics.inc("ws_evicted_total", reason=reason)
+        connection.close(code, reason)
+        self.disconnect(connection)
+
+    def deliver(self, user_id: int, message: str) -> int:
+        """Отправляет сообщение соединениям пользователя в этом процессе."""
+        delivered = 0
+        for connection in list(self._connections.get(user_id, ())):
+            if connection.send(message):
+                delivered += 1
+            else:
+                self.evict(connection, "slow consumer", CLOSE_TRY_AGAIN_LATER)
+        if delivered:
+            metrics.inc("ws_messages_total", delivered)
+        return delivered
+
+    async def publish(self, user_id: int, message: dict) -> None:
+        """Уведомление пользователю на всех воркерах (или только в этом)."""
+        text = orjson.dumps(message).decode()
+        if self.backplane is not None:
+            await self.backplane.publish(user_id, text)
+        else:
+            self.deliver(user_id, text)
+
+    def close_user(self, user_id: int, code: int, reason: str) -> None:
+        for connection in list(self._connections.get(user_id, ())):
+            self.evict(connection, reason, code)
+
+    def on_outbox_events(self, events: list[dict]) -> None:
+        """Подписчик `outbox_relay`: события пользователя - в его соединения."""
+        for event in events:
+            if event["entity"] != "user" or event["entity_id"] not in self._connections:
+                continue
+            message = {
+                "type": f"user.{event['action']}",
+                "seq": event["seq"],
+                "data": event["data"],
+            }
+            self.deliver(event["entity_id"], orjson.dumps(message).decode())
+            if event["action"] == "deleted" or event["data"].get("is_deleted"):
+                self.close_user(
+                    event["entity_id"], CLOSE_POLICY_VIOLATION, "user deleted"
+                )
+
+    def heartbeat(self) -> None:
+        expired = time.monotonic() - self.heartbeat_timeout
+        for connections in list(self._connections.values()):
+            for connection in list(connections):
+                if connection.last_seen < expired:
+                    self.evict(connection, "heartbeat timeout", CLOSE_GOING_AWAY)
+                elif not connection.send(PING):
+                    self.evict(connection, "slow consumer", CLOSE_TRY_AGAIN_LATER)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.error("WebSocket heartbeat failed {}", e)
+
+    def start(self, backplane: RedisBackplane | None = None) -> None:
+        if self._task is not None:
+            return
+        self.backplane = backplane
+        if backplane is not None:
+            backplane.start(self)
+        self._task = asyncio.create_task(self._run(), name="ws-heartbeat")
+
+    async def stop(self) -> None:
+        """Останавливает heartbeat и закрывает соединения (перед остановкой сервера)."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.backplane is not None:
+            await self.backplane.stop()
+            self.backplane = None
+        for user_id in list(self._connections):
+            self.close_user(user_id, CLOSE_GOING_AWAY, "server shutdown")
+
+
+hub = NotificationHub()
@@ -0,0 +1,245 @@
+"""Очередь фоновых задач с хранением в таблице `job`.
+
+Задача добавляется в ту же транзакцию, что и изменения запроса
+(`job_queue.enqueue(session, ...)`), и становится видна обработчику
+только после `session.commit()`; коммит будит очередь сразу.
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from loguru import logger
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.metrics import metrics
+from core.session_manager import db_manager
+from models.job import Job
+
+JobHandler = Callable[[dict], Awaitable[None]]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobQueue:
+    """Очередь задач процесса.
+
+    - не больше `concurrency` задач выполняются одновременно;
+    - задача захватывается `UPDATE ... WHERE status = 'pending'`,
+      поэтому воркеры разных процессов не выполняют ее дважды;
+    - при ошибке задача повторяется с экспоненциальной задержкой
+      до `max_attempts` попыток, затем получает статус `failed`;
+    - задачи в статусе `running` дольше `stale_seconds` (процесс
+      остановился во время выполнения) возвращаются в очередь при старте.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        max_attempts: int = 5,
+        backoff: float = 2.0,
+        backoff_max: float = 300.0,
+        poll_interval: float = 1.0,
+        stale_seconds: float = 300.0,
+    ) -> None:
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self.handlers: dict[str, JobHandler] = {}
+        self._wakeup = asyncio.Event()
+        self._running: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def handler(self, name: str):
+        """Регистрирует обработчик задачи `name`."""
+
+        def decorator(func: JobHandler) -> JobHandler:
+            self.handlers[name] = func
+            return func
+
+        return decorator
+
+    def enqueue(
+        self,
+        session: AsyncSession,
+        name: str,
+        payload: dict | None = None,
+        delay: float = 0,
+    ) -> Job:
+        """Добавляет задачу в транзакцию сессии.
+
+        Args:
+            session: Сессия запроса (задача сохранится при ее коммите),
+            name: Имя зарегистрированного обработчика,
+            payload: Данные задачи (JSON),
+            delay: Задержка запуска в секундах.
+        """
+        if name not in self.handlers:
+            raise ValueError(f"Unknown job {name!r}")
+        job = Job(
+            name=name,
+            payload=payload or {},
+            run_at=_now() + timedelta(seconds=delay),
+        )
+        session.add(job)
+        session.info["enqueued_jobs"] = True
+        return job
+
+    def wakeup(self) -> None:
+        self._wakeup.set()
+
+    async def recover(self) -> int:
+        """Возвращает в очередь зависшие задачи `running`."""
+        async with db_manager.session() as session:
+            res = await session.execute(
+                update(Job)
+                .where(Job.status == "running")
+                .where(Job.updated_at < _now() - timedelta(seconds=self.stale_seconds))
+                .values(status="pending")
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        return res.rowcount
+
+    async def run_pending(self) -> int:
+        """Захватывает готовые задачи на свободные места и запускает их."""
+        free = self.concurrency - len(self._running)
+        if free <= 0:
+            return 0
+        async with db_manager.session() as session:
+            ids = (
+                await session.scalars(
+                    select(Job.id)
+                    .where(Job.status == "pending", Job.run_at <= _now())
+                    .order_by(Job.run_at, Job.id)
+                    .limit(free)
+                )
+            ).all()
+            if not ids:
+                return 0
+            claimed = (
+                await session.execute(
+                    update(Job)
+                    .where(Job.id.in_(ids), Job.status == "pending")
+                    .values(status="running", attempts=Job.attempts + 1)
+                    .returning(Job.id, Job.name, Job.payload, Job.attempts)
+                    .execution_options(synchronize_session=False)
+                )
+            ).all()
+            await session.commit()
+        for job in claimed:
+            task = asyncio.create_task(self._execute(job), name=f"job-{job.id}")
+            self._running.add(task)
+            task.add_done_callback(self._task_done)
+        return len(claimed)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        self.wakeup()
+
+    async def _execute(self, job) -> None:
+        handler = self.handlers.get(job.name)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for job {job.name!r}")
+            await handler(job.payload)
+        except Exception as e:
+            await self._fail(job, e)
+        else:
+            await self._set(job.id, status="done", last_error=None)
+            metrics.inc("jobs_total", job=job.name, result="done")
+
+    async def _fail(self, job, error: Exception) -> None:
+        if job.attempts >= self.max_attempts:
+            logger.error("Job {} {} failed: {!r}", job.name, job.id, error)
+            await self._set(job.id, status="failed", last_error=repr(error))
+            metrics.inc("jobs_total", job=job.name, result="failed")
+            return
+        delay = min(self.backoff * 2 ** (job.attempts - 1), self.backoff_max)
+        delay *= random.uniform(0.5, 1.0)  # разнести повторы во времени
+        logger.warning(
+            "Job {} {} attempt {} failed, retry in {:.1f}s: {!r}",
+            job.name,
+            job.id,
+            job.attempts,
+            delay,
+            error,
+        )
+        await self._set(
+            job.id,
+            status="pending",
+            run_at=_now() + timedelta(seconds=delay),
+            last_error=repr(error),
+        )
+        metrics.inc("jobs_total", job=job.name, result="retry")
+
+    @staticmethod
+    async def _set(job_id: int, **values) -> None:
+        async with db_manager.session() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+    async def _run(self) -> None:
+        try:
+            await self.recover()
+        except Exception as e:
+            logger.error("Job recovery failed {}", e)
+        while True:
+            try:
+                await self.run_pending()
+            except Exception as e:
+                logger.error("Job queue poll failed {}", e)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="job-queue")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Останавливает опрос и ждет выполняющиеся задачи не дольше `timeout`.
+
+        Незавершенные задачи отменяются и вернутся в очередь через `recover`.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._running:
+            _, pending = await asyncio.wait(self._running, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+job_queue = JobQueue()
+
+
+@event.listens_for(Session, "after_commit")
+def _wakeup_after_commit(session: Session) -> None:
+    if session.info.pop("enqueued_jobs", False):
+        job_queue.wakeup()
@@ -0,0 +1,167 @@
+"""Структурированные логи с контекстом HTTP-запроса.
+
+- `request_id` текущего запроса (contextvar) добавляется в каждую запись,
+  в том числе в записи событий SQL (медленные запросы, N+1);
+- запись в sink выполняет отдельный поток (`enqueue`), event loop не ждет вывода;
+- JSON-формат для сбора логов, одна строка на запись;
+- выборка записей по уровням: для запроса решение принимается по его
+  `request_id`, поэтому записи одного запроса сохраняются или отбрасываются вместе;
+- `RequestLogContext` накапливает время этапов запроса (БД, ожидание пула)
+  для лога медленных запросов.
+"""
+
+import sys
+import traceback
+import uuid
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, TextIO
+
+import orjson
+from loguru import logger
+
+from core.metrics import metrics
+
+TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+    "{extra[request_id]} | <cyan>{name}</cyan>:<cyan>{function}</cyan>:"
+    "<cyan>{line}</cyan> - <level>{message}</level>"
+)
+# поля записи, которые не попадают в `extra` JSON-строки
+_SERVICE_EXTRA = {"request_id", "_json"}
+
+
+class RequestLogContext:
+    """Контекст HTTP-запроса для логов: id и время этапов."""
+
+    __slots__ = ("request_id", "timings", "counts")
+
+    def __init__(self, request_id: str) -> None:
+        self.request_id = request_id
+        self.timings: defaultdict[str, float] = defaultdict(float)
+        self.counts: defaultdict[str, int] = defaultdict(int)
+
+    def breakdown(self) -> dict:
+        """Время этапов в миллисекундах и их количество."""
+        return {
+            name: {"ms": round(seconds * 1000, 3), "count": self.counts[name]}
+            for name, seconds in self.timings.items()
+        }
+
+
+_context: ContextVar[RequestLogContext | None] = ContextVar(
+    "request_log_context", default=None
+)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_request_id() -> str | None:
+    context = _context.get()
+    return context.request_id if context is not None else None
+
+
+@contextmanager
+def request_context(request_id: str) -> Iterator[RequestLogContext]:
+    """Контекст логов запроса на время обработки (contextvar)."""
+    token = _context.set(RequestLogContext(request_id))
+    try:
+        yield _context.get()
+    finally:
+        _context.reset(token)
+
+
+def add_timing(name: str, seconds: float) -> None:
+    """Добавляет время этапа к текущему запросу (вне запроса - ничего)."""
+    context = _context.get()
+    if context is not None:
+        context.timings[name] += seconds
+        context.counts[name] += 1
+
+
+def _patch(record) -> None:
+    context = _context.get()
+    record["extra"]["request_id"] = context.request_id if context else ""
+
+
+def _json_format(record) -> str:
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+    }
+    extra = record["extra"]
+    if extra.get("request_id"):
+        payload["request_id"] = extra["request_id"]
+    fields = {k: v for k, v in extra.items() if k not in _SERVICE_EXTRA}
+    if fields:
+        payload["extra"] = fields
+    if record["exception"] is not None:
+        payload["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    extra["_json"] = orjson.dumps(payload, default=str).decode()
+    return "{extra[_json]}\n"
+
+
+class LogSampler:
+    """Фильтр sink: сохраняет долю `rates[level]` записей уровня.
+
+    Записи вне HTTP-запроса (запуск, фоновые задачи) сохраняются всегда.
+    """
+
+    def __init__(self, rates: dict[str, float] | None = None) -> None:
+        self.rates = {
+            level.upper(): rate for level, rate in (rates or {}).items() if rate < 1
+        }
+
+    def __call__(self, record) -> bool:
+        rate = self.rates.get(record["level"].name)
+        if rate is None:
+            return True
+        request_id = record["extra"].get("request_id")
+        if not request_id:
+            return True
+        if zlib.crc32(request_id.encode()) < rate * 2**32:
+            return True
+        metrics.inc("log_sampled_out_total", level=record["level"].name)
+        return False
+
+
+def configure_logging(
+    level: str = "INFO",
+    json: bool = False,
+    enqueue: bool = True,
+    sampling: dict[str, float] | None = None,
+    sink: TextIO = sys.stderr,
+) -> int:
+    """Заменяет sink loguru по умолчанию.
+
+    Args:
+        level: Минимальный уровень,
+        json: JSON-строки вместо текста,
+        enqueue: Запись в отдельном потоке,
+        sampling: Доля сохраняемых записей по уровням, например `{"INFO": 0.1}`,
+        sink: Поток вывода.
+
+    Returns:
+        id sink loguru.
+    """
+    logger.remove()
+    logger.configure(patcher=_patch)
+    sampler = LogSampler(sampling)
+    return logger.add(
+        sink,
+        level=level.upper(),
+        format=_json_format if json else TEXT_FORMAT,
+        filter=sampler if sampler.rates else None,
+        enqueue=enqueue,
+        colorize=False if json else None,
+        backtrace=False,
+        diagnose=False,
+    )
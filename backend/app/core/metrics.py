@@ -0,0 +1,85 @@
+"""Метрики приложения, собираемые в памяти процесса."""
+
+import math
+import threading
+from collections import defaultdict, deque
+
+
+class LatencyWindow:
+    """Скользящее окно последних значений для расчета перцентилей."""
+
+    def __init__(self, size: int = 1024) -> None:
+        self._values: deque[float] = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self._values.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q: float) -> float | None:
+        """Перцентиль по значениям окна (`q` от 0 до 100)."""
+        if not self._values:
+            return None
+        values = sorted(self._values)
+        index = max(math.ceil(q / 100 * len(values)) - 1, 0)
+        return values[index]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+        }
+
+
+class Metrics:
+    """Реестр счетчиков и окон задержек.
+
+    Метки передаются именованными параметрами:
+    `metrics.inc("http_requests", route="/users/")`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = defaultdict(float)
+        self._windows: dict[tuple, LatencyWindow] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = LatencyWindow()
+            window.observe(value)
+
+    def window(self, name: str, **labels) -> LatencyWindow | None:
+        return self._windows.get(self._key(name, labels))
+
+    def percentile(self, name: str, q: float, **labels) -> float | None:
+        window = self.window(name, **labels)
+        return window.percentile(q) if window else None
+
+    def snapshot(self) -> dict:
+        """Все метрики в виде словаря `{имя: [{labels, value}]}`."""
+        result = defaultdict(list)
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                result[name].append({"labels": dict(labels), "value": value})
+            for (name, labels), window in self._windows.items():
+                result[name].append({"labels": dict(labels), **window.snapshot()})
+        return dict(result)
+
+
+metrics = Metrics()
@@ -0,0 +1,447 @@
+"""ASGI middleware приложения."""
+
+import asyncio
+import math
+import re
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from loguru import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.admission import pool_wait
+from core.compression import (
+    DEFAULT_LEVELS,
+    ENCODERS,
+    CompressedCache,
+    compress,
+    negotiate,
+)
+from core.deadline import StatementCancelled, StatementDeadline, statement_deadlines
+from core.logging import RequestLogContext, new_request_id, request_context
+from core.metrics import metrics
+from core.replicas import write_marker
+from core.monitoring import blocking_call_detector, route_name
+from core.sql_profiler import sql_profiler
+
+
+_REQUEST_ID = re.compile(r"[\w.:-]{1,128}")
+
+
+class RequestContextMiddleware:
+    """Id запроса для логов и лог медленных запросов.
+
+    Id берется из заголовка `header` (если он корректен) или создается,
+    доступен всем записям лога запроса и возвращается в ответе.
+    Запрос дольше `slow_seconds` записывается с временем этапов:
+    до начала ответа, запросы к БД, ожидание соединения пула.
+    """
+
+    def __init__(
+        self, app: ASGIApp, header: str = "X-Request-ID", slow_seconds: float = 1.0
+    ) -> None:
+        self.app = app
+        self.header = header
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(self.header)
+        if not request_id or not _REQUEST_ID.fullmatch(request_id):
+            request_id = new_request_id()
+        with request_context(request_id) as context:
+            if scope["type"] == "websocket":
+                await self.app(scope, receive, send)
+            else:
+                await self._http(scope, receive, send, context)
+
+    async def _http(
+        self, scope: Scope, receive: Receive, send: Send, context: RequestLogContext
+    ) -> None:
+        request_id = context.request_id
+        started = time.perf_counter()
+        response_started = None
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started, status_code
+            if message["type"] == "http.response.start":
+                response_started = time.perf_counter()
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(self.header, request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            if self.slow_seconds and duration >= self.slow_seconds:
+                timings = context.breakdown()
+                if response_started is not None:
+                    timings["response_start"] = {
+                        "ms": round((response_started - started) * 1000, 3)
+                    }
+                route = route_name(scope)
+                metrics.inc("http_slow_requests_total", route=route)
+                logger.bind(
+                    route=route,
+                    status=status_code,
+                    duration_ms=round(duration * 1000, 3),
+                    timings=timings,
+                ).warning(
+                    "Slow request {} {} {:.3f}s", scope["method"], route, duration
+                )
+
+
+class RequestMetricsMiddleware:
+    """Записывает длительность HTTP-запросов в метрики.
+
+    Чистое ASGI middleware: в отличие от `BaseHTTPMiddleware`
+    не создает дополнительных задач и не буферизует ответ.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if blocking_call_detector.running:
+            blocking_call_detector.track(scope)
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.observe(
+                "http_request_duration_seconds", time.perf_counter() - started
+            )
+            metrics.inc("http_requests_total", status=status_code)
+
+
+class ReadYourWritesMiddleware:
+    """Возвращает клиенту время записи в БД, сделанной запросом.
+
+    После коммита с записью ответ получает cookie `cookie` (живет `window`
+    секунд) и заголовок `header` со временем записи. По ним любой воркер
+    читает данные клиента с основной БД (`get_read_session`). Клиенты без
+    cookie могут вернуть значение заголовка в одноименном заголовке запроса.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        window: float,
+        cookie: str = "last_write",
+        header: str = "X-Last-Write",
+    ) -> None:
+        self.app = app
+        self.window = window
+        self.cookie = cookie
+        self.header = header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with write_marker.request() as written:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and written:
+                    value = f"{written[0]:.3f}"
+                    headers = MutableHeaders(scope=message)
+                    headers.append(self.header, value)
+                    headers.append(
+                        "Set-Cookie",
+                        f"{self.cookie}={value}; Max-Age={math.ceil(self.window)}; "
+                        "Path=/; HttpOnly; SameSite=Lax",
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+class SQLProfilerMiddleware:
+    """Открывает профиль SQL-запросов на время обработки HTTP-запроса.
+
+    В режиме отладки добавляет к ответу заголовок `X-SQL-Profile`.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = sql_profiler.start(scope["method"], scope["path"])
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and sql_profiler.debug:
+                headers = MutableHeaders(scope=message)
+                headers.append("X-SQL-Profile", sql_profiler.header(profile))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sql_profiler.finish(profile, route_name(scope))
+
+
+class CompressionMiddleware:
+    """Сжатие ответов по `Accept-Encoding` (br, zstd, gzip).
+
+    - ответы меньше `min_size` и типы не из `levels` не сжимаются;
+    - уровень задается по префиксу типа содержимого и кодировке;
+    - потоковые ответы (`StreamingResponse`) сжимаются по частям;
+    - сжатые тела ответов с `ETag` кэшируются, большие тела сжимаются в потоке.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        min_size: int = 1024,
+        levels: dict[str, dict[str, int]] | None = None,
+        thread_min_size: int = 256 * 1024,
+        cache_size: int = 256,
+    ) -> None:
+        self.app = app
+        self.min_size = min_size
+        # длинные префиксы проверяются первыми
+        self.levels = sorted(
+            (levels or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.thread_min_size = thread_min_size
+        self.cache = CompressedCache(cache_size)
+
+    def _level(self, content_type: str, encoding: str) -> int | None:
+        content_type = content_type.partition(";")[0].strip().lower()
+        for prefix, levels in self.levels:
+            if content_type.startswith(prefix):
+                return levels.get(encoding, DEFAULT_LEVELS[encoding])
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        level: int | None = None
+        encoder = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, level, encoder
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    message["status"] not in (204, 304)
+                    and "content-encoding" not in headers
+                    and "no-transform" not in headers.get("cache-control", "")
+                    and int(headers.get("content-length", self.min_size))
+                    >= self.min_size
+                ):
+                    level = self._level(headers.get("content-type", ""), encoding)
+                if level is None:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] != "http.response.body" or level is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                response_start, start = start, None
+                headers = MutableHeaders(scope=response_start)
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body:
+                    if len(body) < self.min_size:
+                        level = None
+                        await send(response_start)
+                        await send(message)
+                        return
+                    body = await self._compress_body(
+                        scope, headers.get("etag"), encoding, level, body
+                    )
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    await send(response_start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                # потоковый ответ: длина заранее неизвестна
+                del headers["Content-Length"]
+                headers["Content-Encoding"] = encoding
+                encoder = ENCODERS[encoding](level)
+                await send(response_start)
+
+            chunk = encoder.process(body, flush=more_body)
+            if not more_body:
+                chunk += encoder.finish()
+            metrics.inc("http_compression_bytes_total", len(body), encoding="identity")
+            metrics.inc("http_compression_bytes_total", len(chunk), encoding=encoding)
+            await send(
+                {"type": "http.response.body", "body": chunk, "more_body": more_body}
+            )
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _compress_body(
+        self, scope: Scope, etag: str | None, encoding: str, level: int, body: bytes
+    ) -> bytes:
+        key = (scope["path"], scope["query_string"], etag, encoding, level)
+        if etag is not None:
+            compressed = self.cache.get(key)
+            if compressed is not None:
+                metrics.inc("http_compression_cache_hits_total")
+                return compressed
+        if len(body) >= self.thread_min_size:
+            compressed = await asyncio.to_thread(compress, encoding, level, body)
+        else:
+            compressed = compress(encoding, level, body)
+        metrics.inc("http_compression_bytes_total", len(body), encoding="identity")
+        metrics.inc("http_compression_bytes_total", len(compressed), encoding=encoding)
+        if etag is not None:
+            self.cache.put(key, compressed)
+        return compressed
+
+
+class AdmissionMiddleware:
+    """Сброс нагрузки до начала обработки запроса.
+
+    Отвечает 503 с `Retry-After`, если в воркере уже `max_in_flight`
+    запросов или сглаженное время ожидания соединения с БД
+    больше `pool_wait_max`. Пути из `exempt_paths` (пробы) не ограничиваются.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_in_flight: int = 0,
+        pool_wait_max: float = 0.0,
+        retry_after: int = 1,
+        exempt_paths: list[str] | None = None,
+    ) -> None:
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.pool_wait_max = pool_wait_max
+        self.retry_after = retry_after
+        self.exempt_paths = tuple(exempt_paths or ())
+        self.in_flight = 0
+
+    def _shed_reason(self) -> str | None:
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        if self.pool_wait_max and pool_wait.value > self.pool_wait_max:
+            return "pool_wait"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        reason = self._shed_reason()
+        if reason is not None:
+            metrics.inc("admission_shed_total", reason=reason)
+            response = JSONResponse(
+                {"detail": "Service overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+
+class StatementDeadlineMiddleware:
+    """Таймаут SQL-запросов и отмена обработки при отключении клиента.
+
+    Открывает `StatementDeadline` на время HTTP-запроса. Для методов из
+    `cancel_methods` обработчик выполняется в отдельной задаче: если клиент
+    отключился до начала ответа, запросы к БД прерываются, а задача отменяется.
+    """
+
+    def __init__(self, app: ASGIApp, cancel_methods: list[str] | None = None) -> None:
+        self.app = app
+        self.cancel_methods = frozenset(cancel_methods or ())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with statement_deadlines.request(scope) as deadline:
+            if scope["method"] in self.cancel_methods:
+                await self._run_cancellable(scope, receive, send, deadline)
+            else:
+                await self.app(scope, receive, send)
+
+    async def _run_cancellable(
+        self, scope: Scope, receive: Receive, send: Send, deadline: StatementDeadline
+    ) -> None:
+        # сообщения клиента читает `listen`, обработчик получает их через очередь
+        messages: asyncio.Queue[Message] = asyncio.Queue(maxsize=1)
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        task = asyncio.create_task(self.app(scope, messages.get, send_wrapper))
+
+        async def listen() -> None:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    if not response_started and not task.done():
+                        deadline.cancel()
+                        task.cancel()
+                    await messages.put(message)
+                    return
+                await messages.put(message)
+
+        listener = asyncio.create_task(listen())
+        try:
+            await asyncio.wait((task,))
+        except asyncio.CancelledError:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise
+        finally:
+            listener.cancel()
+        if task.cancelled() or (
+            deadline.cancelled and isinstance(task.exception(), StatementCancelled)
+        ):
+            metrics.inc("http_requests_cancelled_total", route=route_name(scope))
+            return
+        task.result()
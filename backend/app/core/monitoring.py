@@ -0,0 +1,166 @@
+"""Наблюдение за состоянием event loop."""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+
+from loguru import logger
+from starlette.types import Scope
+
+from core.metrics import metrics
+
+
+class EventLoopLagMonitor:
+    """Измеряет задержку event loop.
+
+    Фоновая задача засыпает на `interval` секунд и сравнивает, насколько
+    позже она проснулась. Разница - время, в течение которого loop был
+    занят другими callback-ами.
+    """
+
+    def __init__(self, interval: float = 0.5, recent: int = 10) -> None:
+        self.interval = interval
+        self._recent: deque[float] = deque(maxlen=recent)
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self._recent.append(lag)
+            metrics.observe("event_loop_lag_seconds", lag)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    @property
+    def lag(self) -> float:
+        """Максимальная задержка за последние `recent` измерений."""
+        return max(self._recent, default=0.0)
+
+
+class BlockingCallDetector:
+    """Обнаруживает блокирующие вызовы внутри event loop.
+
+    Задача в loop обновляет метку времени каждые `interval` секунд,
+    а отдельный поток-наблюдатель проверяет ее. Если метка не обновлялась
+    дольше `threshold`, loop занят одним callback-ом: поток снимает стек
+    потока loop в этот момент (то есть стек самой блокирующей корутины),
+    определяет маршрут текущего запроса и пишет метрику и лог.
+
+    Накладные расходы - одно пробуждение задачи за `interval`
+    и один поток, который почти все время спит.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.02) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self._beat = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._scopes: weakref.WeakKeyDictionary[asyncio.Task, Scope] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def track(self, scope: Scope) -> None:
+        """Связывает текущую задачу с запросом для атрибуции по маршруту."""
+        task = asyncio.current_task()
+        if task is not None:
+            self._scopes[task] = scope
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._beat
+            blocked_for = time.monotonic() - beat
+            if blocked_for < self.threshold or beat == reported_beat:
+                continue
+            # одна блокировка - один отчет, даже если она длится долго
+            reported_beat = beat
+            self._report(blocked_for)
+
+    def _report(self, blocked_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame, limit=20) if frame else []
+        task = asyncio.current_task(self._loop)
+        scope = self._scopes.get(task) if task is not None else None
+        route = route_name(scope) if scope else "<no request>"
+
+        metrics.inc("event_loop_blocked_total", route=route)
+        metrics.observe("event_loop_blocked_seconds", blocked_for, route=route)
+        logger.bind(
+            route=route,
+            blocked_for=round(blocked_for, 4),
+            task=task.get_name() if task else None,
+            stack="".join(stack),
+        ).warning(
+            "Event loop blocked for at least {:.3f}s in {} at {}",
+            blocked_for,
+            route,
+            stack[-1].strip().splitlines()[0] if stack else "<unknown>",
+        )
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="blocking-detector")
+        self._thread = threading.Thread(
+            target=self._watch, name="blocking-detector", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+
+def route_name(scope: Scope) -> str:
+    """Шаблон маршрута запроса (`/api/v1/users/{user_id}`) или его путь."""
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or scope.get("path", "")
+
+
+loop_lag_monitor = EventLoopLagMonitor()
+blocking_call_detector = BlockingCallDetector()
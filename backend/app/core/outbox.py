@@ -0,0 +1,175 @@
+"""Публикация событий из таблицы `outbox_event` (transactional outbox).
+
+События пишутся репозиториями в транзакции изменения. Релей каждого
+процесса читает новые события пачками по порядку `id` и передает их
+подписчикам процесса; ожидающие long-poll запросы просыпаются.
+
+На PostgreSQL `id` выдается до коммита, и транзакция с меньшим `id` может
+закоммититься позже. Поэтому релей публикует события только до первого
+пропуска в `id`; пропуск, который не заполнился за `gap_timeout` секунд
+(откаченная транзакция), пропускается. `last_seq` релея - граница видимости
+для API изменений: до нее все закоммиченные события уже видны.
+"""
+
+import asyncio
+import inspect
+import time
+from typing import Awaitable, Callable
+
+from loguru import logger
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from core.metrics import metrics
+from core.session_manager import db_manager
+from models.outbox import OutboxEvent
+
+Subscriber = Callable[[list[dict]], Awaitable[None] | None]
+
+
+def event_to_dict(row: OutboxEvent) -> dict:
+    return {
+        "seq": row.id,
+        "entity": row.entity,
+        "entity_id": row.entity_id,
+        "action": row.action,
+        "data": row.data,
+        "created_at": row.created_at,
+    }
+
+
+class OutboxRelay:
+    """Релей событий outbox.
+
+    Новые события ищутся после каждого коммита с событиями в этом процессе
+    и раз в `poll_interval` секунд (события других процессов).
+    Доставка подписчикам - не меньше одного раза, по возрастанию `seq`.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        gap_timeout: float = 5.0,
+    ) -> None:
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.gap_timeout = gap_timeout
+        self.last_seq = 0
+        # (`id` в начале пропуска, когда пропуск замечен)
+        self._gap: tuple[int, float] | None = None
+        self._subscribers: list[Subscriber] = []
+        self._wakeup = asyncio.Event()
+        self._published = asyncio.Condition()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.remove(subscriber)
+
+    def wakeup(self) -> None:
+        self._wakeup.set()
+
+    async def wait(self, since: int, timeout: float) -> bool:
+        """Ждет событие с `seq > since` не дольше `timeout` секунд."""
+        async with self._published:
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._published.wait_for(lambda: self.last_seq > since)
+            except TimeoutError:
+                return False
+        return True
+
+    def _contiguous(self, rows: list[OutboxEvent]) -> list[OutboxEvent]:
+        """Начало пачки без пропусков `id` после `last_seq`.
+
+        Пропуск ждет не дольше `gap_timeout` секунд с момента, когда он
+        замечен: транзакция с этим `id` еще может закоммититься.
+        """
+        expected = self.last_seq + 1
+        for i, row in enumerate(rows):
+            if row.id != expected:
+                if self._gap is None or self._gap[0] != expected:
+                    self._gap = (expected, time.monotonic())
+                if time.monotonic() - self._gap[1] < self.gap_timeout:
+                    return rows[:i]
+                logger.warning("Outbox gap {}..{} skipped", expected, row.id - 1)
+                metrics.inc("outbox_gaps_skipped_total")
+            expected = row.id + 1
+        return rows
+
+    async def publish_pending(self) -> int:
+        """Читает и публикует события после `last_seq`. Возвращает их число."""
+        published = 0
+        while True:
+            async with db_manager.session() as session:
+                rows = (
+                    await session.scalars(
+                        select(OutboxEvent)
+                        .where(OutboxEvent.id > self.last_seq)
+                        .order_by(OutboxEvent.id)
+                        .limit(self.batch_size)
+                    )
+                ).all()
+            ready = self._contiguous(rows)
+            if not ready:
+                return published
+            events = [event_to_dict(row) for row in ready]
+            for subscriber in list(self._subscribers):
+                try:
+                    result = subscriber(events)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.error("Outbox subscriber {} failed {}", subscriber, e)
+            async with self._published:
+                self.last_seq = events[-1]["seq"]
+                self._published.notify_all()
+            published += len(events)
+            metrics.inc("outbox_published_total", len(events))
+            if len(ready) < self.batch_size:
+                return published
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.publish_pending()
+            except Exception as e:
+                logger.error("Outbox relay failed {}", e)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def start(self) -> None:
+        """Запускает релей с последнего события в БД (старые не публикуются)."""
+        if self._task is not None:
+            return
+        async with db_manager.session() as session:
+            self.last_seq = await session.scalar(select(func.max(OutboxEvent.id))) or 0
+        self._task = asyncio.create_task(self._run(), name="outbox-relay")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+outbox_relay = OutboxRelay()
+
+
+@event.listens_for(Session, "after_commit")
+def _wakeup_after_commit(session: Session) -> None:
+    if session.info.pop("outbox", False):
+        outbox_relay.wakeup()
@@ -0,0 +1,31 @@
+"""Права доступа: биты `Permission` и их набор у ролей и пользователей."""
+
+import enum
+from functools import reduce
+from operator import or_
+
+
+class Permission(enum.IntFlag):
+    """Право доступа - один бит. Значения хранятся в `role.permissions`.
+
+    Значения существующих прав не меняются, новые получают следующий бит.
+    """
+
+    USER_CHANGES_READ = 1 << 0
+    USER_UPDATE = 1 << 1
+    USER_DELETE = 1 << 2
+    ROLE_MANAGE = 1 << 3
+    AUDIT_READ = 1 << 4
+
+
+# права суперпользователя (`User.is_superuser`)
+ALL_PERMISSIONS = int(reduce(or_, Permission))
+
+
+def permission_mask(names) -> int:
+    """Набор прав по именам (`USER_UPDATE`, ...). Неизвестное имя - `KeyError`."""
+    return reduce(or_, (int(Permission[name]) for name in names), 0)
+
+
+def permission_names(mask: int) -> list[str]:
+    return [permission.name for permission in Permission if mask & permission]
@@ -0,0 +1,177 @@
+"""Реплики БД для чтения."""
+
+import asyncio
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from core.metrics import metrics
+
+
+@dataclass(eq=False)
+class Replica:
+    name: str
+    engine: AsyncEngine
+    session_maker: async_sessionmaker[AsyncSession]
+    healthy: bool = True
+
+    @property
+    def connections(self) -> int:
+        pool = self.engine.pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+
+class ReplicaSet:
+    """Набор реплик с выбором по стратегии и исключением недоступных.
+
+    Стратегии: `round_robin` - по очереди, `least_connections` - реплика
+    с наименьшим количеством занятых соединений пула.
+    Реплика исключается при ошибке соединения или проверки и возвращается,
+    когда фоновая проверка (`SELECT 1`) снова проходит.
+    """
+
+    STRATEGIES = ("round_robin", "least_connections")
+
+    def __init__(self, replicas: list[Replica], strategy: str = "round_robin") -> None:
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown replica strategy {strategy!r}")
+        self.replicas = replicas
+        self.strategy = strategy
+        self._cycle = itertools.cycle(replicas)
+        self._task: asyncio.Task | None = None
+
+    def choose(self) -> Replica | None:
+        """Возвращает доступную реплику или `None`, если таких нет."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if self.strategy == "least_connections":
+            return min(healthy, key=lambda replica: replica.connections)
+        for replica in self._cycle:
+            if replica.healthy:
+                return replica
+
+    def eject(self, replica: Replica, reason: str) -> None:
+        if replica.healthy:
+            replica.healthy = False
+            metrics.inc("db_replica_ejected_total", replica=replica.name)
+            logger.warning("Replica {} ejected: {}", replica.name, reason)
+
+    async def check(self, timeout: float) -> None:
+        """Проверяет все реплики и обновляет их доступность."""
+        for replica in self.replicas:
+            try:
+                async with asyncio.timeout(timeout):
+                    async with replica.engine.connect() as connection:
+                        await connection.execute(text("SELECT 1"))
+            except Exception as e:
+                self.eject(replica, type(e).__name__)
+                continue
+            if not replica.healthy:
+                replica.healthy = True
+                logger.info("Replica {} is back", replica.name)
+
+    async def _run(self, interval: float, timeout: float) -> None:
+        while True:
+            await self.check(timeout)
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float, timeout: float) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(
+                self._run(interval, timeout), name="replica-health-check"
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def dispose(self) -> None:
+        await self.stop()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def status(self) -> list[dict]:
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "connections": replica.connections,
+            }
+            for replica in self.replicas
+        ]
+
+
+class RecentWrites:
+    """Ключи клиентов, недавно писавших в БД (read-your-writes).
+
+    Пока окно `window` не истекло, чтение для такого клиента
+    выполняется на основной БД, а не на реплике.
+    """
+
+    def __init__(self, window: float = 5.0, max_size: int = 10_000) -> None:
+        self.window = window
+        self.max_size = max_size
+        self._expires: dict[str, float] = {}
+
+    def mark(self, key: str) -> None:
+        now = time.monotonic()
+        if len(self._expires) >= self.max_size:
+            self._expires = {k: t for k, t in self._expires.items() if t > now}
+        self._expires[key] = now + self.window
+
+    def __contains__(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        return expires is not None and expires > time.monotonic()
+
+    def fresh(self, last_write: str | None) -> bool:
+        """Время записи клиента (unix, из cookie/заголовка) внутри окна."""
+        try:
+            written = float(last_write)
+        except (TypeError, ValueError):
+            return False
+        return 0 <= time.time() - written < self.window
+
+
+class WriteMarker:
+    """Время последнего коммита с записью в текущем HTTP-запросе.
+
+    `RecentWrites` хранится в памяти процесса, а следующий запрос клиента
+    может попасть в другой воркер. Поэтому время записи возвращается клиенту
+    (cookie и заголовок) и учитывается при выборе БД для чтения.
+    """
+
+    def __init__(self) -> None:
+        self._context: ContextVar[list[float] | None] = ContextVar(
+            "write_marker", default=None
+        )
+
+    @contextmanager
+    def request(self) -> Iterator[list[float]]:
+        """Отслеживание записей на время HTTP-запроса."""
+        written: list[float] = []
+        token = self._context.set(written)
+        try:
+            yield written
+        finally:
+            self._context.reset(token)
+
+    def mark(self) -> None:
+        written = self._context.get()
+        if written is not None:
+            written[:] = [time.time()]
+
+
+write_marker = WriteMarker()
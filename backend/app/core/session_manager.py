@@ -1,7 +1,11 @@
+import os
 from contextlib import asynccontextmanager
 from typing import AsyncIterator, Optional
 
 from loguru import logger
+from sqlalchemy import AsyncAdaptedQueuePool, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import InterfaceError, OperationalError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -9,7 +13,20 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
     AsyncConnection,
 )
+from sqlalchemy.orm import Session
 
+from core.admission import TimedQueuePool, WriterQueuePool
+from core.config import settings
+from core.deadline import statement_deadlines
+from core.metrics import metrics
+from core.replicas import RecentWrites, Replica, ReplicaSet, write_marker
+from core.sql_profiler import sql_profiler
+from core.sqlite import (
+    RoutingSession,
+    is_sqlite_file,
+    set_pragmas,
+    use_immediate_transactions,
+)
 from models.base import DeclarativeBaseModel
 
 
@@ -26,36 +43,222 @@ class DataBaseError(Exception):
     pass
 
 
+def _timed_pool(host: str, engine_kwargs: dict) -> dict:
+    """Подменяет пул по умолчанию на `TimedQueuePool` (время ожидания соединения)."""
+    url = make_url(host)
+    pool_class = url.get_dialect().get_pool_class(url)
+    if "poolclass" in engine_kwargs or not issubclass(
+        pool_class, AsyncAdaptedQueuePool
+    ):
+        return engine_kwargs
+    return {**engine_kwargs, "poolclass": TimedQueuePool}
+
+
 class DatabaseSessionManager(metaclass=Singleton):
     """Синглетон класс для базы данных с поддержкой асинхронности."""
 
     def __init__(self) -> None:
         self._engine: Optional[AsyncEngine] = None
+        self._read_engine: Optional[AsyncEngine] = None
         self._session_maker: Optional[async_sessionmaker[AsyncSession]] = None
+        self._replicas: Optional[ReplicaSet] = None
+        self._recent_writes = RecentWrites()
 
-    def init(self, host: str, engine_kwargs, session_kwargs) -> None:
-        """Инициализирует соединение с базой данных."""
+    def init(
+        self, host: str, engine_kwargs, session_kwargs, replica_hosts=None
+    ) -> None:
+        """Инициализирует соединение с базой данных.
+
+        Args:
+            host: URI основной БД,
+            engine_kwargs: Параметры движка,
+            session_kwargs: Параметры сессии,
+            replica_hosts: URI реплик для чтения.
+        """
 
         engine_kwargs = engine_kwargs if engine_kwargs else {}
         session_kwargs = session_kwargs if session_kwargs else {}
 
-        self._engine = create_async_engine(host, **engine_kwargs)
+        if settings.DB_SQLITE_PROFILE and is_sqlite_file(host):
+            self._init_sqlite(host, engine_kwargs, session_kwargs)
+        else:
+            self._engine = create_async_engine(host, **_timed_pool(host, engine_kwargs))
+            self._session_maker = async_sessionmaker(
+                bind=self._engine,
+                **session_kwargs,
+            )
+        if replica_hosts:
+            self._init_replicas(replica_hosts, engine_kwargs, session_kwargs)
+        self._recent_writes.window = settings.DB_READ_YOUR_WRITES_SECONDS
+
+        statement_deadlines.timeout = settings.DB_STATEMENT_TIMEOUT
+        statement_deadlines.routes = settings.DB_STATEMENT_TIMEOUT_ROUTES
+        for engine in self._engines():
+            statement_deadlines.instrument(engine)
+
+        if settings.SQL_PROFILER_ENABLED:
+            sql_profiler.slow_query_seconds = settings.SQL_SLOW_QUERY_SECONDS
+            sql_profiler.n_plus_one_threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+            sql_profiler.debug = settings.SQL_PROFILER_DEBUG
+            for engine in self._engines():
+                sql_profiler.instrument(engine)
+        logger.info("Database engine created in worker pid={}", os.getpid())
+
+    def init_from_settings(self) -> None:
+        """Инициализирует БД с параметрами из настроек (приложение и скрипты)."""
+        self.init(
+            settings.SQLALCHEMY_DATABASE_URI,
+            {
+                "echo": settings.DB_ECHO,
+                "future": settings.DB_FUTURE,
+                "pool_pre_ping": settings.DB_POOL_PRE_PING,
+                "connect_args": settings.DB_CONNECT_ARGS,
+            },
+            {
+                "autoflush": settings.DB_SESSION_AUTOFLUSH,
+                "autocommit": settings.DB_SESSION_AUTOCOMMIT,
+                "expire_on_commit": settings.DB_SESSION_EXPIRE_ON_COMMIT,
+            },
+            settings.SQLALCHEMY_REPLICA_URIS,
+        )
+
+    def _init_sqlite(self, host: str, engine_kwargs, session_kwargs) -> None:
+        """Профиль SQLite: пул читателей и один писатель на процесс.
+
+        Писатель - пул из одного соединения, поэтому сессии, которым нужна
+        запись, ждут своей очереди в пуле (не дольше `DB_SQLITE_WRITE_TIMEOUT`).
+        """
+        self._engine = create_async_engine(
+            host,
+            poolclass=WriterQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=settings.DB_SQLITE_WRITE_TIMEOUT,
+            **engine_kwargs,
+        )
+        self._read_engine = create_async_engine(
+            host,
+            poolclass=TimedQueuePool,
+            pool_size=settings.DB_SQLITE_READ_POOL_SIZE,
+            max_overflow=0,
+            **engine_kwargs,
+        )
+        set_pragmas(self._engine.sync_engine, settings.DB_SQLITE_PRAGMAS)
+        set_pragmas(
+            self._read_engine.sync_engine, settings.DB_SQLITE_PRAGMAS, query_only=True
+        )
+        use_immediate_transactions(self._engine.sync_engine)
+
+        session_class = type(
+            "SQLiteRoutingSession",
+            (RoutingSession,),
+            {
+                "writer": self._engine.sync_engine,
+                "reader": self._read_engine.sync_engine,
+            },
+        )
         self._session_maker = async_sessionmaker(
-            bind=self._engine,
+            sync_session_class=session_class,
             **session_kwargs,
         )
 
+    def _init_replicas(self, hosts: list[str], engine_kwargs, session_kwargs) -> None:
+        replicas = []
+        for host in hosts:
+            engine = create_async_engine(host, **_timed_pool(host, engine_kwargs))
+            if is_sqlite_file(host):
+                set_pragmas(
+                    engine.sync_engine, settings.DB_SQLITE_PRAGMAS, query_only=True
+                )
+            replicas.append(
+                Replica(
+                    name=make_url(host).render_as_string(hide_password=True),
+                    engine=engine,
+                    session_maker=async_sessionmaker(bind=engine, **session_kwargs),
+                )
+            )
+        self._replicas = ReplicaSet(replicas, settings.DB_REPLICA_STRATEGY)
+
+    def _engines(self) -> list[AsyncEngine]:
+        engines = [self._engine, self._read_engine]
+        if self._replicas:
+            engines += [replica.engine for replica in self._replicas.replicas]
+        return [engine for engine in engines if engine is not None]
+
+    @property
+    def replicas(self) -> Optional[ReplicaSet]:
+        return self._replicas
+
+    def mark_write(self, key: str | None) -> None:
+        """Запоминает запись клиента для чтения своих изменений."""
+        if self._replicas:
+            if key:
+                self._recent_writes.mark(key)
+            write_marker.mark()
+
+    async def close(self) -> None:
+        """Закрывает все соединения пула и сбрасывает движок.
+
+        Вызывается при остановке воркера, после того как
+        сервер дождался завершения обрабатываемых запросов.
+        """
+        if self._engine is None:
+            return
+        await self._engine.dispose()
+        if self._read_engine is not None:
+            await self._read_engine.dispose()
+        if self._replicas is not None:
+            await self._replicas.dispose()
+        self._engine = None
+        self._read_engine = None
+        self._replicas = None
+        self._session_maker = None
+        logger.info("Database engine disposed in worker pid={}", os.getpid())
+
+    def pool_status(self) -> dict:
+        """Состояние пула соединений, обслуживающего чтение.
+
+        `saturation` - доля занятых соединений от максимально возможного
+        количества (`pool_size + max_overflow`), `None` если пул не ограничен.
+        """
+        if self._engine is None:
+            raise DataBaseError("DatabaseSessionManager is not initialized")
+        pool = (self._read_engine or self._engine).pool
+        if not hasattr(pool, "checkedout"):
+            return {"pool": type(pool).__name__}
+        size, max_overflow = pool.size(), getattr(pool, "_max_overflow", -1)
+        checked_out = pool.checkedout()
+        capacity = size + max_overflow if max_overflow >= 0 else None
+        return {
+            "pool": type(pool).__name__,
+            "size": size,
+            "checked_out": checked_out,
+            "overflow": pool.overflow(),
+            "saturation": round(checked_out / capacity, 3) if capacity else None,
+        }
+
     @asynccontextmanager
-    async def connect(self) -> AsyncIterator[AsyncConnection]:
+    async def connect(
+        self, readonly: bool = False, autocommit: bool = False
+    ) -> AsyncIterator[AsyncConnection]:
         """Создание асинхронного подключения.
 
         В качестве контекста возвращает объект `AsyncConnection`.
         В случае возникновения исключения внутри контекста,
         откатывает транзакцию.
+
+        Args:
+            readonly: Взять соединение из пула для чтения, если он есть,
+            autocommit: Без транзакции (например, `CREATE INDEX CONCURRENTLY`).
         """
         if self._engine is None:
             raise DataBaseError("DatabaseSessionManager is not initialized")
-        async with self._engine.begin() as connection:
+        engine = self._read_engine if readonly and self._read_engine else self._engine
+        if autocommit:
+            async with engine.connect() as connection:
+                yield await connection.execution_options(isolation_level="AUTOCOMMIT")
+            return
+        async with engine.begin() as connection:
             try:
                 yield connection
             except Exception as e:
@@ -80,6 +283,42 @@ class DatabaseSessionManager(metaclass=Singleton):
                 await session.rollback()
                 raise
 
+    @asynccontextmanager
+    async def read_session(
+        self, sticky_key: str | None = None, last_write: str | None = None
+    ) -> AsyncIterator[AsyncSession]:
+        """Создание асинхронной сессии только для чтения.
+
+        Сессия открывается на доступной реплике. Если реплик нет, все
+        исключены или клиент недавно писал в БД (`DB_READ_YOUR_WRITES_SECONDS`),
+        используется основная БД. Недавняя запись определяется по ключу
+        `sticky_key` в этом процессе или по времени `last_write`, которое
+        клиент получил от любого воркера.
+        При ошибке соединения реплика исключается до следующей проверки.
+        """
+        replica = None
+        if self._replicas and not (
+            (sticky_key and sticky_key in self._recent_writes)
+            or self._recent_writes.fresh(last_write)
+        ):
+            replica = self._replicas.choose()
+        if replica is None:
+            async with self.session() as session:
+                yield session
+            return
+
+        metrics.inc("db_replica_reads_total", replica=replica.name)
+        async with replica.session_maker() as session:
+            try:
+                yield session
+            except (OperationalError, InterfaceError, OSError) as e:
+                self._replicas.eject(replica, type(e).__name__)
+                await session.rollback()
+                raise
+            except Exception:
+                await session.rollback()
+                raise
+
     async def create_all(self) -> None:
         """(For testing) create all database metadata."""
         async with self._engine.begin() as coon:
@@ -94,8 +333,22 @@ class DatabaseSessionManager(metaclass=Singleton):
 db_manager: DatabaseSessionManager = DatabaseSessionManager()
 
 
-async def get_session() -> AsyncIterator[AsyncSession]:
-    """Возвращает сеанс базы данных для использования с fastapi Depends"""
-    # noinspection PyArgumentList
-    async with db_manager.session() as session:
-        yield session
+@event.listens_for(Session, "do_orm_execute")
+def _track_dml(orm_execute_state) -> None:
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, _) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_recent_write(session) -> None:
+    if session.info.get("wrote"):
+        db_manager.mark_write(session.info.get("sticky_key"))
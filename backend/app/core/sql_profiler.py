@@ -0,0 +1,188 @@
+"""Профилирование SQL-запросов в рамках HTTP-запроса."""
+
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.logging import add_timing, current_request_id
+from core.metrics import metrics
+
+_WHITESPACE = re.compile(r"\s+")
+# Списки параметров `IN (?, ?, ?)` и `VALUES (...), (...)` разной длины
+# считаются одним и тем же запросом.
+_PARAM = r"(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)"
+_PARAM_LIST = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)")
+_VALUES_LIST = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+
+
+def fingerprint(statement: str) -> str:
+    """Нормализованный текст запроса без значений и длины списков параметров."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _PARAM_LIST.sub("(...)", statement)
+    return _VALUES_LIST.sub(r"\1", statement)
+
+
+@dataclass(slots=True)
+class QueryStat:
+    count: int = 0
+    duration: float = 0.0
+    rows: int = 0
+
+
+@dataclass(slots=True)
+class RequestProfile:
+    """Запросы к БД, выполненные при обработке одного HTTP-запроса."""
+
+    method: str
+    path: str
+    request_id: str | None = None
+    queries: dict[str, QueryStat] = field(default_factory=dict)
+    slow: list[tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return sum(stat.count for stat in self.queries.values())
+
+    @property
+    def duration(self) -> float:
+        return sum(stat.duration for stat in self.queries.values())
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Запросы, повторенные `threshold` и более раз (признак N+1)."""
+        return {
+            statement: stat.count
+            for statement, stat in self.queries.items()
+            if stat.count >= threshold
+        }
+
+    def to_dict(self, threshold: int) -> dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "request_id": self.request_id,
+            "count": self.count,
+            "duration": round(self.duration, 6),
+            "n_plus_one": self.repeated(threshold),
+            "slow": [
+                {"statement": statement, "duration": round(duration, 6)}
+                for statement, duration in self.slow
+            ],
+            "queries": [
+                {
+                    "statement": statement,
+                    "count": stat.count,
+                    "duration": round(stat.duration, 6),
+                    "rows": stat.rows,
+                }
+                for statement, stat in self.queries.items()
+            ],
+        }
+
+
+_current_profile: ContextVar[RequestProfile | None] = ContextVar(
+    "sql_profile", default=None
+)
+
+
+class SQLProfiler:
+    """Собирает статистику запросов через события движка SQLAlchemy.
+
+    Для каждого запроса записываются fingerprint, количество, время
+    и число строк. Статистика накапливается в профиле текущего
+    HTTP-запроса (если он открыт через `start`) и в общих метриках.
+    В режиме `debug` профили последних запросов сохраняются для просмотра.
+    """
+
+    def __init__(
+        self,
+        slow_query_seconds: float = 0.2,
+        n_plus_one_threshold: int = 3,
+        keep_recent: int = 50,
+        debug: bool = False,
+    ) -> None:
+        self.slow_query_seconds = slow_query_seconds
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.debug = debug
+        self.recent: deque[RequestProfile] = deque(maxlen=keep_recent)
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        sync_engine = engine.sync_engine
+        if not event.contains(sync_engine, "before_cursor_execute", self._before):
+            event.listen(sync_engine, "before_cursor_execute", self._before)
+            event.listen(sync_engine, "after_cursor_execute", self._after)
+            event.listen(sync_engine, "handle_error", self._error)
+
+    @staticmethod
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @staticmethod
+    def _error(context) -> None:
+        # для упавшего запроса `after_cursor_execute` не вызывается:
+        # время его начала не должно остаться в `info` соединения из пула
+        if context.connection is not None:
+            context.connection.info.pop("query_started", None)
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        duration = time.perf_counter() - conn.info["query_started"].pop()
+        statement = fingerprint(statement)
+        rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        add_timing("db", duration)
+
+        metrics.observe("sql_query_duration_seconds", duration, statement=statement)
+        if duration >= self.slow_query_seconds:
+            metrics.inc("sql_slow_queries_total", statement=statement)
+            logger.bind(statement=statement, duration=round(duration, 6)).warning(
+                "Slow query {:.3f}s: {}", duration, statement
+            )
+
+        profile = _current_profile.get()
+        if profile is None:
+            return
+        stat = profile.queries.get(statement)
+        if stat is None:
+            stat = profile.queries[statement] = QueryStat()
+        stat.count += 1
+        stat.duration += duration
+        stat.rows += rows
+        if duration >= self.slow_query_seconds:
+            profile.slow.append((statement, duration))
+
+    @staticmethod
+    def start(method: str, path: str) -> RequestProfile:
+        """Открывает профиль для текущего запроса (contextvar)."""
+        profile = RequestProfile(
+            method=method, path=path, request_id=current_request_id()
+        )
+        _current_profile.set(profile)
+        return profile
+
+    def finish(self, profile: RequestProfile, route: str) -> None:
+        """Закрывает профиль: метрики, лог N+1 и сохранение для отладки."""
+        _current_profile.set(None)
+        metrics.observe("sql_queries_per_request", profile.count, route=route)
+        repeated = profile.repeated(self.n_plus_one_threshold)
+        if repeated:
+            metrics.inc("sql_n_plus_one_total", route=route)
+            logger.bind(route=route, repeated=repeated).warning(
+                "Possible N+1 in {}: {}", route, repeated
+            )
+        if self.debug and profile.queries:
+            self.recent.append(profile)
+
+    def header(self, profile: RequestProfile) -> str:
+        """Краткая сводка для отладочного заголовка `X-SQL-Profile`."""
+        return (
+            f"count={profile.count}; time={profile.duration * 1000:.2f}ms; "
+            f"n+1={len(profile.repeated(self.n_plus_one_threshold))}; "
+            f"slow={len(profile.slow)}"
+        )
+
+
+sql_profiler = SQLProfiler()
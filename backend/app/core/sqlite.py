@@ -0,0 +1,74 @@
+"""Профиль SQLite для высокой конкурентности.
+
+- WAL и настройки `PRAGMA` на каждом соединении;
+- пул соединений для чтения (`query_only`);
+- один писатель на процесс: пул из одного соединения, ожидание
+  в очереди пула и есть асинхронная очередь записи;
+- транзакции писателя начинаются с `BEGIN IMMEDIATE`, поэтому писатели
+  разных процессов ждут друг друга через `busy_timeout`, а не получают
+  "database is locked" при повышении блокировки.
+"""
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.selectable import CompoundSelect, Select
+
+
+def is_sqlite_file(host: str) -> bool:
+    """SQLite с файлом БД (для `:memory:` профиль не нужен)."""
+    url = make_url(host)
+    return url.get_backend_name() == "sqlite" and url.database not in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def set_pragmas(engine: Engine, pragmas: dict, query_only: bool = False) -> None:
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, _) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if query_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def use_immediate_transactions(engine: Engine) -> None:
+    # https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#serializable-isolation-savepoints-transactional-ddl
+    @event.listens_for(engine, "connect")
+    def _disable_driver_begin(dbapi_connection, _) -> None:
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(connection) -> None:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class RoutingSession(Session):
+    """Сессия, которая читает через пул читателей, а пишет через писателя.
+
+    В читателя идут только `Select`/`CompoundSelect`; все остальное
+    (flush, INSERT/UPDATE/DELETE, `text()`, `session.connection()`) - в писателя,
+    так как читатель открыт с `query_only`. После первого обращения к писателю
+    запросы сессии идут в него до конца транзакции, чтобы видеть собственные
+    изменения; после коммита или отката сессия снова читает через читателей.
+    """
+
+    writer: Engine
+    reader: Engine
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or not isinstance(clause, (Select, CompoundSelect)):
+            self.info["writer"] = True
+        return self.writer if self.info.get("writer") else self.reader
+
+
+@event.listens_for(RoutingSession, "after_commit")
+@event.listens_for(RoutingSession, "after_rollback")
+def _release_writer(session: Session) -> None:
+    # иначе чтение после коммита открыло бы транзакцию писателя (BEGIN IMMEDIATE)
+    # и держало бы его, пока сессия ждет чего-то еще, например блокировку
+    session.info.pop("writer", None)
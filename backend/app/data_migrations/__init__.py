@@ -0,0 +1,16 @@
+"""Зарегистрированные миграции данных (`python -m scripts.data_migrations`).
+
+Порядок в `MIGRATIONS` - порядок выполнения `run --all`.
+"""
+
+from core.data_migration import DataMigration
+from .normalize_user_emails import NormalizeUserEmails
+from .user_deleted_at import UserDeletedAt
+from .user_purge_index import UserPurgeIndex
+
+MIGRATIONS: dict[str, DataMigration] = {
+    migration.name: migration
+    for migration in (NormalizeUserEmails(), UserDeletedAt(), UserPurgeIndex())
+}
+
+__all__ = ["MIGRATIONS"]
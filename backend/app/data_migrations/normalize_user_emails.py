@@ -0,0 +1,24 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.data_migration import DataMigration
+from models.user import User
+from repositories.user import UserRepository
+
+
+class NormalizeUserEmails(DataMigration):
+    """Приводит `email` к нижнему регистру без пробелов по краям.
+
+    Новые адреса нормализует `ValidEmail`; строка, чей нормализованный адрес
+    уже занят другим пользователем или достается строке с меньшим `id`,
+    пропускается и требует ручного решения.
+    """
+
+    name = "normalize_user_emails"
+    model = User
+    description = "lower(trim(email)) for existing users"
+
+    async def batch(self, session: AsyncSession, start: int, end: int) -> int:
+        return len(await UserRepository(session).normalize_emails(start, end))
+
+    async def pending(self, session: AsyncSession) -> int:
+        return await UserRepository(session).count_unnormalized_emails()
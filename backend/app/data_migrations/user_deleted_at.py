@@ -0,0 +1,23 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.data_migration import DataMigration
+from models.user import User
+from repositories.user import UserRepository
+
+
+class UserDeletedAt(DataMigration):
+    """Заполняет `deleted_at` пользователей, удаленных до его появления.
+
+    Время удаления берется из `updated_at` - до `deleted_at` срок хранения
+    считался от него. Без этой миграции такие пользователи не очищаются.
+    """
+
+    name = "user_deleted_at"
+    model = User
+    description = "deleted_at = updated_at for users deleted before the column existed"
+
+    async def batch(self, session: AsyncSession, start: int, end: int) -> int:
+        return await UserRepository(session).backfill_deleted_at(start, end)
+
+    async def pending(self, session: AsyncSession) -> int:
+        return await UserRepository(session).count_missing_deleted_at()
@@ -0,0 +1,19 @@
+from core.data_migration import DataMigration
+from models.user import User
+
+
+class UserPurgeIndex(DataMigration):
+    """Индекс выборки очистки (`is_deleted`, `deleted_at`) без блокировки записи.
+
+    Индекс объявлен и в модели: на существующей БД его нужно построить этой
+    миграцией до `alembic upgrade`, тогда autogenerate не создаст его обычным DDL.
+    """
+
+    name = "user_purge_index"
+    model = User
+    description = "CREATE INDEX CONCURRENTLY ix_user_is_deleted_deleted_at"
+    indexes = tuple(
+        index
+        for index in User.__table__.indexes
+        if index.name == "ix_user_is_deleted_deleted_at"
+    )
@@ -1,37 +1,133 @@
+import time
 from contextlib import asynccontextmanager
 from typing import AsyncIterator
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.responses import ORJSONResponse
 from loguru import logger
 
 from api import routers
+from core import exceptions
 from core.config import settings
+from core.deadline import StatementTimeout
+from core.admission import client_limiter
+from core.hub import RedisBackplane, hub
+from core.logging import configure_logging
+from core.jobs import job_queue
+from core.outbox import outbox_relay
+from core.middleware import (
+    AdmissionMiddleware,
+    CompressionMiddleware,
+    ReadYourWritesMiddleware,
+    RequestContextMiddleware,
+    RequestMetricsMiddleware,
+    SQLProfilerMiddleware,
+    StatementDeadlineMiddleware,
+)
+from core.monitoring import loop_lag_monitor, blocking_call_detector
 from core.session_manager import db_manager
+from services.helpers.audit import audit_log
+from services.helpers.auth_state import auth_state_buffer
+from services.helpers.permissions import permission_cache
+from services.purge import user_purge
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+async def lifespan(application: FastAPI) -> AsyncIterator[None]:
     """Lifespan event handles startup and shutdown events."""
+    configure_logging(
+        settings.LOG_LEVEL,
+        json=settings.LOG_JSON,
+        enqueue=settings.LOG_ENQUEUE,
+        sampling=settings.LOG_SAMPLING,
+    )
     logger.info("Start configuring server...")
-    db_manager.init(
-        settings.SQLALCHEMY_DATABASE_URI,
-        {
-            "echo": settings.DB_ECHO,
-            "future": settings.DB_FUTURE,
-            "pool_pre_ping": settings.DB_POOL_PRE_PING,
-            "connect_args": settings.DB_CONNECT_ARGS,
-        },
-        {
-            "autoflush": settings.DB_SESSION_AUTOFLUSH,
-            "autocommit": settings.DB_SESSION_AUTOCOMMIT,
-            "expire_on_commit": settings.DB_SESSION_EXPIRE_ON_COMMIT,
-        },
+    started = time.perf_counter()
+    db_manager.init_from_settings()
+    if db_manager.replicas:
+        db_manager.replicas.start(
+            settings.DB_REPLICA_CHECK_INTERVAL, settings.DB_REPLICA_CHECK_TIMEOUT
+        )
+
+    if settings.AUTH_WRITE_BEHIND_ENABLED:
+        auth_state_buffer.interval = settings.AUTH_WRITE_BEHIND_INTERVAL
+        auth_state_buffer.batch_size = settings.AUTH_WRITE_BEHIND_BATCH_SIZE
+        auth_state_buffer.start()
+
+    audit_log.enabled = settings.AUDIT_ENABLED
+    if settings.AUDIT_ENABLED:
+        audit_log.max_size = settings.AUDIT_BUFFER_SIZE
+        audit_log.batch_size = settings.AUDIT_BATCH_SIZE
+        audit_log.interval = settings.AUDIT_FLUSH_INTERVAL
+        audit_log.start()
+
+    client_limiter.limit = settings.CLIENT_MAX_CONCURRENCY
+    client_limiter.anonymous_limit = settings.CLIENT_MAX_CONCURRENCY_ANONYMOUS
+
+    hub.max_connections = settings.WS_MAX_CONNECTIONS
+    hub.queue_size = settings.WS_QUEUE_SIZE
+    hub.heartbeat_interval = settings.WS_HEARTBEAT_INTERVAL
+    hub.heartbeat_timeout = settings.WS_HEARTBEAT_TIMEOUT
+    hub.start(
+        RedisBackplane(settings.WS_REDIS_URL, settings.WS_REDIS_CHANNEL)
+        if settings.WS_REDIS_URL
+        else None
     )
+    outbox_relay.subscribe(hub.on_outbox_events)
+
+    permission_cache.ttl = settings.PERMISSION_CACHE_TTL
+    permission_cache.max_size = settings.PERMISSION_CACHE_SIZE
+    outbox_relay.subscribe(permission_cache.on_outbox_events)
+
+    if settings.OUTBOX_RELAY_ENABLED:
+        outbox_relay.batch_size = settings.OUTBOX_BATCH_SIZE
+        outbox_relay.poll_interval = settings.OUTBOX_RELAY_INTERVAL
+        outbox_relay.gap_timeout = settings.OUTBOX_GAP_TIMEOUT
+        await outbox_relay.start()
+
+    if settings.JOBS_ENABLED:
+        job_queue.concurrency = settings.JOBS_CONCURRENCY
+        job_queue.max_attempts = settings.JOBS_MAX_ATTEMPTS
+        job_queue.backoff = settings.JOBS_BACKOFF_SECONDS
+        job_queue.backoff_max = settings.JOBS_BACKOFF_MAX_SECONDS
+        job_queue.poll_interval = settings.JOBS_POLL_INTERVAL
+        job_queue.stale_seconds = settings.JOBS_STALE_SECONDS
+        job_queue.start()
+
+    if settings.USER_PURGE_ENABLED:
+        user_purge.mode = settings.USER_PURGE_MODE
+        user_purge.retention_days = settings.USER_PURGE_RETENTION_DAYS
+        user_purge.interval = settings.USER_PURGE_INTERVAL
+        user_purge.batch_size = settings.USER_PURGE_BATCH_SIZE
+        user_purge.sleep = settings.USER_PURGE_SLEEP
+        user_purge.file_grace = settings.USER_PURGE_FILE_GRACE
+        user_purge.start()
 
+    loop_lag_monitor.interval = settings.LOOP_LAG_INTERVAL
+    loop_lag_monitor.start()
+    if settings.LOOP_BLOCK_DETECTOR_ENABLED:
+        blocking_call_detector.threshold = settings.LOOP_BLOCK_THRESHOLD
+        blocking_call_detector.start()
+
+    application.state.started_in = round(time.perf_counter() - started, 4)
     logger.info("Server started and configured successfully")
     yield
+    application.state.started_in = None
+    await blocking_call_detector.stop()
+    await loop_lag_monitor.stop()
+    await user_purge.stop()
+    await job_queue.stop(settings.JOBS_SHUTDOWN_TIMEOUT)
+    await outbox_relay.stop()
+    outbox_relay.unsubscribe(hub.on_outbox_events)
+    outbox_relay.unsubscribe(permission_cache.on_outbox_events)
+    await hub.stop()
+    await auth_state_buffer.stop()
+    await audit_log.stop()
+    await db_manager.close()
     logger.info("Server shut down")
+    # дождаться записи логов из очереди
+    await logger.complete()
 
 
 app = FastAPI(
@@ -44,4 +140,45 @@ app = FastAPI(
     },
 )
 
+
+@app.exception_handler(StatementTimeout)
+async def statement_timeout_handler(request: Request, exc: StatementTimeout):
+    return await http_exception_handler(request, exceptions.EXCEPTION_STATEMENT_TIMEOUT)
+
+
+app.add_middleware(
+    StatementDeadlineMiddleware,
+    cancel_methods=settings.DB_CANCEL_ON_DISCONNECT_METHODS,
+)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        min_size=settings.COMPRESSION_MIN_SIZE,
+        levels=settings.COMPRESSION_LEVELS,
+        thread_min_size=settings.COMPRESSION_THREAD_MIN_SIZE,
+        cache_size=settings.COMPRESSION_CACHE_SIZE,
+    )
+if settings.SQL_PROFILER_ENABLED:
+    app.add_middleware(SQLProfilerMiddleware)
+if settings.SQLALCHEMY_REPLICA_URIS:
+    app.add_middleware(
+        ReadYourWritesMiddleware,
+        window=settings.DB_READ_YOUR_WRITES_SECONDS,
+        cookie=settings.DB_READ_YOUR_WRITES_COOKIE,
+        header=settings.DB_READ_YOUR_WRITES_HEADER,
+    )
+app.add_middleware(
+    AdmissionMiddleware,
+    max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+    pool_wait_max=settings.ADMISSION_POOL_WAIT_MAX,
+    retry_after=settings.ADMISSION_RETRY_AFTER,
+    exempt_paths=settings.ADMISSION_EXEMPT_PATHS,
+)
+app.add_middleware(RequestMetricsMiddleware)
+app.add_middleware(
+    RequestContextMiddleware,
+    header=settings.REQUEST_ID_HEADER,
+    slow_seconds=settings.LOG_SLOW_REQUEST_SECONDS,
+)
+
 app.include_router(routers.api_v1_router)
@@ -54,7 +54,13 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    # каждая ревизия в своей транзакции; заполнение данных - не здесь,
+    # а в `data_migrations` (`python -m scripts.data_migrations`)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        transaction_per_migration=True,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
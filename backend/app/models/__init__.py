@@ -1,7 +1,20 @@
 from .user import User
+from .user_archive import UserArchive
+from .job import Job
+from .outbox import OutboxEvent
+from .checkpoint import Checkpoint
+from .role import Role, UserRole
+from .audit import AuditEvent
 from .base import DeclarativeBaseModel
 
 __all__ = [
     "DeclarativeBaseModel",
     "User",
+    "UserArchive",
+    "Job",
+    "OutboxEvent",
+    "Checkpoint",
+    "Role",
+    "UserRole",
+    "AuditEvent",
 ]
@@ -0,0 +1,26 @@
+from sqlalchemy import JSON, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import DeclarativeBaseModel, UpdatedAtColumn, IdColumn
+
+
+class AuditEvent(DeclarativeBaseModel, IdColumn, UpdatedAtColumn):
+    """Запись журнала аудита (только добавление).
+
+    `created_at` - время события (а не записи в БД). Индексы - под выборку
+    по фильтру с keyset-пагинацией по убыванию `id`.
+    """
+
+    __table_args__ = (
+        Index("ix_audit_event_action_id", "action", "id"),
+        Index("ix_audit_event_actor_id_id", "actor_id", "id"),
+        Index("ix_audit_event_target_id_id", "target_id", "id"),
+    )
+
+    # login | login_failed | logout | user_update | user_delete
+    action: Mapped[str] = mapped_column(String(50), nullable=False)
+    # кто выполнил действие и над кем
+    actor_id: Mapped[int] = mapped_column(nullable=True)
+    target_id: Mapped[int] = mapped_column(nullable=True)
+    ip: Mapped[str] = mapped_column(String(45), nullable=True)
+    data: Mapped[dict] = mapped_column(JSON, nullable=True)
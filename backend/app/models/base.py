@@ -1,7 +1,7 @@
 import datetime as datetime
 import re
 
-from sqlalchemy import false, Boolean, func, TIMESTAMP, MetaData
+from sqlalchemy import false, Boolean, Integer, func, TIMESTAMP, MetaData
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import (
     Mapped,
@@ -40,6 +40,16 @@ class CreatedAtColumn:
     )
 
 
+class VersionColumn:
+    version: Mapped[int] = mapped_column(
+        Integer,
+        default=1,
+        server_default="1",
+        nullable=False,
+        doc="Row version for optimistic concurrency control",
+    )
+
+
 class IdColumn:
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 
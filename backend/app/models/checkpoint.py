@@ -0,0 +1,30 @@
+import datetime
+
+from sqlalchemy import BigInteger, String, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import (
+    DeclarativeBaseModel,
+    UpdatedAtColumn,
+    CreatedAtColumn,
+    IdColumn,
+)
+
+
+class Checkpoint(DeclarativeBaseModel, IdColumn, UpdatedAtColumn, CreatedAtColumn):
+    """Позиция длительной пакетной задачи (очистка, миграция данных).
+
+    `locked_until` - аренда: пока она не истекла, задачу с этим `name`
+    не запускает другой процесс.
+    """
+
+    name: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+    # последний обработанный ключ
+    position: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    processed: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    finished_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    locked_until: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
@@ -0,0 +1,25 @@
+import datetime
+
+from sqlalchemy import JSON, String, Text, TIMESTAMP, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import (
+    DeclarativeBaseModel,
+    UpdatedAtColumn,
+    CreatedAtColumn,
+    IdColumn,
+)
+
+
+class Job(DeclarativeBaseModel, IdColumn, UpdatedAtColumn, CreatedAtColumn):
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    # pending -> running -> done | failed
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, default="pending", index=True
+    )
+    attempts: Mapped[int] = mapped_column(nullable=False, default=0)
+    run_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), index=True
+    )
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
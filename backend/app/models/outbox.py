@@ -0,0 +1,14 @@
+from sqlalchemy import JSON, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import DeclarativeBaseModel, UpdatedAtColumn, IdColumn
+
+
+class OutboxEvent(DeclarativeBaseModel, IdColumn, UpdatedAtColumn):
+    """Событие изменения; `id` - порядковый номер (seq) для потребителей."""
+
+    entity: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
+    entity_id: Mapped[int] = mapped_column(nullable=False)
+    # created | updated | deleted
+    action: Mapped[str] = mapped_column(String(20), nullable=False)
+    data: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
@@ -0,0 +1,31 @@
+from sqlalchemy import BigInteger, ForeignKey, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import (
+    DeclarativeBaseModel,
+    UpdatedAtColumn,
+    CreatedAtColumn,
+    IdColumn,
+)
+from .user import User
+
+
+class Role(DeclarativeBaseModel, IdColumn, UpdatedAtColumn, CreatedAtColumn):
+    """Роль: именованный набор прав (биты `core.permissions.Permission`)."""
+
+    name: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+    description: Mapped[str] = mapped_column(String(255), nullable=True)
+    permissions: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, server_default="0"
+    )
+
+
+class UserRole(DeclarativeBaseModel, UpdatedAtColumn):
+    """Назначение роли пользователю."""
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey(User.id, ondelete="CASCADE"), primary_key=True
+    )
+    role_id: Mapped[int] = mapped_column(
+        ForeignKey(Role.id, ondelete="CASCADE"), primary_key=True, index=True
+    )
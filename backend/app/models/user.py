@@ -1,4 +1,6 @@
-from sqlalchemy import false, String, Boolean
+import datetime
+
+from sqlalchemy import false, Index, String, Boolean, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import (
@@ -7,12 +9,26 @@ from .base import (
     UpdatedAtColumn,
     CreatedAtColumn,
     IdColumn,
+    VersionColumn,
 )
 
 
 class User(
-    DeclarativeBaseModel, IdColumn, IsDeletedColumn, UpdatedAtColumn, CreatedAtColumn
+    DeclarativeBaseModel,
+    IdColumn,
+    IsDeletedColumn,
+    UpdatedAtColumn,
+    CreatedAtColumn,
+    VersionColumn,
 ):
+    __table_args__ = (
+        # выборка очистки удаленных пользователей (`services/purge.py`)
+        Index("ix_user_is_deleted_deleted_at", "is_deleted", "deleted_at"),
+        # id очищенных пользователей не выдаются заново: на них ссылаются
+        # выданные токены, архив и внешние потребители событий
+        {"sqlite_autoincrement": True},
+    )
+
     username: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     fullname: Mapped[str] = mapped_column(String(255), nullable=True)
@@ -22,3 +38,13 @@ class User(
         Boolean, default=False, server_default=false()
     )
     image: Mapped[str] = mapped_column(String(255), nullable=True)
+    last_login: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    last_logout: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    # время удаления: от него считается срок хранения, `updated_at` меняет и вход
+    deleted_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
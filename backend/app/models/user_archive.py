@@ -0,0 +1,39 @@
+import datetime
+
+from sqlalchemy import Boolean, Integer, String, TIMESTAMP, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import DeclarativeBaseModel
+
+
+class UserArchive(DeclarativeBaseModel):
+    """Удаленный пользователь, перенесенный из `user` очисткой.
+
+    Пароль и токены не переносятся; `username`/`email` не уникальны,
+    так как их может занять новый пользователь.
+    """
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # id в `user`; не уникален: строка может попасть в архив повторно
+    # (например, после восстановления из бэкапа)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    username: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    fullname: Mapped[str] = mapped_column(String(255), nullable=True)
+    email: Mapped[str] = mapped_column(String(255), nullable=True, index=True)
+    is_superuser: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    image: Mapped[str] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    deleted_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    last_login: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    archived_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import bindparam, insert, select
+
+from models.audit import AuditEvent
+from repositories.base import SQLAlchemyRepository
+
+
+class AuditRepository(SQLAlchemyRepository):
+    """Журнал аудита: только вставка порциями и чтение."""
+
+    model = AuditEvent
+
+    async def add_batch(self, rows: list[dict]) -> None:
+        """Один многострочный `INSERT ... VALUES (...), (...)`."""
+        await self.session.execute(insert(AuditEvent).values(rows))
+
+    async def find_before(
+        self,
+        before: int | None,
+        limit: int,
+        since: datetime | None = None,
+        **filter_dict,
+    ) -> Sequence[AuditEvent]:
+        """События по убыванию `id` (keyset).
+
+        Args:
+            before: `id` последнего события предыдущей страницы (None - с начала),
+            limit: Размер страницы,
+            since: Только события не раньше этого времени,
+            **filter_dict: Критерии фильтрации (`action`, `actor_id`, `target_id`).
+
+        Returns:
+            Список событий.
+        """
+        key = self._filter_key(filter_dict)
+        stmt = self._statement(
+            "before",
+            (key, before is None, since is None),
+            lambda: self._page_before(key, before is None, since is None),
+        )
+        params = self._filter_params(filter_dict)
+        params["k_limit"] = limit
+        if before is not None:
+            params["k_before"] = before
+        if since is not None:
+            params["k_since"] = since
+        res = await self.session.scalars(stmt, params)
+        return res.all()
+
+    def _page_before(self, key: tuple, first: bool, all_time: bool):
+        stmt = self._where(select(AuditEvent), key)
+        if not first:
+            stmt = stmt.where(AuditEvent.id < bindparam("k_before"))
+        if not all_time:
+            stmt = stmt.where(AuditEvent.created_at >= bindparam("k_since"))
+        return stmt.order_by(AuditEvent.id.desc()).limit(bindparam("k_limit"))
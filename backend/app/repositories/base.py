@@ -2,10 +2,24 @@ from abc import ABC, abstractmethod
 from typing import TypeVar, Type, Sequence
 
 from pydantic import BaseModel
-from sqlalchemy import insert, select, update, delete, func, RowMapping, Result
+from sqlalchemy import (
+    insert,
+    select,
+    update,
+    delete,
+    func,
+    bindparam,
+    RowMapping,
+    Result,
+    Executable,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models.base import DeclarativeBaseModel
+from pydantic_core import to_jsonable_python
+
+from core.metrics import metrics
+from models.base import DeclarativeBaseModel, VersionColumn
+from models.outbox import OutboxEvent
 
 ModelType = TypeVar("ModelType", bound=DeclarativeBaseModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -44,15 +58,55 @@ class AbstractRepository(ABC):
         raise NotImplementedError
 
 
+class StatementCache:
+    """Кэш шаблонов запросов репозиториев.
+
+    Ключ - модель, вид запроса и набор имен фильтров/колонок; значения
+    подставляются через `bindparam`. Повторное использование того же
+    объекта запроса избавляет от построения конструкции и вычисления
+    ключа кэша компиляции SQLAlchemy на каждом вызове.
+    """
+
+    def __init__(self, max_size: int = 1024) -> None:
+        self.max_size = max_size
+        self._statements: dict[tuple, Executable] = {}
+
+    def get(self, key: tuple, build) -> Executable:
+        stmt = self._statements.get(key)
+        if stmt is not None:
+            metrics.inc("repository_statement_cache_total", result="hit")
+            return stmt
+        metrics.inc("repository_statement_cache_total", result="miss")
+        stmt = build()
+        if len(self._statements) < self.max_size:
+            self._statements[key] = stmt
+        return stmt
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def clear(self) -> None:
+        self._statements.clear()
+
+
+statement_cache = StatementCache()
+
+
 class SQLAlchemyRepository(AbstractRepository):
     """Этот класс реализует базовый интерфейс для работы с базой данных.
     Упрощает работу с аннотациями типов.
     Поддерживает все классические операции CRUD, а также пользовательские запросы.
+    Запросы строятся один раз на набор фильтров и берутся из `statement_cache`.
+    Если задан `outbox_entity`, каждая запись добавляет событие в `outbox_event`
+    в той же транзакции.
     """
 
     model: Type[ModelType]
     create_schema: Type[CreateSchemaType]
     update_schema: Type[UpdateSchemaType]
+    outbox_entity: str | None = None
+    outbox_exclude: tuple[str, ...] = ()  # поля, не попадающие в события
+    outbox_enabled: bool = True
 
     def __init__(self, session: AsyncSession):
         """
@@ -63,6 +117,38 @@ class SQLAlchemyRepository(AbstractRepository):
         """
         self.session: AsyncSession = session
 
+    def _statement(self, kind: str, key: tuple, build) -> Executable:
+        return statement_cache.get((self.model, kind, key), build)
+
+    @staticmethod
+    def _filter_key(filter_dict: dict) -> tuple:
+        # `None` сравнивается через IS NULL, поэтому входит в ключ шаблона
+        return tuple(
+            sorted((name, value is None) for name, value in filter_dict.items())
+        )
+
+    @staticmethod
+    def _filter_params(filter_dict: dict) -> dict:
+        return {
+            f"f_{name}": value
+            for name, value in filter_dict.items()
+            if value is not None
+        }
+
+    def _where(self, stmt, key: tuple):
+        for name, is_null in key:
+            column = getattr(self.model, name)
+            stmt = stmt.where(
+                column.is_(None) if is_null else column == bindparam(f"f_{name}")
+            )
+        return stmt
+
+    def _select(self, filter_dict: dict) -> Executable:
+        key = self._filter_key(filter_dict)
+        return self._statement(
+            "select", key, lambda: self._where(select(self.model), key)
+        )
+
     async def add_one(self, data: CreateSchemaType) -> Type[ModelType]:
         """Создание объекта
 
@@ -72,14 +158,64 @@ class SQLAlchemyRepository(AbstractRepository):
         Returns:
             Type[ModelType]: экземпляр модель БД.
         """
-        stmt = insert(self.model).values(data).returning(self.model)
-        res = await self.session.execute(stmt)
-        return res.scalar_one()
+        res = await self.session.execute(self._insert(), data)
+        obj = res.scalar_one()
+        await self._record("created", [obj])
+        return obj
 
     async def add_many(self, data: list[CreateSchemaType]) -> Sequence[ModelType]:
-        stmt = insert(self.model).values(data).returning(self.model)
-        res = await self.session.execute(stmt)
-        return res.scalars().all()
+        res = await self.session.execute(self._insert(), data)
+        objs = res.scalars().all()
+        await self._record("created", objs)
+        return objs
+
+    async def _record(self, action: str, objs: Sequence, names=()) -> None:
+        """Добавляет события изменений в outbox (в транзакции сессии).
+
+        Args:
+            action: `created`, `updated` или `deleted`,
+            objs: Измененные объекты,
+            names: Измененные поля (для `updated`).
+        """
+        if self.outbox_entity is None or not self.outbox_enabled or not objs:
+            return
+        rows = []
+        for obj in objs:
+            fields = obj.to_dict() if action == "created" else names
+            values = {
+                name: getattr(obj, name)
+                for name in fields
+                if name not in self.outbox_exclude
+            }
+            if action == "updated":
+                if not values:
+                    continue
+                if isinstance(obj, VersionColumn):
+                    values["version"] = obj.version
+            rows.append(
+                {
+                    "entity": self.outbox_entity,
+                    "entity_id": obj.id,
+                    "action": action,
+                    "data": to_jsonable_python(values),
+                }
+            )
+        await self._record_events(rows)
+
+    async def _record_events(self, rows: list[dict]) -> None:
+        """Добавляет готовые события (`entity`, `entity_id`, `action`, `data`) в outbox."""
+        if not rows or not self.outbox_enabled:
+            return
+        stmt = statement_cache.get(
+            (OutboxEvent, "insert", ()), lambda: insert(OutboxEvent)
+        )
+        await self.session.execute(stmt, rows)
+        self.session.info["outbox"] = True
+
+    def _insert(self) -> Executable:
+        return self._statement(
+            "insert", (), lambda: insert(self.model).returning(self.model)
+        )
 
     async def find_all(self, **filter_dict) -> Sequence[ModelType] | None:
         """Асинхронно находит и возвращает все экземпляры модели,
@@ -91,10 +227,59 @@ class SQLAlchemyRepository(AbstractRepository):
         Returns:
              Список экземпляров модели.
         """
-        stmt = select(self.model).filter_by(**filter_dict)
-        res = await self.session.execute(stmt)
+        res = await self.session.execute(
+            self._select(filter_dict), self._filter_params(filter_dict)
+        )
         return res.scalars().all()
 
+    async def find_columns(self, columns: tuple[str, ...], **filter_dict):
+        """Находит значения только указанных колонок.
+
+        Args:
+            columns: Имена колонок модели.
+            **filter_dict: Критерии фильтрации в виде именованных параметров.
+
+        Returns:
+            Список строк с доступом к значениям по имени колонки.
+        """
+        key = self._filter_key(filter_dict)
+        stmt = self._statement(
+            "columns",
+            (columns, key),
+            lambda: self._where(
+                select(*(getattr(self.model, name) for name in columns)), key
+            ),
+        )
+        res = await self.session.execute(stmt, self._filter_params(filter_dict))
+        return res.mappings().all()
+
+    async def find_ids(self, after: int, limit: int, **filter_dict) -> Sequence[int]:
+        """Находит идентификаторы по возрастанию после `after` (keyset).
+
+        Args:
+            after: Последний идентификатор предыдущей порции (0 - с начала),
+            limit: Размер порции.
+            **filter_dict: Критерии фильтрации в виде именованных параметров.
+
+        Returns:
+            Список идентификаторов.
+        """
+        key = self._filter_key(filter_dict)
+        stmt = self._statement(
+            "ids",
+            key,
+            lambda: (
+                self._where(select(self.model.id), key)
+                .where(self.model.id > bindparam("k_after"))
+                .order_by(self.model.id)
+                .limit(bindparam("k_limit"))
+            ),
+        )
+        params = self._filter_params(filter_dict)
+        params.update(k_after=after, k_limit=limit)
+        res = await self.session.scalars(stmt, params)
+        return res.all()
+
     async def find_by_page(
         self, limit: int, offset: int = 0, **filter_dict
     ) -> Sequence[ModelType] | None:
@@ -109,14 +294,19 @@ class SQLAlchemyRepository(AbstractRepository):
         Returns:
             Список экземпляров модели.
         """
-
-        stmt = (
-            select(self.model)
-            .filter_by(**filter_dict)
-            .offset((offset - 1) * limit)
-            .limit(limit)
+        key = self._filter_key(filter_dict)
+        stmt = self._statement(
+            "page",
+            key,
+            lambda: (
+                self._where(select(self.model), key)
+                .offset(bindparam("p_offset"))
+                .limit(bindparam("p_limit"))
+            ),
         )
-        res: Result = await self.session.execute(stmt)
+        params = self._filter_params(filter_dict)
+        params.update(p_offset=(offset - 1) * limit, p_limit=limit)
+        res: Result = await self.session.execute(stmt, params)
         return res.unique().scalars().all()
 
     async def find_one(self, **filter_dict) -> Type[ModelType] | None:
@@ -129,8 +319,9 @@ class SQLAlchemyRepository(AbstractRepository):
         Returns:
             Type[ModelType]: экземпляр модель БД.
         """
-        stmt = select(self.model).filter_by(**filter_dict)
-        res = await self.session.execute(stmt)
+        res = await self.session.execute(
+            self._select(filter_dict), self._filter_params(filter_dict)
+        )
         return res.scalar_one()
 
     async def find_one_or_none(self, **filter_dict) -> Type[ModelType] | None:
@@ -143,36 +334,101 @@ class SQLAlchemyRepository(AbstractRepository):
         Returns:
             Type[ModelType]: экземпляр модель БД.
         """
-        stmt = select(self.model).filter_by(**filter_dict)
-        res = await self.session.execute(stmt)
+        res = await self.session.execute(
+            self._select(filter_dict), self._filter_params(filter_dict)
+        )
         return res.scalar_one_or_none()
 
-    async def edit_one(self, _id: int, data) -> Type[ModelType]:
+    async def edit_one(
+        self,
+        _id: int,
+        data,
+        version: int | None = None,
+        bump_version: bool = True,
+    ) -> Type[ModelType] | None:
         """
         Обновление объекта
 
         Args:
             _id: объект.
             data:  данные которые нужно обновить.
+            version: ожидаемая версия строки (модели с `VersionColumn`).
+            bump_version: False - служебная запись (состояние входа), которая
+                не меняет ни `version`, ни `updated_at`, а значит и ETag.
 
         Returns:
-           Измененный объект
+           Измененный объект или None, если версия не совпала
         """
-        stmt = update(self.model).values(**data).filter_by(id=_id).returning(self.model)
-        res = await self.session.execute(stmt)
-        return res.scalar_one()
+        if version is None:
+            stmt = self._update(
+                "update",
+                tuple(data),
+                lambda: self.model.id == bindparam("b_id"),
+                bump_version,
+            )
+            res = await self.session.execute(stmt, self._values(data, b_id=_id))
+            obj = res.scalar_one()
+            await self._record("updated", [obj], data)
+            return obj
+        # UPDATE ... WHERE id = :id AND version = :version RETURNING
+        stmt = self._update(
+            "update_versioned",
+            tuple(data),
+            lambda: (
+                (self.model.id == bindparam("b_id"))
+                & (self.model.version == bindparam("b_version"))
+            ),
+        )
+        res = await self.session.execute(
+            stmt, self._values(data, b_id=_id, b_version=version)
+        )
+        obj = res.scalar_one_or_none()
+        if obj is not None:
+            await self._record("updated", [obj], data)
+        return obj
+
+    def _update(
+        self, kind: str, names: tuple, where, bump_version: bool = True
+    ) -> Executable:
+        def build():
+            values = {name: bindparam(f"v_{name}") for name in names}
+            if not bump_version:
+                # присваивание колонки самой себе отключает `onupdate`
+                if hasattr(self.model, "updated_at"):
+                    values.setdefault("updated_at", self.model.updated_at)
+            elif issubclass(self.model, VersionColumn) and "version" not in values:
+                values["version"] = self.model.version + 1
+            return (
+                update(self.model)
+                .values(values)
+                .where(where())
+                .returning(self.model)
+                # значения из bindparam не вычисляются при синхронизации
+                # сессии, поэтому объекты обновляются из RETURNING
+                .execution_options(populate_existing=True)
+            )
+
+        if not bump_version:
+            kind = f"{kind}_state"
+        return self._statement(kind, names, build)
+
+    @staticmethod
+    def _values(data: dict, **params) -> dict:
+        params.update((f"v_{name}", value) for name, value in data.items())
+        return params
 
     async def edit_many(
         self, _ids: list[int], data: UpdateSchemaType
     ) -> Sequence[ModelType]:
-        stmt = (
-            update(self.model)
-            .values(**data)
-            .where(self.model.id.in_(_ids))
-            .returning(self.model)
+        stmt = self._update(
+            "update_many",
+            tuple(data),
+            lambda: self.model.id.in_(bindparam("b_ids", expanding=True)),
         )
-        res = await self.session.execute(stmt)
-        return res.scalars().all()
+        res = await self.session.execute(stmt, self._values(data, b_ids=list(_ids)))
+        objs = res.scalars().all()
+        await self._record("updated", objs, data)
+        return objs
 
     async def delete_one(self, _id: int) -> Type[ModelType]:
         """
@@ -184,14 +440,28 @@ class SQLAlchemyRepository(AbstractRepository):
         Returns:
            Удаленный объект
         """
-        stmt = delete(self.model).filter_by(id=_id).returning(self.model)
-        res = await self.session.execute(stmt)
-        return res.scalar_one()
+        res = await self.session.execute(
+            self._delete({"id": _id}), self._filter_params({"id": _id})
+        )
+        obj = res.scalar_one()
+        await self._record("deleted", [obj])
+        return obj
 
     async def delete_many(self, **filter_by):
-        stmt = delete(self.model).filter_by(**filter_by).returning(self.model)
-        res = await self.session.execute(stmt)
-        return res.scalars().all()
+        res = await self.session.execute(
+            self._delete(filter_by), self._filter_params(filter_by)
+        )
+        objs = res.scalars().all()
+        await self._record("deleted", objs)
+        return objs
+
+    def _delete(self, filter_dict: dict) -> Executable:
+        key = self._filter_key(filter_dict)
+        return self._statement(
+            "delete",
+            key,
+            lambda: self._where(delete(self.model), key).returning(self.model),
+        )
 
     async def count(self, **filter_dict) -> int:
         """
@@ -203,10 +473,42 @@ class SQLAlchemyRepository(AbstractRepository):
         Returns:
            Количество объектов
         """
-        stmt = select(func.count(self.model.id)).filter_by(**filter_dict)
-        res: Result = await self.session.execute(stmt)
+        key = self._filter_key(filter_dict)
+        stmt = self._statement(
+            "count",
+            key,
+            lambda: self._where(select(func.count(self.model.id)), key),
+        )
+        res: Result = await self.session.execute(stmt, self._filter_params(filter_dict))
         return res.unique().scalars().first()
 
+    async def find_state(self, **filter_dict) -> RowMapping:
+        """Состояние набора объектов для ETag списка.
+
+        Args:
+             **filter_dict: Критерии фильтрации в виде именованных параметров.
+
+        Returns:
+           `total` - количество, `updated_at` - время последнего изменения,
+           `version` - сумма версий (для моделей с `VersionColumn`)
+        """
+        key = self._filter_key(filter_dict)
+
+        def build():
+            columns = [
+                func.count(self.model.id).label("total"),
+                func.max(self.model.updated_at).label("updated_at"),
+            ]
+            if issubclass(self.model, VersionColumn):
+                columns.append(
+                    func.coalesce(func.sum(self.model.version), 0).label("version")
+                )
+            return self._where(select(*columns), key)
+
+        stmt = self._statement("state", key, build)
+        res = await self.session.execute(stmt, self._filter_params(filter_dict))
+        return res.mappings().one()
+
     async def save(self) -> None:
         self.session.add(self)
         await self.session.commit()
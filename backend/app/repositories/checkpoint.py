@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from models.checkpoint import Checkpoint
+from repositories.base import SQLAlchemyRepository
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class CheckpointRepository(SQLAlchemyRepository):
+    model = Checkpoint
+
+    async def acquire(
+        self, name: str, lease: float, finished_before: datetime | None = None
+    ) -> Checkpoint | None:
+        """Берет аренду задачи `name` на `lease` секунд (создает запись при первом запуске).
+
+        Args:
+            name: Имя задачи,
+            lease: Срок аренды в секундах,
+            finished_before: Не запускать, если задача завершилась позже.
+
+        Returns:
+            Запись с позицией или None, если задача уже выполняется
+            (или недавно завершилась).
+        """
+        if await self.find_one_or_none(name=name) is None:
+            try:
+                async with self.session.begin_nested():
+                    await self.session.execute(self._insert(), {"name": name})
+            except IntegrityError:
+                pass  # создал другой процесс
+        now = _now()
+        stmt = update(Checkpoint).where(
+            Checkpoint.name == name,
+            or_(Checkpoint.locked_until.is_(None), Checkpoint.locked_until < now),
+        )
+        if finished_before is not None:
+            stmt = stmt.where(
+                or_(
+                    Checkpoint.finished_at.is_(None),
+                    Checkpoint.finished_at < finished_before,
+                )
+            )
+        res = await self.session.execute(
+            stmt.values(locked_until=now + timedelta(seconds=lease))
+            .returning(Checkpoint)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        return res.scalar_one_or_none()
+
+    async def _set(self, name: str, **values) -> None:
+        await self.session.execute(
+            update(Checkpoint)
+            .where(Checkpoint.name == name)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def advance(
+        self, name: str, position: int, processed: int, lease: float
+    ) -> None:
+        """Сохраняет позицию в транзакции порции и продлевает аренду."""
+        await self._set(
+            name,
+            position=position,
+            processed=Checkpoint.processed + processed,
+            locked_until=_now() + timedelta(seconds=lease),
+        )
+
+    async def restart(self, name: str) -> None:
+        """Начинает новый проход с начала."""
+        await self._set(name, position=0, processed=0, finished_at=None)
+
+    async def finish(self, name: str) -> None:
+        await self._set(name, finished_at=_now(), locked_until=None)
+
+    async def release(self, name: str) -> None:
+        """Снимает аренду, позиция сохраняется для продолжения."""
+        await self._set(name, locked_until=None)
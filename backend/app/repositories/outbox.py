@@ -0,0 +1,42 @@
+from sqlalchemy import bindparam, select
+
+from models.outbox import OutboxEvent
+from repositories.base import SQLAlchemyRepository
+
+
+class OutboxRepository(SQLAlchemyRepository):
+    model = OutboxEvent
+
+    async def find_since(
+        self, entity: str, since: int, limit: int, until: int | None = None
+    ):
+        """События сущности с порядковым номером больше `since`.
+
+        Args:
+            entity: Имя сущности,
+            since: Последний полученный потребителем `seq`,
+            limit: Максимальное количество событий,
+            until: Граница видимости: события с `seq` больше нее не возвращаются.
+
+        Returns:
+            События по возрастанию `seq`.
+        """
+
+        def build():
+            stmt = (
+                select(OutboxEvent)
+                .where(OutboxEvent.entity == bindparam("b_entity"))
+                .where(OutboxEvent.id > bindparam("b_since"))
+                .order_by(OutboxEvent.id)
+                .limit(bindparam("b_limit"))
+            )
+            if until is not None:
+                stmt = stmt.where(OutboxEvent.id <= bindparam("b_until"))
+            return stmt
+
+        params = {"b_entity": entity, "b_since": since, "b_limit": limit}
+        if until is not None:
+            params["b_until"] = until
+        stmt = self._statement("since", (until is not None,), build)
+        res = await self.session.scalars(stmt, params)
+        return res.all()
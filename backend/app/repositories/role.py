@@ -0,0 +1,112 @@
+from sqlalchemy import bindparam, delete, insert, select
+
+from core.permissions import ALL_PERMISSIONS
+from models.role import Role, UserRole
+from models.user import User
+from repositories.base import SQLAlchemyRepository
+
+
+class RoleRepository(SQLAlchemyRepository):
+    """Роли и их назначения пользователям.
+
+    Изменения ролей попадают в outbox как `role`, назначения - как
+    `user_role` с `entity_id` пользователя: по ним сбрасывается кэш прав.
+    """
+
+    model = Role
+    outbox_entity = "role"
+
+    async def find_user_permissions(self, user_id: int) -> int:
+        """Действующие права пользователя одним запросом.
+
+        Returns:
+            Объединение прав ролей; все права для суперпользователя,
+            0 для удаленного или несуществующего пользователя.
+        """
+        stmt = self._statement(
+            "user_permissions",
+            (),
+            lambda: (
+                select(User.is_superuser, User.is_deleted, Role.permissions)
+                .select_from(User)
+                .outerjoin(UserRole, UserRole.user_id == User.id)
+                .outerjoin(Role, Role.id == UserRole.role_id)
+                .where(User.id == bindparam("b_id"))
+            ),
+        )
+        granted = 0
+        for is_superuser, is_deleted, permissions in await self.session.execute(
+            stmt, {"b_id": user_id}
+        ):
+            if is_deleted:
+                return 0
+            if is_superuser:
+                return ALL_PERMISSIONS
+            granted |= permissions or 0
+        return granted
+
+    async def find_user_ids(self, role_id: int) -> list[int]:
+        res = await self.session.scalars(
+            select(UserRole.user_id).where(UserRole.role_id == role_id)
+        )
+        return list(res.all())
+
+    async def assign(self, user_id: int, role_id: int) -> bool:
+        """Назначает роль пользователю.
+
+        Returns:
+            False, если роль уже назначена.
+        """
+        if await self.session.get(UserRole, (user_id, role_id)) is not None:
+            return False
+        await self.session.execute(
+            insert(UserRole), {"user_id": user_id, "role_id": role_id}
+        )
+        await self._record_user_roles("created", [user_id], role_id)
+        return True
+
+    async def unassign(self, user_id: int, role_id: int) -> bool:
+        """Снимает роль с пользователя.
+
+        Returns:
+            False, если роль не была назначена.
+        """
+        res = await self.session.execute(
+            delete(UserRole)
+            .where(UserRole.user_id == user_id, UserRole.role_id == role_id)
+            .returning(UserRole.user_id)
+        )
+        if res.scalar_one_or_none() is None:
+            return False
+        await self._record_user_roles("deleted", [user_id], role_id)
+        return True
+
+    async def delete_assignments(self, role_id: int) -> list[int]:
+        """Снимает роль со всех пользователей (перед удалением роли).
+
+        Returns:
+            Пользователи, у которых была роль.
+        """
+        res = await self.session.execute(
+            delete(UserRole)
+            .where(UserRole.role_id == role_id)
+            .returning(UserRole.user_id)
+        )
+        user_ids = list(res.scalars().all())
+        await self._record_user_roles("deleted", user_ids, role_id)
+        return user_ids
+
+    async def _record_user_roles(
+        self, action: str, user_ids: list[int], role_id: int
+    ) -> None:
+        await self._record_events(
+            [
+                {
+                    "entity": "user_role",
+                    "entity_id": user_id,
+                    "action": action,
+                    "data": {"role_id": role_id},
+                }
+                for user_id in user_ids
+            ]
+        )
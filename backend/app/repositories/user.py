@@ -1,9 +1,212 @@
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import (
+    Row,
+    and_,
+    bindparam,
+    delete,
+    exists,
+    func,
+    insert,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.orm import aliased
+
+from models.role import UserRole
 from models.user import User
-from repositories.base import SQLAlchemyRepository
+from models.user_archive import UserArchive
+from repositories.base import SQLAlchemyRepository, statement_cache
 from schemas.user import UserCreateDBSchema, UserUpdateSchema
 
+# колонки, переносимые в архив при очистке
+# `id` архива - собственный ключ, id пользователя переносится в `user_id`
+ARCHIVE_COLUMNS = tuple(
+    column.name
+    for column in UserArchive.__table__.columns
+    if column.name in User.__table__.columns and column.name != "id"
+)
+
 
 class UserRepository(SQLAlchemyRepository):
     model = User
     create_schema: UserCreateDBSchema
     update_schema: UserUpdateSchema
+    outbox_entity = "user"
+    outbox_exclude = ("hashed_password", "refresh_token", "last_login", "last_logout")
+
+    async def find_purgeable(
+        self, after: int, deleted_before: datetime, limit: int
+    ) -> Sequence[int]:
+        """Id пользователей, удаленных раньше `deleted_before` (keyset).
+
+        Args:
+            after: Последний id предыдущей порции,
+            deleted_before: Граница срока хранения,
+            limit: Размер порции.
+        """
+        stmt = self._statement(
+            "purgeable",
+            (),
+            lambda: (
+                select(User.id)
+                .where(User.is_deleted == true())
+                .where(User.deleted_at < bindparam("b_before"))
+                .where(User.id > bindparam("k_after"))
+                .order_by(User.id)
+                .limit(bindparam("k_limit"))
+            ),
+        )
+        res = await self.session.scalars(
+            stmt, {"b_before": deleted_before, "k_after": after, "k_limit": limit}
+        )
+        return res.all()
+
+    async def purge(
+        self, ids: list[int], deleted_before: datetime, archive: bool
+    ) -> Sequence[Row]:
+        """Удаляет строки порции, при `archive` переносит их в `user_archive`.
+
+        Условия выборки проверяются повторно в `DELETE`: пользователь, восстановленный
+        после `find_purgeable`, не удаляется. В архив попадают ровно удаленные строки.
+
+        Returns:
+            Удаленные строки (`id` и `ARCHIVE_COLUMNS`).
+        """
+        stmt = self._statement(
+            "purge",
+            (),
+            lambda: (
+                delete(User)
+                .where(User.id.in_(bindparam("b_ids", expanding=True)))
+                .where(User.is_deleted == true())
+                .where(User.deleted_at < bindparam("b_before"))
+                .returning(User.id, *(getattr(User, name) for name in ARCHIVE_COLUMNS))
+                .execution_options(synchronize_session=False)
+            ),
+        )
+        res = await self.session.execute(
+            stmt, {"b_ids": ids, "b_before": deleted_before}
+        )
+        rows = res.all()
+        if rows:
+            # внешние ключи SQLite не проверяются без `PRAGMA foreign_keys`
+            await self.session.execute(
+                delete(UserRole).where(UserRole.user_id.in_([row.id for row in rows]))
+            )
+        if archive and rows:
+            insert_stmt = statement_cache.get(
+                (UserArchive, "insert", ()), lambda: insert(UserArchive)
+            )
+            await self.session.execute(
+                insert_stmt,
+                [
+                    {
+                        "user_id": row.id,
+                        **{name: getattr(row, name) for name in ARCHIVE_COLUMNS},
+                    }
+                    for row in rows
+                ],
+            )
+        await self._record("deleted", rows)
+        return rows
+
+    @staticmethod
+    def _unnormalized_email(start=None):
+        """Условие: адрес не нормализован и нормализованный адрес свободен.
+
+        Если несколько ненормализованных адресов дают один и тот же адрес
+        (`Foo@x.io` и ` foo@x.io`), его получает строка с меньшим `id`,
+        остальные пропускаются, иначе UPDATE нарушит уникальность `email`.
+        Строки с `id < start` уже обработаны: их адреса нормализованы или
+        пропущены вместе со всеми претендентами на тот же адрес, поэтому
+        в порции достаточно проверить диапазон `start <= id`.
+
+        Args:
+            start: Начало порции или None (вся таблица).
+        """
+        other, rival = aliased(User), aliased(User)
+        normalized = func.lower(func.trim(User.email))
+        rival_normalized = func.lower(func.trim(rival.email))
+        rivals = [
+            rival.id < User.id,
+            rival.email != rival_normalized,
+            rival_normalized == normalized,
+        ]
+        if start is not None:
+            rivals.append(rival.id >= start)
+        return and_(
+            User.email != normalized,
+            ~exists().where(other.email == normalized, other.id != User.id),
+            ~exists().where(*rivals),
+        )
+
+    async def normalize_emails(self, start: int, end: int) -> Sequence[User]:
+        """Нормализует `email` пользователей с `start <= id < end`.
+
+        Версия строки увеличивается (ETag клиентов устаревает), изменения
+        попадают в outbox как обычные `updated`.
+        """
+        stmt = self._statement(
+            "normalize_emails",
+            (),
+            lambda: (
+                update(User)
+                .where(User.id >= bindparam("b_start"), User.id < bindparam("b_end"))
+                .where(self._unnormalized_email(bindparam("b_start")))
+                .values(
+                    email=func.lower(func.trim(User.email)), version=User.version + 1
+                )
+                .returning(User)
+                .execution_options(populate_existing=True, synchronize_session=False)
+            ),
+        )
+        res = await self.session.execute(stmt, {"b_start": start, "b_end": end})
+        objs = res.scalars().all()
+        await self._record("updated", objs, ("email",))
+        return objs
+
+    async def count_unnormalized_emails(self) -> int:
+        return await self.session.scalar(
+            select(func.count(User.id)).where(self._unnormalized_email())
+        )
+
+    async def backfill_deleted_at(self, start: int, end: int) -> int:
+        """Заполняет `deleted_at` из `updated_at` у удаленных с `start <= id < end`.
+
+        Служебная запись: `version` и `updated_at` не меняются, события outbox нет.
+        """
+        stmt = self._statement(
+            "backfill_deleted_at",
+            (),
+            lambda: (
+                update(User)
+                .where(User.id >= bindparam("b_start"), User.id < bindparam("b_end"))
+                .where(User.is_deleted == true(), User.deleted_at.is_(None))
+                .values(deleted_at=User.updated_at, updated_at=User.updated_at)
+                .execution_options(synchronize_session=False)
+            ),
+        )
+        res = await self.session.execute(stmt, {"b_start": start, "b_end": end})
+        return res.rowcount
+
+    async def count_missing_deleted_at(self) -> int:
+        return await self.session.scalar(
+            select(func.count(User.id)).where(
+                User.is_deleted == true(), User.deleted_at.is_(None)
+            )
+        )
+
+    async def find_existing_images(self, names: list[str]) -> set[str]:
+        """Имена файлов из `names`, на которые ссылается какой-либо пользователь."""
+        stmt = self._statement(
+            "images",
+            (),
+            lambda: select(User.image).where(
+                User.image.in_(bindparam("b_names", expanding=True))
+            ),
+        )
+        res = await self.session.scalars(stmt, {"b_names": names})
+        return set(res.all())
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class AuditEventResponse(BaseModel):
+    id: int
+    action: str
+    actor_id: int | None = None
+    target_id: int | None = None
+    ip: str | None = None
+    data: dict | None = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AuditPageResponse(BaseModel):
+    events: list[AuditEventResponse]
+    # `before` следующей страницы, None - страница последняя
+    next_before: int | None = None
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, EmailStr
 
-from schemas.base import IdResponse
+from schemas.user import UserConfirmPasswords
 
 
 class TokenResponse(BaseModel):
@@ -9,7 +9,51 @@ class TokenResponse(BaseModel):
     token_type: str = "Bearer"
 
 
-class TokenUserData(IdResponse):
-    username: str
-    is_superuser: bool = False
-    is_deleted: bool = False
+class TokenUserData:
+    """Пользователь из проверенного токена (principal запроса).
+
+    Легкий объект со `__slots__` вместо pydantic-модели: создается на каждый
+    запрос из claims, подпись которых уже проверена, валидация не нужна.
+    Флаги кодируются в claim `f` битами `SUPERUSER` и `DELETED`.
+    """
+
+    __slots__ = ("id", "is_superuser", "is_deleted")
+
+    SUPERUSER = 1
+    DELETED = 2
+
+    def __init__(
+        self, id: int, is_superuser: bool = False, is_deleted: bool = False
+    ) -> None:
+        self.id = id
+        self.is_superuser = is_superuser
+        self.is_deleted = is_deleted
+
+    @classmethod
+    def from_flags(cls, id: int, flags: int) -> "TokenUserData":
+        return cls(id, bool(flags & cls.SUPERUSER), bool(flags & cls.DELETED))
+
+    @classmethod
+    def from_user(cls, user) -> "TokenUserData":
+        """Из объекта с атрибутами `id`, `is_superuser`, `is_deleted` (модель `User`)."""
+        return cls(user.id, bool(user.is_superuser), bool(user.is_deleted))
+
+    @property
+    def flags(self) -> int:
+        return (self.SUPERUSER if self.is_superuser else 0) | (
+            self.DELETED if self.is_deleted else 0
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"TokenUserData(id={self.id}, is_superuser={self.is_superuser}, "
+            f"is_deleted={self.is_deleted})"
+        )
+
+
+class ForgotPasswordSchema(BaseModel):
+    email: EmailStr
+
+
+class ResetPasswordSchema(UserConfirmPasswords):
+    token: str
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class ChangeEventResponse(BaseModel):
+    seq: int
+    entity: str
+    entity_id: int
+    action: str
+    data: dict
+    created_at: datetime | None = None
+
+
+class ChangesResponse(BaseModel):
+    events: list[ChangeEventResponse]
+    last_seq: int
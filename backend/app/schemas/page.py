@@ -1,10 +1,15 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+from core.config import settings
 
 
 class PagedParamsSchema(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
     limit: int | None = Field(
         10,
         ge=1,
+        le=settings.PAGE_MAX_SIZE,
         description="Page size",
         alias="page[size]",
     )
@@ -0,0 +1,45 @@
+from typing import Annotated
+
+from pydantic import BaseModel, Field, field_validator
+
+from core import exceptions
+from core.permissions import Permission, permission_mask, permission_names
+from schemas.base import OutMixin
+
+
+class ValidPermissions(BaseModel):
+    permissions: list[str] | None = None
+
+    @field_validator("permissions")
+    def known_permissions(cls, value: list[str] | None) -> list[str] | None:
+        if value is not None and not set(value) <= Permission.__members__.keys():
+            raise exceptions.ROLE_EXCEPTION_UNKNOWN_PERMISSION
+        return value
+
+    def values(self) -> dict:
+        """Поля для записи в `role` (права - битовой маской)."""
+        data = self.model_dump(exclude_none=True)
+        if "permissions" in data:
+            data["permissions"] = permission_mask(data["permissions"])
+        return data
+
+
+class RoleCreateSchema(ValidPermissions):
+    name: Annotated[str, Field(min_length=1, max_length=100)]
+    description: Annotated[str | None, Field(max_length=255)] = None
+    permissions: list[str] = []
+
+
+class RoleUpdateSchema(ValidPermissions):
+    name: Annotated[str | None, Field(min_length=1, max_length=100)] = None
+    description: Annotated[str | None, Field(max_length=255)] = None
+
+
+class RoleResponse(OutMixin):
+    name: str
+    description: str | None = None
+    permissions: list[str]
+
+    @field_validator("permissions", mode="before")
+    def names(cls, value: int | list[str]) -> list[str]:
+        return permission_names(value) if isinstance(value, int) else value
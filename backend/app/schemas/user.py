@@ -1,15 +1,21 @@
-from typing import Self
+from typing import Literal, Self
 
 # from core.const import PWD_SPECIAL_CHARS
-from pydantic import BaseModel, EmailStr, field_validator, model_validator
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 
 from core import exceptions
+from core.config import settings
 from schemas.base import OutMixin
 
 
 class ValidEmail(BaseModel):
     email: EmailStr | None = None
 
+    @field_validator("email")
+    def normalize_email(cls, value: str | None) -> str | None:
+        # существующие адреса приводит к тому же виду `normalize_user_emails`
+        return value.lower() if value else value
+
 
 class ValidUsername(BaseModel):
     username: str
@@ -42,7 +48,6 @@ class UserConfirmPasswords(BaseModel):
 
     @model_validator(mode="after")
     def check_passwords_match(self) -> Self:
-        print(self.password, self.confirmation_password)
         if self.password != self.confirmation_password:
             raise exceptions.USER_EXCEPTION_CONFIRMATION_PASSWORD
         return self
@@ -84,6 +89,46 @@ class UserFilterSchema(ValidEmail):
             return value.lower()
 
 
+class UserBatchSelectSchema(BaseModel):
+    """Выбор пользователей для пакетной операции: список id или фильтр."""
+
+    ids: list[int] | None = Field(None, max_length=settings.USER_BATCH_MAX_IDS)
+    filter: UserFilterSchema | None = None
+
+    @model_validator(mode="after")
+    def check_selector(self) -> Self:
+        by_filter = self.filter is not None and self.filter.model_dump(
+            exclude_none=True
+        )
+        if (self.ids is None) == (not by_filter):
+            raise exceptions.USER_EXCEPTION_BATCH_SELECTOR
+        return self
+
+
+class UserBatchUpdateSchema(UserBatchSelectSchema):
+    fullname: str | None = None
+    is_deleted: bool | None = None
+
+    @model_validator(mode="after")
+    def check_values(self) -> Self:
+        if not self.values():
+            raise exceptions.USER_EXCEPTION_BATCH_EMPTY
+        return self
+
+    def values(self) -> dict:
+        return self.model_dump(include={"fullname", "is_deleted"}, exclude_none=True)
+
+
+class UserBatchItemResponse(BaseModel):
+    id: int
+    status: Literal["updated", "deleted", "not_found"]
+
+
+class UserBatchResponse(BaseModel):
+    summary: dict[str, int]
+    results: list[UserBatchItemResponse]
+
+
 class UserResponse(UserSchema, OutMixin):
     image: str | None = None
 
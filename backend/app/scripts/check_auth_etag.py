@@ -0,0 +1,110 @@
+"""Проверка: вход и выход не меняют ETag пользователя и списка пользователей.
+
+Вход пишет `refresh_token`/`last_login`, выход - `refresh_token`/`last_logout`.
+Это служебное состояние: `version` и `updated_at` строки остаются прежними,
+иначе `If-Match` после входа отвечает 412, а ссылка сброса пароля (claim `v`)
+перестает работать. Проверяются оба пути записи входа - сразу
+(`edit_one(..., bump_version=False)`) и отложенный (`auth_state_buffer`).
+
+БД - временный файл, рабочая БД не затрагивается. Код возврата 1, если ETag
+изменился. Запуск из директории `app`:
+
+    python -m scripts.check_auth_etag
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+from core.config import settings
+from core.session_manager import db_manager
+from repositories.user import UserRepository
+from services.auth import AuthService
+from services.helpers.audit import audit_log
+from services.helpers.auth_state import auth_state_buffer
+from services.helpers.etag import entity_etag, list_etag
+from services.helpers.security import hash_pwd
+
+PASSWORD = "check-auth-etag"
+
+
+async def etags(user_id: int) -> tuple[str, str]:
+    async with db_manager.session() as session:
+        repository = UserRepository(session)
+        user = await repository.find_one(id=user_id)
+        state = await repository.find_state(is_deleted=False)
+        return entity_etag(user.id, user.version), list_etag(dict(state))
+
+
+async def login(username: str):
+    form = SimpleNamespace(
+        grant_type="password", username=username, password=PASSWORD, refresh_token=None
+    )
+    async with db_manager.session() as session:
+        return await AuthService(session).login(form)
+
+
+async def logout(access_token: str) -> None:
+    async with db_manager.session() as session:
+        await AuthService(session).logout(access_token)
+
+
+async def check() -> list[str]:
+    await db_manager.create_all()
+    async with db_manager.session() as session:
+        user = await UserRepository(session).add_one(
+            {"username": "etag", "hashed_password": hash_pwd(PASSWORD)}
+        )
+        await session.commit()
+        user_id = user.id
+
+    failures = []
+    before = await etags(user_id)
+    tokens = await login("etag")
+    if await etags(user_id) != before:
+        failures.append("login")
+    await logout(tokens.access_token)
+    if await etags(user_id) != before:
+        failures.append("logout")
+
+    auth_state_buffer.start()
+    try:
+        await login("etag")
+        await auth_state_buffer.flush()
+    finally:
+        await auth_state_buffer.stop()
+    if await etags(user_id) != before:
+        failures.append("login (write-behind)")
+    return failures
+
+
+async def run() -> list[str]:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    settings.SQLALCHEMY_DATABASE_URI = f"sqlite+aiosqlite:///{path}"
+    settings.SQL_PROFILER_ENABLED = False
+    audit_log.enabled = False
+    db_manager.init_from_settings()
+    try:
+        return await check()
+    finally:
+        await db_manager.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main() -> int:
+    failures = asyncio.run(run())
+    for name in failures:
+        print(f"ETag changed after {name}")
+    if failures:
+        return 1
+    print("ETag unchanged after login and logout")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Соотношение CPU и размера ответа при сжатии страниц `/users/`.
+
+Запуск из директории `app`:
+
+    python -m scripts.compression --sizes 10 100 1000
+    python -m scripts.compression --encoding gzip --levels 1 6 9 --json
+"""
+
+import argparse
+import datetime
+import json
+import sys
+import time
+
+import orjson
+
+from core.compression import ENCODERS, compress
+
+
+def page_payload(size: int) -> bytes:
+    """Тело ответа `PageResponse` с `size` пользователями."""
+    created_at = datetime.datetime(2024, 1, 1).strftime("%d/%m/%Y, %H:%M:%S")
+    return orjson.dumps(
+        {
+            "page_info": {
+                "total": size * 10,
+                "page": 1,
+                "size": size,
+                "first": 1,
+                "last": 10,
+                "previous": None,
+                "next": 2,
+            },
+            "page_data": [
+                {
+                    "id": i,
+                    "created_at": created_at,
+                    "username": f"user{i}",
+                    "email": f"user{i}@example.com",
+                    "fullname": f"User Number {i}",
+                    "image": None,
+                }
+                for i in range(size)
+            ],
+        }
+    )
+
+
+def measure(encoding: str, level: int, body: bytes, runs: int) -> dict:
+    started = time.perf_counter()
+    for _ in range(runs):
+        compressed = compress(encoding, level, body)
+    elapsed = (time.perf_counter() - started) / runs
+    return {
+        "encoding": encoding,
+        "level": level,
+        "bytes": len(compressed),
+        "ratio": round(len(body) / len(compressed), 2),
+        "us": round(elapsed * 1e6, 1),
+        "mb_per_s": round(len(body) / elapsed / 1e6, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--encoding", choices=list(ENCODERS), nargs="+")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 3, 6, 9])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+    args = parser.parse_args()
+
+    report = []
+    for size in args.sizes:
+        body = page_payload(size)
+        for encoding in args.encoding or ENCODERS:
+            for level in args.levels:
+                row = measure(encoding, level, body, args.runs)
+                report.append({"page_size": size, "identity": len(body), **row})
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"{'page':>5} {'identity':>9} {'enc':>5} {'lvl':>3} {'bytes':>8} {'ratio':>6} {'us':>9}"
+        )
+        for row in report:
+            print(
+                f"{row['page_size']:5} {row['identity']:9} {row['encoding']:>5} "
+                f"{row['level']:3} {row['bytes']:8} {row['ratio']:6} {row['us']:9}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
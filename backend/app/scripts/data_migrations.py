@@ -0,0 +1,84 @@
+"""Онлайн-миграции данных из `data_migrations` (после/вне `alembic upgrade`).
+
+Запуск из директории `app` (размер порции и пауза по умолчанию - `DATA_MIGRATION_*`):
+
+    python -m scripts.data_migrations list
+    python -m scripts.data_migrations run normalize_user_emails --batch-size 500 --sleep 0.5
+    python -m scripts.data_migrations run --all
+    python -m scripts.data_migrations run normalize_user_emails --dry-run
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from core.config import settings
+from core.data_migration import DataMigrationRunner
+from core.session_manager import db_manager
+from data_migrations import MIGRATIONS
+
+
+async def run(args) -> dict:
+    runner = DataMigrationRunner(args.batch_size, args.sleep)
+    if args.command == "list":
+        names = list(MIGRATIONS)
+    elif args.all:
+        names = list(MIGRATIONS)
+    else:
+        names = args.names
+    report = {}
+    db_manager.init_from_settings()
+    try:
+        for name in names:
+            migration = MIGRATIONS[name]
+            if args.command == "list":
+                report[name] = {
+                    "description": migration.description,
+                    **await runner.status(migration),
+                }
+            elif args.dry_run:
+                async with db_manager.session() as session:
+                    report[name] = {"pending": await migration.pending(session)}
+            else:
+                report[name] = await runner.run(migration, restart=args.restart)
+                if report[name]["status"] == "locked":
+                    break
+    finally:
+        await db_manager.close()
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Миграции и их состояние")
+    run_parser = commands.add_parser("run", help="Выполнить или продолжить")
+    run_parser.add_argument("names", nargs="*", metavar="name")
+    run_parser.add_argument("--all", action="store_true")
+    run_parser.add_argument("--restart", action="store_true", help="Выполнить заново")
+    run_parser.add_argument("--dry-run", action="store_true", help="Только подсчет")
+    for sub in (parser, run_parser):
+        sub.set_defaults(
+            batch_size=settings.DATA_MIGRATION_BATCH_SIZE,
+            sleep=settings.DATA_MIGRATION_SLEEP,
+            all=False,
+            names=[],
+        )
+    run_parser.add_argument("--batch-size", type=int)
+    run_parser.add_argument("--sleep", type=float)
+    args = parser.parse_args()
+    if args.command == "run" and not (args.names or args.all):
+        parser.error("specify migration names or --all")
+    unknown = set(args.names) - MIGRATIONS.keys()
+    if unknown:
+        parser.error(f"unknown migrations: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2, default=str))
+    locked = any(item.get("status") == "locked" for item in report.values())
+    return 1 if locked else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
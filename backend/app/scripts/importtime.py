@@ -0,0 +1,107 @@
+"""Профиль времени импорта приложения (`python -X importtime`).
+
+Запуск из директории `app`:
+
+    python -m scripts.importtime --runs 5 --top 15
+    python -m scripts.importtime --json > importtime.json
+    python -m scripts.importtime --max-ms 1200  # код возврата 1 при превышении
+    python -m scripts.importtime --max-app-ms 150
+
+`app_ms` - сумма собственного времени модулей из директории `app`:
+та часть импорта, которая зависит от кода приложения, а не от фреймворков.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+
+def measure(module: str) -> dict[str, tuple[int, int]]:
+    """Импортирует модуль в отдельном процессе.
+
+    Returns:
+        Словарь `{модуль: (self_us, cumulative_us)}`.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        result[name.strip()] = (int(self_us), int(cumulative_us))
+    return result
+
+
+def is_app_module(name: str) -> bool:
+    """Модуль лежит в директории приложения (а не в site-packages)."""
+    top = name.split(".")[0]
+    return (APP_DIR / top).is_dir() or (APP_DIR / f"{top}.py").is_file()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+    parser.add_argument("--max-ms", type=float, default=None)
+    parser.add_argument("--max-app-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    totals_ms = [run[args.module][1] / 1000 for run in runs]
+    median_ms = statistics.median(totals_ms)
+    app_ms = statistics.median(
+        sum(value[0] for name, value in run.items() if is_app_module(name)) / 1000
+        for run in runs
+    )
+
+    # медиана по каждому модулю, чтобы сгладить шум файлового кэша
+    names = set.intersection(*(set(run) for run in runs))
+    modules = {
+        name: (
+            statistics.median(run[name][0] for run in runs) / 1000,
+            statistics.median(run[name][1] for run in runs) / 1000,
+        )
+        for name in names
+    }
+    top_self = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)
+
+    if args.json:
+        report = {
+            "module": args.module,
+            "runs": args.runs,
+            "total_ms": {"median": median_ms, "min": min(totals_ms)},
+            "app_ms": app_ms,
+            "top_self_ms": {name: value[0] for name, value in top_self[: args.top]},
+        }
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"import {args.module}: median {median_ms:.1f} ms, min {min(totals_ms):.1f} ms"
+            f", app {app_ms:.1f} ms"
+        )
+        print(f"{'self ms':>9} {'cumul ms':>9}  module")
+        for name, (self_ms, cumulative_ms) in top_self[: args.top]:
+            print(f"{self_ms:9.1f} {cumulative_ms:9.1f}  {name}")
+
+    if args.max_ms is not None and median_ms > args.max_ms:
+        return 1
+    if args.max_app_ms is not None and app_ms > args.max_app_ms:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""Пропускная способность входа (`AuthService.login`) с отложенной записью и без.
+
+Вход по refresh токену (`grant_type=refresh_token`): без bcrypt основное время
+входа - UPDATE и commit строки пользователя, которые убирает `auth_state_buffer`.
+`--grant password` добавляет проверку пароля bcrypt.
+
+Бенчмарк создает пользователей `login_bench_<i>` в БД из настроек (используйте
+отдельную БД). Запуск из директории `app`:
+
+    python -m scripts.login_bench --requests 5000 --concurrency 50
+    python -m scripts.login_bench --grant password --requests 200 --json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import select
+
+from core.session_manager import db_manager
+from models import User
+from repositories.user import UserRepository
+from schemas.auth import TokenUserData
+from services.auth import AuthService
+from services.helpers.audit import audit_log
+from services.helpers.auth_state import auth_state_buffer
+from services.helpers.security import create_jwt_tokens, hash_pwd
+
+PASSWORD = "login-bench"
+
+
+async def prepare_users(count: int) -> list[User]:
+    names = [f"login_bench_{i}" for i in range(count)]
+    async with db_manager.session() as session:
+        existing = set(
+            (
+                await session.scalars(
+                    select(User.username).where(User.username.in_(names))
+                )
+            ).all()
+        )
+        missing = [name for name in names if name not in existing]
+        if missing:
+            hashed = hash_pwd(PASSWORD)
+            repository = UserRepository(session)
+            repository.outbox_enabled = False
+            await repository.add_many(
+                [{"username": name, "hashed_password": hashed} for name in missing]
+            )
+            await session.commit()
+        return list(
+            (await session.scalars(select(User).where(User.username.in_(names)))).all()
+        )
+
+
+def login_forms(users: list[User], grant: str) -> list[SimpleNamespace]:
+    if grant == "password":
+        return [
+            SimpleNamespace(
+                grant_type="password",
+                username=user.username,
+                password=PASSWORD,
+                refresh_token=None,
+            )
+            for user in users
+        ]
+    return [
+        SimpleNamespace(
+            grant_type="refresh_token",
+            username=None,
+            password=None,
+            refresh_token=create_jwt_tokens(
+                TokenUserData.from_user(user)
+            ).refresh_token,
+        )
+        for user in users
+    ]
+
+
+async def measure(forms: list, requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    queue = iter(range(requests))
+
+    async def worker() -> None:
+        for i in queue:
+            started = time.perf_counter()
+            async with db_manager.session() as session:
+                await AuthService(session).login(forms[i % len(forms)])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "logins_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+    }
+
+
+async def run(args) -> dict:
+    db_manager.init_from_settings()
+    # журнал аудита не входит в измерение
+    audit_log.enabled = False
+    try:
+        forms = login_forms(await prepare_users(args.users), args.grant)
+        result = {"grant": args.grant, "requests": args.requests}
+        result["inline"] = await measure(forms, args.requests, args.concurrency)
+
+        auth_state_buffer.interval = args.interval
+        auth_state_buffer.start()
+        result["write_behind"] = await measure(forms, args.requests, args.concurrency)
+        started = time.perf_counter()
+        await auth_state_buffer.stop()
+        result["write_behind"]["final_flush_ms"] = round(
+            (time.perf_counter() - started) * 1000, 2
+        )
+        result["speedup"] = round(
+            result["write_behind"]["logins_per_s"] / result["inline"]["logins_per_s"],
+            2,
+        )
+        return result
+    finally:
+        await db_manager.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--grant", choices=["refresh_token", "password"], default="refresh_token"
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=200, help="Разных пользователей")
+    parser.add_argument(
+        "--interval", type=float, default=0.5, help="AUTH_WRITE_BEHIND_INTERVAL"
+    )
+    parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result))
+        return 0
+    print(f"{'mode':<14}{'logins/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for mode in ("inline", "write_behind"):
+        stats = result[mode]
+        print(
+            f"{mode:<14}{stats['logins_per_s']:>10}"
+            f"{stats['p50_ms']:>10}{stats['p99_ms']:>10}"
+        )
+    print(f"speedup: x{result['speedup']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
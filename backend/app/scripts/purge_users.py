@@ -0,0 +1,58 @@
+"""Очистка удаленных пользователей и файлов аватаров без ссылок.
+
+Запуск из директории `app` (параметры по умолчанию - из настроек `USER_PURGE_*`):
+
+    python -m scripts.purge_users --dry-run
+    python -m scripts.purge_users --mode delete --retention-days 90 --batch-size 500
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from core.config import settings
+from core.session_manager import db_manager
+from services.purge import UserPurge
+
+
+async def run(args) -> dict | None:
+    purge = UserPurge(
+        mode=args.mode,
+        retention_days=args.retention_days,
+        batch_size=args.batch_size,
+        sleep=args.sleep,
+        file_grace=settings.USER_PURGE_FILE_GRACE,
+    )
+    db_manager.init_from_settings()
+    try:
+        return await (purge.preview() if args.dry_run else purge.run())
+    finally:
+        await db_manager.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--mode", choices=["archive", "delete"], default=settings.USER_PURGE_MODE
+    )
+    parser.add_argument(
+        "--retention-days", type=int, default=settings.USER_PURGE_RETENTION_DAYS
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.USER_PURGE_BATCH_SIZE
+    )
+    parser.add_argument("--sleep", type=float, default=settings.USER_PURGE_SLEEP)
+    parser.add_argument("--dry-run", action="store_true", help="Только подсчет")
+    args = parser.parse_args()
+
+    stats = asyncio.run(run(args))
+    if stats is None:
+        print("Purge is already running in another process", file=sys.stderr)
+        return 1
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
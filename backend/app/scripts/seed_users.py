@@ -0,0 +1,281 @@
+"""Генерация синтетических пользователей для нагрузочных тестов.
+
+Данные детерминированы: при одинаковых `--seed` и `--count` строка с номером `i`
+всегда одна и та же (кроме соли bcrypt в `hashed_password`), поэтому
+бенчмарки пагинации, поиска и подсчета сравнимы между запусками.
+Запуск из директории `app`:
+
+    python -m scripts.seed_users --count 1000000 --seed 1
+    python -m scripts.seed_users --count 10000000 --copy --batch-size 20000
+    python -m scripts.seed_users --count 1000000 --start 400000  # продолжение
+    python -m scripts.seed_users --count 1000 --dry-run
+"""
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+from loguru import logger
+from sqlalchemy import text
+
+from core.config import settings
+from core.session_manager import db_manager
+from models import User
+from repositories.user import UserRepository
+from services.helpers.security import hash_pwd
+
+# строк на один генератор случайных чисел: строка `i` не зависит от
+# `--start` и `--batch-size`
+BLOCK_SIZE = 1000
+
+FIRST_NAMES = (
+    "alexander", "maria", "ivan", "anna", "dmitry", "elena", "sergey", "olga",
+    "andrey", "natalia", "alexey", "tatiana", "mikhail", "irina", "nikolai",
+    "svetlana", "john", "mary", "james", "patricia", "robert", "jennifer",
+    "michael", "linda", "david", "elizabeth", "william", "barbara", "daniel",
+    "susan", "maxim", "ekaterina", "artem", "daria", "pavel", "julia", "igor",
+    "victoria", "roman", "sofia",
+)  # fmt: skip
+LAST_NAMES = (
+    "ivanov", "smirnov", "kuznetsov", "popov", "vasiliev", "petrov", "sokolov",
+    "mikhailov", "novikov", "fedorov", "morozov", "volkov", "alekseev",
+    "lebedev", "semenov", "egorov", "smith", "johnson", "williams", "brown",
+    "jones", "garcia", "miller", "davis", "rodriguez", "martinez", "wilson",
+    "anderson", "taylor", "thomas", "moore", "jackson", "martin", "lee",
+    "thompson", "white", "harris", "clark", "lewis", "walker",
+)  # fmt: skip
+EMAIL_DOMAINS = (
+    ("gmail.com", 40), ("yandex.ru", 18), ("mail.ru", 14), ("outlook.com", 8),
+    ("yahoo.com", 6), ("icloud.com", 5), ("proton.me", 2), ("example.com", 7),
+)  # fmt: skip
+
+
+def _zipf_weights(size: int, exponent: float = 0.9) -> list[float]:
+    # частые имена встречаются намного чаще редких
+    return list(itertools.accumulate(1 / rank**exponent for rank in range(1, size + 1)))
+
+
+FIRST_WEIGHTS = _zipf_weights(len(FIRST_NAMES))
+LAST_WEIGHTS = _zipf_weights(len(LAST_NAMES))
+DOMAINS = [domain for domain, _ in EMAIL_DOMAINS]
+DOMAIN_WEIGHTS = list(itertools.accumulate(weight for _, weight in EMAIL_DOMAINS))
+
+
+class UserGenerator:
+    """Строки таблицы `user`, строка `i` зависит только от `seed`, `count` и `i`.
+
+    Args:
+        seed: Зерно генератора,
+        count: Размер набора (распределение `created_at` по периоду),
+        hashes: Заранее вычисленные хэши паролей (по кругу),
+        deleted_fraction: Доля удаленных пользователей,
+        since: Начало периода регистрации,
+        days: Длина периода регистрации.
+    """
+
+    def __init__(
+        self,
+        seed: int,
+        count: int,
+        hashes: list[str],
+        deleted_fraction: float = 0.05,
+        since: datetime = datetime(2020, 1, 1, tzinfo=timezone.utc),
+        days: int = 1825,
+    ) -> None:
+        self.seed = seed
+        self.count = count
+        self.hashes = hashes
+        self.deleted_fraction = deleted_fraction
+        self.since = since
+        self.span = timedelta(days=days).total_seconds()
+
+    def rows(self, start: int = 0, stop: int | None = None) -> Iterator[dict]:
+        """Строки с номерами `start <= i < stop`."""
+        stop = self.count if stop is None else stop
+        for block in range(start // BLOCK_SIZE, (stop - 1) // BLOCK_SIZE + 1):
+            rng = random.Random(f"{self.seed}:{block}")
+            first = block * BLOCK_SIZE
+            for i in range(first, first + BLOCK_SIZE):
+                row = self._row(rng, i)
+                if start <= i < stop:
+                    yield row
+
+    def _at(self, offset: float) -> datetime:
+        return self.since + timedelta(seconds=offset)
+
+    def _row(self, rng: random.Random, i: int) -> dict:
+        # одинаковое число вызовов rng на строку: строки блока не зависят
+        # от пропущенных строк
+        first, last = (
+            rng.choices(FIRST_NAMES, cum_weights=FIRST_WEIGHTS)[0],
+            rng.choices(LAST_NAMES, cum_weights=LAST_WEIGHTS)[0],
+        )
+        style, has_email, has_fullname, deleted, logged_in, r1, r2, r3 = (
+            rng.randrange(3),
+            rng.random() >= 0.08,
+            rng.random() >= 0.15,
+            rng.random() < self.deleted_fraction,
+            rng.random() < 0.7,
+            rng.random(),
+            rng.random(),
+            rng.random(),
+        )
+        domain = rng.choices(DOMAINS, cum_weights=DOMAIN_WEIGHTS)[0]
+        # суффикс - номер строки: имена уникальны без проверок;
+        # только латиница и цифры, как требует `UserSchema`
+        suffix = format(i, "x")
+        username = (
+            f"{first}{last}{suffix}",
+            f"{first[0]}{last}{suffix}",
+            f"{first}{last[0]}{suffix}",
+        )[style]
+        # регистрации равномерно по периоду в порядке id
+        created = (i + r1) * self.span / self.count
+        updated = created + (self.span - created) * r2
+        return {
+            "username": username,
+            "hashed_password": self.hashes[i % len(self.hashes)],
+            "fullname": f"{first.title()} {last.title()}" if has_fullname else None,
+            "email": f"{username}@{domain}" if has_email else None,
+            "is_deleted": deleted,
+            "created_at": self._at(created),
+            "updated_at": self._at(updated),
+            # удаление - последнее изменение строки
+            "deleted_at": self._at(updated) if deleted else None,
+            "last_login": (
+                self._at(created + (updated - created) * r3) if logged_in else None
+            ),
+        }
+
+
+COPY_COLUMNS = (
+    "username",
+    "hashed_password",
+    "fullname",
+    "email",
+    "is_deleted",
+    "created_at",
+    "updated_at",
+    "deleted_at",
+    "last_login",
+)
+
+
+async def _insert(session, rows: list[dict], copy: bool) -> None:
+    if copy:
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            User.__tablename__,
+            records=[tuple(row[name] for name in COPY_COLUMNS) for row in rows],
+            columns=COPY_COLUMNS,
+            schema_name=settings.DB_SCHEMA,
+        )
+        return
+    repository = UserRepository(session)
+    # загрузка набора, а не изменения: в outbox не пишется
+    repository.outbox_enabled = False
+    await repository.add_many(rows)
+
+
+async def load(generator: UserGenerator, args) -> dict:
+    db_manager.init_from_settings()
+    try:
+        async with db_manager.connect() as connection:
+            dialect = connection.dialect.name
+        copy = args.copy and dialect == "postgresql"
+        if args.copy and not copy:
+            logger.warning("COPY is supported on PostgreSQL only, using INSERT")
+        started = time.perf_counter()
+        loaded = 0
+        rows = generator.rows(args.start)
+        while batch := list(itertools.islice(rows, args.batch_size)):
+            async with db_manager.session() as session:
+                await _insert(session, batch, copy)
+                await session.commit()
+            loaded += len(batch)
+            logger.info(
+                "Loaded {} / {} ({:.0f} rows/s)",
+                args.start + loaded,
+                generator.count,
+                loaded / (time.perf_counter() - started),
+            )
+        # статистика планировщика для запросов бенчмарков
+        async with db_manager.connect() as connection:
+            await connection.execute(
+                text(f'ANALYZE "{User.__tablename__}"')
+                if dialect == "postgresql"
+                else text("ANALYZE")
+            )
+            await connection.commit()
+        return {
+            "loaded": loaded,
+            "method": "copy" if copy else "insert",
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+    finally:
+        await db_manager.close()
+
+
+def preview(generator: UserGenerator, start: int) -> dict:
+    """Сводка и контрольная сумма набора без записи в БД."""
+    digest = hashlib.sha256()
+    stats = {"rows": 0, "deleted": 0, "with_email": 0, "with_fullname": 0}
+    for row in generator.rows(start):
+        stats["rows"] += 1
+        stats["deleted"] += row["is_deleted"]
+        stats["with_email"] += row["email"] is not None
+        stats["with_fullname"] += row["fullname"] is not None
+        row = {**row, "hashed_password": None}
+        digest.update(json.dumps(row, default=str, sort_keys=True).encode())
+    stats["checksum"] = digest.hexdigest()
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, required=True, help="Размер набора")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--start", type=int, default=0, help="Первая строка (продолжение загрузки)"
+    )
+    parser.add_argument("--deleted-fraction", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument(
+        "--password", default="password", help="Пароль всех пользователей"
+    )
+    parser.add_argument(
+        "--hashes", type=int, default=4, help="Разных хэшей пароля (bcrypt)"
+    )
+    parser.add_argument(
+        "--copy", action="store_true", help="COPY вместо INSERT (PostgreSQL)"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Только сводка и контрольная сумма"
+    )
+    args = parser.parse_args()
+    if not 0 <= args.start <= args.count or args.batch_size < 1 or args.hashes < 1:
+        parser.error("expected 0 <= --start <= --count, --batch-size and --hashes >= 1")
+
+    # bcrypt считается `--hashes` раз на весь набор, а не на строку
+    hashes = (
+        [""] if args.dry_run else [hash_pwd(args.password) for _ in range(args.hashes)]
+    )
+    generator = UserGenerator(args.seed, args.count, hashes, args.deleted_fraction)
+    if args.dry_run:
+        stats = preview(generator, args.start)
+    else:
+        stats = asyncio.run(load(generator, args))
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Смешанная нагрузка чтение/запись на SQLite: профиль `DB_SQLITE_PROFILE` и без него.
+
+Каждый процесс (как воркер uvicorn) выполняет `--concurrency` задач:
+доля `--read-ratio` - страница пользователей (`find_by_page`), остальное -
+`edit_one` с коммитом. БД - временный файл, рабочая БД не затрагивается.
+Запуск из директории `app`:
+
+    python -m scripts.sqlite_bench --processes 4 --concurrency 20 --duration 10
+    python -m scripts.sqlite_bench --read-ratio 0.5 --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from core.config import settings
+from core.session_manager import db_manager
+from repositories.user import UserRepository
+
+MODES = {"plain": False, "profile": True}
+
+
+def _use(path: str, profile: bool) -> None:
+    settings.SQLALCHEMY_DATABASE_URI = f"sqlite+aiosqlite:///{path}"
+    settings.DB_SQLITE_PROFILE = profile
+    settings.SQL_PROFILER_ENABLED = False
+
+
+async def _seed(path: str, users: int) -> None:
+    _use(path, False)
+    db_manager.init_from_settings()
+    try:
+        await db_manager.create_all()
+        async with db_manager.session() as session:
+            repository = UserRepository(session)
+            repository.outbox_enabled = False
+            await repository.add_many(
+                [
+                    {"username": f"bench{i}", "hashed_password": "-"}
+                    for i in range(users)
+                ]
+            )
+            await session.commit()
+    finally:
+        await db_manager.close()
+
+
+async def _workload(args, path: str, profile: bool, seed: int) -> dict:
+    _use(path, profile)
+    db_manager.init_from_settings()
+    rng = random.Random(seed)
+    stats = {"read": [], "write": [], "errors": 0}
+    deadline = time.perf_counter() + args.duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            read = rng.random() < args.read_ratio
+            started = time.perf_counter()
+            try:
+                async with db_manager.session() as session:
+                    repository = UserRepository(session)
+                    if read:
+                        page = rng.randrange(1, max(args.users // 20, 1) + 1)
+                        await repository.find_by_page(20, page)
+                    else:
+                        user_id = rng.randrange(1, args.users + 1)
+                        await repository.edit_one(
+                            user_id, {"fullname": f"name {rng.random()}"}
+                        )
+                        await session.commit()
+            except Exception:
+                stats["errors"] += 1
+                continue
+            stats["read" if read else "write"].append(time.perf_counter() - started)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    finally:
+        await db_manager.close()
+    return stats
+
+
+def _process(args, path: str, profile: bool, seed: int) -> dict:
+    return asyncio.run(_workload(args, path, profile, seed))
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(int(len(values) * q), len(values) - 1)] * 1000, 2)
+
+
+def run_mode(args, profile: bool) -> dict:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        asyncio.run(_seed(path, args.users))
+        with ProcessPoolExecutor(args.processes) as pool:
+            results = list(
+                pool.map(
+                    _process,
+                    [args] * args.processes,
+                    [path] * args.processes,
+                    [profile] * args.processes,
+                    range(args.processes),
+                )
+            )
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    reads = [value for result in results for value in result["read"]]
+    writes = [value for result in results for value in result["write"]]
+    return {
+        "ops_per_s": round((len(reads) + len(writes)) / args.duration, 1),
+        "reads_per_s": round(len(reads) / args.duration, 1),
+        "writes_per_s": round(len(writes) / args.duration, 1),
+        "errors": sum(result["errors"] for result in results),
+        "read_p50_ms": _percentile(reads, 0.5),
+        "read_p99_ms": _percentile(reads, 0.99),
+        "write_p50_ms": _percentile(writes, 0.5),
+        "write_p99_ms": _percentile(writes, 0.99),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=2, help="Воркеров")
+    parser.add_argument("--concurrency", type=int, default=20, help="Задач на воркер")
+    parser.add_argument("--duration", type=float, default=5.0, help="Секунд на режим")
+    parser.add_argument("--read-ratio", type=float, default=0.9)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+    args = parser.parse_args()
+
+    result = {mode: run_mode(args, MODES[mode]) for mode in args.modes}
+    if args.json:
+        print(json.dumps(result))
+        return 0
+    columns = list(next(iter(result.values())))
+    print(f"{'mode':<10}" + "".join(f"{name:>14}" for name in columns))
+    for mode, stats in result.items():
+        print(f"{mode:<10}" + "".join(f"{stats[name]:>14}" for name in columns))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Накладные расходы вызова репозитория с `statement_cache` и без него.
+
+Без кэша (`max_size=0`) запрос строится заново на каждом вызове, и SQLAlchemy
+каждый раз вычисляет ключ кэша компиляции. Вызовы выполняются по одному
+на временном файле SQLite (рабочая БД не затрагивается), поэтому разница
+времени - это построение запроса и его ключа. Запуск из директории `app`:
+
+    python -m scripts.statement_cache_bench --calls 5000
+    python -m scripts.statement_cache_bench --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from core.config import settings
+from core.session_manager import db_manager
+from repositories.base import statement_cache
+from repositories.user import UserRepository
+
+USERS = 1000
+
+
+async def _seed() -> None:
+    await db_manager.create_all()
+    async with db_manager.session() as session:
+        repository = UserRepository(session)
+        repository.outbox_enabled = False
+        await repository.add_many(
+            [{"username": f"bench{i}", "hashed_password": "-"} for i in range(USERS)]
+        )
+        await session.commit()
+
+
+def operations(repository: UserRepository) -> dict:
+    """Вызовы репозитория по номеру итерации."""
+    return {
+        "find_one_or_none": lambda i: repository.find_one_or_none(id=i % USERS + 1),
+        "find_by_page": lambda i: repository.find_by_page(
+            20, i % (USERS // 20) + 1, is_deleted=False
+        ),
+        "count": lambda i: repository.count(is_deleted=False),
+        "edit_one": lambda i: repository.edit_one(
+            i % USERS + 1, {"fullname": f"name {i}"}
+        ),
+    }
+
+
+async def measure(calls: int) -> dict:
+    result = {}
+    async with db_manager.session() as session:
+        for name, call in operations(UserRepository(session)).items():
+            # прогрев: кэш запросов и кэш компиляции SQLAlchemy
+            for i in range(100):
+                await call(i)
+            latencies = []
+            for i in range(calls):
+                started = time.perf_counter()
+                await call(i)
+                latencies.append(time.perf_counter() - started)
+            await session.rollback()
+            latencies.sort()
+            result[name] = {
+                "mean_us": round(sum(latencies) / calls * 1e6, 1),
+                "p50_us": round(latencies[calls // 2] * 1e6, 1),
+            }
+    return result
+
+
+async def run(args) -> dict:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    settings.SQLALCHEMY_DATABASE_URI = f"sqlite+aiosqlite:///{path}"
+    settings.SQL_PROFILER_ENABLED = False
+    db_manager.init_from_settings()
+    try:
+        await _seed()
+        max_size = statement_cache.max_size
+        result = {"cached": await measure(args.calls)}
+        statement_cache.clear()
+        statement_cache.max_size = 0
+        result["uncached"] = await measure(args.calls)
+        statement_cache.max_size = max_size
+        result["saved_us"] = {
+            name: round(
+                result["uncached"][name]["mean_us"] - stats["mean_us"],
+                1,
+            )
+            for name, stats in result["cached"].items()
+        }
+        return result
+    finally:
+        await db_manager.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000, help="Вызовов на операцию")
+    parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result))
+        return 0
+    print(f"{'operation':<18}{'cached us':>12}{'uncached us':>14}{'saved us':>10}")
+    for name, stats in result["cached"].items():
+        print(
+            f"{name:<18}{stats['mean_us']:>12}"
+            f"{result['uncached'][name]['mean_us']:>14}{result['saved_us'][name]:>10}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Сравнение формата токенов: размер заголовка `Authorization` и время разбора.
+
+Формат 1 - прежние claims (`model_dump()` pydantic-схемы и `token_type`),
+разбор - прежний путь (два `jwt.decode` и две pydantic-модели на запрос).
+Формат 2 - компактные claims и `get_token_user`.
+Запуск из директории `app`:
+
+    python -m scripts.token_bench --number 20000
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from datetime import timedelta
+
+import jwt
+from pydantic import BaseModel
+
+from core.config import settings
+from schemas.auth import TokenUserData
+from services.helpers.security import (
+    create_token,
+    get_token_user,
+    now_utc,
+    token_claims,
+)
+
+
+class LegacyTokenUserData(BaseModel):
+    id: int
+    username: str
+    is_superuser: bool = False
+    is_deleted: bool = False
+
+
+def legacy_token(user: LegacyTokenUserData) -> str:
+    payload = {**user.model_dump(), "token_type": "access"}
+    payload["exp"] = now_utc() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return jwt.encode(payload, settings.SECRET_KEY, settings.ALGORITHM)
+
+
+def legacy_get_token_user(token: str) -> LegacyTokenUserData:
+    payload = jwt.decode(token, settings.SECRET_KEY, [settings.ALGORITHM])
+    if payload.get("token_type") == "reset":
+        raise ValueError("reset token")
+    LegacyTokenUserData(**payload)
+    payload = jwt.decode(token, settings.SECRET_KEY, [settings.ALGORITHM])
+    return LegacyTokenUserData(**payload)
+
+
+def run(args) -> dict:
+    legacy_user = LegacyTokenUserData(
+        id=args.user_id, username=args.username, is_superuser=True
+    )
+    old = legacy_token(legacy_user)
+    new = create_token(
+        token_claims(TokenUserData(args.user_id, is_superuser=True), "access"),
+        timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    header = "Authorization: Bearer {}\r\n"
+    timings = {
+        "legacy_path_legacy_token": (legacy_get_token_user, old),
+        "new_path_legacy_token": (get_token_user, old),
+        "new_path_new_token": (get_token_user, new),
+    }
+    report = {
+        "token_bytes": {"legacy": len(old), "new": len(new)},
+        "header_bytes_saved": len(header.format(old)) - len(header.format(new)),
+    }
+    for name, (function, token) in timings.items():
+        seconds = min(
+            timeit.repeat(lambda: function(token), number=args.number, repeat=3)
+        )
+        report[f"{name}_us"] = round(seconds / args.number * 1e6, 2)
+    report["decode_speedup"] = round(
+        report["legacy_path_legacy_token_us"] / report["new_path_new_token_us"], 2
+    )
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--user-id", type=int, default=123456)
+    parser.add_argument("--username", default="john.doe.example")
+    args = parser.parse_args()
+    if not settings.SECRET_KEY:
+        parser.error("SECRET_KEY is not set")
+    print(json.dumps(run(args), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Нагрузочная проверка `/ws`: много простаивающих соединений.
+
+Клиент без зависимостей (asyncio + RFC 6455), отвечает на `ping` сервера.
+Запуск из директории `app` (нужен `ulimit -n` больше числа соединений):
+
+    python -m scripts.ws_load --token <access_token> --connections 10000
+    python -m scripts.ws_load --url ws://host:8000/api/v1/ws --token ... --duration 300
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import struct
+import sys
+import time
+from urllib.parse import urlsplit
+
+PONG = b'{"type":"pong"}'
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.open = 0
+        self.connected = 0
+        self.failed = 0
+        self.closed = 0
+        self.messages = 0
+        self.pings = 0
+        self.connect_times: list[float] = []
+
+
+def frame(opcode: int, payload: bytes) -> bytes:
+    """Кадр клиента (с маской)."""
+    mask = os.urandom(4)
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, 0x80 | length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, length)
+    masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return header + mask + masked
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    return first & 0x0F, await reader.readexactly(length)
+
+
+async def client(url: str, token: str, duration: float, stats: Stats) -> None:
+    parts = urlsplit(url)
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write(
+            (
+                f"GET {parts.path} HTTP/1.1\r\n"
+                f"Host: {parts.netloc}\r\n"
+                f"Sec-WebSocket-Protocol: bearer, {token}\r\n"
+                "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+            ).encode()
+        )
+        response = await reader.readuntil(b"\r\n\r\n")
+        if b" 101 " not in response.split(b"\r\n", 1)[0]:
+            raise ConnectionError(response.split(b"\r\n", 1)[0].decode())
+    except (OSError, asyncio.IncompleteReadError, ConnectionError):
+        stats.failed += 1
+        return
+    stats.connect_times.append(time.perf_counter() - started)
+    stats.connected += 1
+    stats.open += 1
+    try:
+        async with asyncio.timeout(duration):
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    writer.write(frame(0xA, payload))
+                elif opcode == 0x1:
+                    stats.messages += 1
+                    if payload == b'{"type":"ping"}':
+                        stats.pings += 1
+                        writer.write(frame(0x1, PONG))
+    except TimeoutError:
+        writer.write(frame(0x8, struct.pack("!H", 1000)))
+    except (OSError, asyncio.IncompleteReadError):
+        pass
+    else:
+        stats.closed += 1
+    finally:
+        stats.open -= 1
+        writer.close()
+
+
+async def run(args) -> dict:
+    stats = Stats()
+    tasks = []
+    started = time.perf_counter()
+    for i in range(args.connections):
+        tasks.append(
+            asyncio.create_task(client(args.url, args.token, args.duration, stats))
+        )
+        if args.rate and i % args.rate == args.rate - 1:
+            await asyncio.sleep(1)
+    ramp = time.perf_counter() - started
+    await asyncio.sleep(min(args.duration, 5))
+    holding = stats.open
+    await asyncio.gather(*tasks)
+    times = sorted(stats.connect_times) or [0.0]
+    return {
+        "connections": args.connections,
+        "connected": stats.connected,
+        "failed": stats.failed,
+        "holding": holding,
+        "closed_by_server": stats.closed,
+        "messages": stats.messages,
+        "pings": stats.pings,
+        "ramp_s": round(ramp, 2),
+        "connect_p50_ms": round(times[len(times) // 2] * 1000, 1),
+        "connect_p99_ms": round(times[int(len(times) * 0.99)] * 1000, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/api/v1/ws")
+    parser.add_argument("--token", required=True, help="access токен")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--rate", type=int, default=1000, help="соединений в секунду")
+    parser.add_argument("--duration", type=float, default=60, help="удержание, сек")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
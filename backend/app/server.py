@@ -0,0 +1,36 @@
+"""Запуск приложения в режиме нескольких воркеров uvicorn."""
+
+import os
+
+import uvicorn
+
+from core.config import settings
+
+
+def get_workers_count() -> int:
+    """Количество воркеров.
+
+    Берется из настройки `SERVER_WORKERS`, иначе равно количеству CPU,
+    доступных процессу (с учетом ограничений контейнера по cpuset).
+    """
+    if settings.SERVER_WORKERS:
+        return settings.SERVER_WORKERS
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+if __name__ == "__main__":
+    # Каждый воркер - отдельный процесс, который импортирует `main:app`
+    # и создает собственный движок БД в `lifespan`.
+    # При SIGTERM uvicorn перестает принимать соединения, дожидается
+    # текущих запросов (не дольше SERVER_GRACEFUL_SHUTDOWN_TIMEOUT)
+    # и только потом выполняет shutdown-часть `lifespan`.
+    uvicorn.run(
+        "main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=get_workers_count(),
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT,
+        ws_per_message_deflate=settings.SERVER_WS_PER_MESSAGE_DEFLATE,
+    )
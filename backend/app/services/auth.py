@@ -1,14 +1,23 @@
+from fastapi import HTTPException
+
 from core import exceptions
+from core.jobs import job_queue
 from repositories.user import UserRepository
-from schemas.auth import TokenUserData
+from schemas.auth import TokenUserData, ForgotPasswordSchema, ResetPasswordSchema
 from schemas.user import UserCreateSchema, UserCreateDBSchema, UserResponse
 from services.base import QueryService
+from services.helpers.audit import audit_log
+from services.helpers.auth_state import auth_state_buffer
 from services.helpers.security import (
     hash_pwd,
     verify_pwd,
+    claims_user,
     get_token_user,
     create_jwt_tokens,
+    now_utc,
+    verify_token,
 )
+from services.jobs import PASSWORD_RESET_EMAIL
 
 
 class AuthService(QueryService):
@@ -48,51 +57,107 @@ class AuthService(QueryService):
 
     async def authenticate_user_token(self, token):
         user = get_token_user(token, "refresh")
-        user_db = await UserRepository(self.session).find_one_or_none(
-            username=user.username
-        )
+        user_db = await UserRepository(self.session).find_one_or_none(id=user.id)
         if not user_db:
             raise exceptions.USER_EXCEPTION_WRONG_PARAMETER
-        return user
+        if user_db.is_deleted:
+            raise exceptions.USER_EXCEPTION_INACTIVE_USER
+        return user_db
 
-    async def login(self, form_data):
-        if form_data.grant_type == "refresh_token":
-            user = await AuthService(self.session).authenticate_user_token(
-                token=form_data.refresh_token
-            )
-            tokens = create_jwt_tokens(
-                user_data=TokenUserData.model_validate(user),
-                refresh_token=form_data.refresh_token,
-            )
-        else:
-            user = await AuthService(self.session).authenticate_user_pwd(
+    async def login(self, form_data, client_ip: str | None = None):
+        grant_type = form_data.grant_type or "password"
+        try:
+            if grant_type == "refresh_token":
+                user = await AuthService(self.session).authenticate_user_token(
+                    token=form_data.refresh_token
+                )
+                tokens = create_jwt_tokens(
+                    user_data=TokenUserData.from_user(user),
+                    refresh_token=form_data.refresh_token,
+                )
+            else:
+                user = await AuthService(self.session).authenticate_user_pwd(
+                    username=form_data.username,
+                    password=form_data.password,
+                )
+                tokens = create_jwt_tokens(TokenUserData.from_user(user))
+        except HTTPException as e:
+            audit_log.record(
+                "login_failed",
+                ip=client_ip,
+                grant_type=grant_type,
                 username=form_data.username,
-                password=form_data.password,
+                reason=e.detail,
             )
-            tokens = create_jwt_tokens(TokenUserData.model_validate(user.to_dict()))
+            raise
         if not user:
             raise exceptions.CREDENTIALS_EXCEPTION_USER_DB
+        if auth_state_buffer.running:
+            auth_state_buffer.put(user.id, tokens.refresh_token, now_utc())
+            audit_log.record(
+                "login", user.id, user.id, client_ip, grant_type=grant_type
+            )
+            return tokens
         _obj = await UserRepository(self.session).edit_one(
-            user.id, {"refresh_token": tokens.refresh_token}
+            user.id,
+            {"refresh_token": tokens.refresh_token, "last_login": now_utc()},
+            bump_version=False,
         )
         if not _obj:
             raise exceptions.CREDENTIALS_EXCEPTION_LOGIN
         await self.session.commit()
+        audit_log.record("login", user.id, user.id, client_ip, grant_type=grant_type)
         return tokens
 
-    async def logout(self, token):
-        user_token = get_token_user(token)
+    async def logout(self, token, client_ip: str | None = None):
+        if not auth_state_buffer.running:
+            return await self._logout(token, client_ip)
+        # вход из буфера не должен записаться поверх выхода
+        async with auth_state_buffer.lock:
+            return await self._logout(token, client_ip)
 
-        user_db = await UserRepository(self.session).find_one_or_none(
-            username=user_token.username
-        )
+    async def _logout(self, token, client_ip: str | None = None):
+        user_token = get_token_user(token)
 
-        if not user_db or not user_db.refresh_token:
+        user_db = await UserRepository(self.session).find_one_or_none(id=user_token.id)
+        if not user_db:
             raise exceptions.CREDENTIALS_EXCEPTION_USER_DB
+        auth_state_buffer.pop(user_db.id)
+        # `last_logout` пишется, даже если refresh токена нет ни в БД, ни в буфере
+        # этого процесса: вход мог остаться в буфере другого воркера, и его запись
+        # пропустит строку с более поздним `last_logout`
         _obj = await UserRepository(self.session).edit_one(
-            user_db.id, {"refresh_token": None}
+            user_db.id,
+            {"refresh_token": None, "last_logout": now_utc()},
+            bump_version=False,
         )
         if not _obj:
             raise exceptions.CREDENTIALS_EXCEPTION_LOGOUT
         await self.session.commit()
+        audit_log.record("logout", user_db.id, user_db.id, client_ip)
         return {"detail": "Logout successful"}
+
+    async def forgot_password(self, form: ForgotPasswordSchema):
+        user = await UserRepository(self.session).find_one_or_none(email=form.email)
+        if user and not user.is_deleted:
+            # письмо отправит очередь задач после коммита
+            job_queue.enqueue(self.session, PASSWORD_RESET_EMAIL, {"user_id": user.id})
+            await self.session.commit()
+        # ответ не зависит от того, зарегистрирован ли адрес
+        return {"detail": "If the email is registered, a reset link has been sent"}
+
+    async def reset_password(self, form: ResetPasswordSchema):
+        claims = verify_token(form.token, "reset")
+        user_token = claims_user(claims)
+        version = claims.get("v")
+        if version is None:
+            raise exceptions.CREDENTIALS_EXCEPTION_RESET
+        _obj = await UserRepository(self.session).edit_one(
+            user_token.id,
+            {"hashed_password": hash_pwd(form.password), "refresh_token": None},
+            version,
+        )
+        if not _obj:
+            raise exceptions.CREDENTIALS_EXCEPTION_RESET
+        await self.session.commit()
+        return {"detail": "Password has been reset"}
@@ -0,0 +1,145 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+
+from loguru import logger
+
+from core.metrics import metrics
+from core.session_manager import db_manager
+from repositories.audit import AuditRepository
+
+
+class AuditLog:
+    """Асинхронный журнал аудита.
+
+    `record` только добавляет событие в кольцевой буфер процесса, запись в БД
+    на горячем пути не выполняется. Фоновая задача раз в `interval` секунд
+    (или при накоплении `batch_size` событий) записывает буфер многострочными
+    INSERT по `batch_size` строк.
+
+    Буфер ограничен `max_size` событиями: при переполнении вытесняется самое
+    старое, вытесненные считаются в `dropped` и `audit_dropped_total`.
+    """
+
+    def __init__(
+        self, max_size: int = 10000, batch_size: int = 500, interval: float = 1.0
+    ) -> None:
+        self.batch_size = batch_size
+        self.interval = interval
+        self.enabled = True
+        self.dropped = 0
+        self._buffer: deque[dict] = deque(maxlen=max_size)
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def max_size(self) -> int:
+        return self._buffer.maxlen
+
+    @max_size.setter
+    def max_size(self, value: int) -> None:
+        self._buffer = deque(self._buffer, maxlen=value)
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def _drop(self, count: int, reason: str) -> None:
+        self.dropped += count
+        metrics.inc("audit_dropped_total", count, reason=reason)
+
+    def record(
+        self,
+        action: str,
+        actor_id: int | None = None,
+        target_id: int | None = None,
+        ip: str | None = None,
+        **data,
+    ) -> None:
+        """Добавляет событие в буфер.
+
+        Args:
+            action: Действие (`login`, `user_update`, ...),
+            actor_id: Кто выполнил действие,
+            target_id: Над кем,
+            ip: Адрес клиента,
+            **data: Подробности события (None не сохраняется).
+        """
+        if not self.enabled:
+            return
+        data = {key: value for key, value in data.items() if value is not None}
+        if len(self._buffer) == self._buffer.maxlen:
+            self._drop(1, "overflow")
+        self._buffer.append(
+            {
+                "action": action,
+                "actor_id": actor_id,
+                "target_id": target_id,
+                "ip": ip,
+                "data": data or None,
+                "created_at": datetime.now(timezone.utc),
+            }
+        )
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Записывает буфер. Возвращает число записанных событий."""
+        written = 0
+        async with self._lock:
+            while self._buffer:
+                batch = [
+                    self._buffer.popleft()
+                    for _ in range(min(self.batch_size, len(self._buffer)))
+                ]
+                try:
+                    async with db_manager.session() as session:
+                        await AuditRepository(session).add_batch(batch)
+                        await session.commit()
+                except Exception:
+                    # вернуть в начало буфера, сколько поместится
+                    free = self._buffer.maxlen - len(self._buffer)
+                    kept = batch[len(batch) - free :] if free else []
+                    self._buffer.extendleft(reversed(kept))
+                    if len(kept) < len(batch):
+                        self._drop(len(batch) - len(kept), "error")
+                    raise
+                written += len(batch)
+                metrics.inc("audit_written_total", len(batch))
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Audit flush failed {}", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="audit-log")
+
+    async def stop(self) -> None:
+        """Останавливает фоновую запись и записывает остаток буфера."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(
+                "Audit flush on shutdown failed, {} events lost: {}", len(self), e
+            )
+
+
+audit_log = AuditLog()
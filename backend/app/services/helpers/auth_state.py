@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime
+
+from loguru import logger
+from sqlalchemy import case, or_, update
+
+from core.metrics import metrics
+from core.session_manager import db_manager
+from models.user import User
+
+
+class AuthStateBuffer:
+    """Отложенная запись состояния аутентификации (write-behind).
+
+    Вместо UPDATE и commit на каждый вход `refresh_token` и `last_login`
+    копятся в памяти (последнее значение на пользователя) и записываются
+    одним UPDATE с `CASE` раз в `interval` секунд или при накоплении
+    `batch_size` пользователей.
+
+    Порядок относительно выхода:
+    - `lock` удерживается на время записи пачки; выход берет тот же lock
+      и убирает отложенную запись пользователя, поэтому его UPDATE
+      всегда выполняется после записи этого процесса;
+    - UPDATE пачки не перезаписывает строку, если `last_logout` позже
+      времени входа из буфера (выход прошел через другой воркер).
+    """
+
+    def __init__(self, interval: float = 0.5, batch_size: int = 500) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lock = asyncio.Lock()
+        self._pending: dict[int, dict] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def put(self, user_id: int, refresh_token: str, last_login: datetime) -> None:
+        """Добавляет вход пользователя в буфер."""
+        self._pending[user_id] = {
+            "refresh_token": refresh_token,
+            "last_login": last_login,
+        }
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def pop(self, user_id: int) -> dict | None:
+        """Убирает отложенную запись пользователя (вызывать под `lock`)."""
+        return self._pending.pop(user_id, None)
+
+    async def flush(self) -> int:
+        """Записывает накопленные изменения. Возвращает число пользователей."""
+        async with self.lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                for chunk in _chunks(list(batch.items()), self.batch_size):
+                    await self._write(dict(chunk))
+            except Exception:
+                # вернуть в буфер, не затирая более новые входы
+                for user_id, values in batch.items():
+                    self._pending.setdefault(user_id, values)
+                raise
+            metrics.inc("auth_state_flushed_total", len(batch))
+            return len(batch)
+
+    @staticmethod
+    async def _write(batch: dict[int, dict]) -> None:
+        tokens = {_id: values["refresh_token"] for _id, values in batch.items()}
+        logins = {_id: values["last_login"] for _id, values in batch.items()}
+        login_at = case(logins, value=User.id)
+        stmt = (
+            update(User)
+            .where(User.id.in_(batch))
+            .where(or_(User.last_logout.is_(None), User.last_logout < login_at))
+            # как `edit_one(..., bump_version=False)`: вход не меняет ETag
+            .values(
+                refresh_token=case(tokens, value=User.id),
+                last_login=login_at,
+                updated_at=User.updated_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        async with db_manager.session() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Auth state flush failed {}", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="auth-state-buffer")
+
+    async def stop(self) -> None:
+        """Останавливает фоновую запись и записывает остаток буфера."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+auth_state_buffer = AuthStateBuffer()
@@ -0,0 +1,32 @@
+import asyncio
+import smtplib
+from email.message import EmailMessage
+
+from core.config import settings
+
+
+def _send(message: EmailMessage) -> None:
+    with smtplib.SMTP(
+        settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT
+    ) as smtp:
+        if settings.SMTP_TLS:
+            smtp.starttls()
+        if settings.EMAIL_PASSWORD:
+            smtp.login(settings.EMAIL_FROM, settings.EMAIL_PASSWORD)
+        smtp.send_message(message)
+
+
+async def send_email(to: str, subject: str, body: str) -> None:
+    """Отправляет письмо через SMTP в отдельном потоке.
+
+    Args:
+        to: Адрес получателя,
+        subject: Тема,
+        body: Текст письма.
+    """
+    message = EmailMessage()
+    message["From"] = settings.EMAIL_FROM
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    await asyncio.to_thread(_send, message)
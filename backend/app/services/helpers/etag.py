@@ -0,0 +1,74 @@
+import hashlib
+
+from fastapi import Response, status
+
+from core import exceptions
+from core.config import settings
+
+
+def entity_etag(_id: int, version: int) -> str:
+    """Слабый ETag объекта с `VersionColumn`: `W/"<id>.<version>"`."""
+    return f'W/"{_id}.{version}"'
+
+
+def list_etag(state: dict, **params) -> str:
+    """Слабый ETag списка.
+
+    Args:
+        state: Состояние набора объектов (`SQLAlchemyRepository.find_state`),
+        **params: Фильтры и параметры страницы.
+    """
+    digest = hashlib.blake2b(
+        repr((sorted(params.items()), sorted(state.items()))).encode(),
+        digest_size=12,
+    )
+    return f'W/"{digest.hexdigest()}"'
+
+
+def cache_headers(route: str) -> dict[str, str]:
+    """Заголовок `Cache-Control` маршрута из `HTTP_CACHE_CONTROL`."""
+    value = settings.HTTP_CACHE_CONTROL.get(route, settings.HTTP_CACHE_CONTROL_DEFAULT)
+    return {"Cache-Control": value} if value else {}
+
+
+def _opaque_tags(header: str) -> list[str]:
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """Слабое сравнение ETag с заголовком `If-None-Match`."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in _opaque_tags(header)
+
+
+def if_match_version(header: str | None, _id: int) -> int | None:
+    """Ожидаемая версия объекта из заголовка `If-Match`.
+
+    Args:
+        header: Значение `If-Match`,
+        _id: Идентификатор изменяемого объекта.
+
+    Returns:
+        Версия или None, если заголовок не передан или равен `*`.
+
+    Raises:
+        HTTPException: 412, если ни один ETag не относится к объекту.
+    """
+    if header is None or header.strip() == "*":
+        return None
+    for tag in _opaque_tags(header):
+        obj_id, _, version = tag.strip('"').partition(".")
+        if obj_id == str(_id) and version.isdigit():
+            return int(version)
+    raise exceptions.EXCEPTION_PRECONDITION_FAILED
+
+
+def not_modified(etag: str, headers: dict | None = None) -> Response:
+    """Ответ 304 без тела."""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={**(headers or {}), "ETag": etag},
+    )
@@ -0,0 +1,80 @@
+import time
+
+from core.metrics import metrics
+from core.session_manager import db_manager
+from repositories.role import RoleRepository
+
+# поля пользователя, от которых зависят его права
+_USER_FIELDS = ("is_superuser", "is_deleted")
+
+
+class PermissionCache:
+    """Кэш действующих прав пользователей (битовая маска на пользователя).
+
+    Промах - один запрос к основной БД (`RoleRepository.find_user_permissions`),
+    попадание - поиск в словаре. Записи сбрасываются:
+    - сразу в процессе, изменившем роли (`invalidate` после коммита);
+    - в остальных воркерах - по событиям outbox (`on_outbox_events`);
+    - в любом случае не позже чем через `ttl` секунд.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_size: int = 100_000) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: dict[int, tuple[int, float]] = {}
+        # меняется при сбросе: загрузка, начатая до сброса, не кэшируется
+        self._generation = 0
+
+    def get(self, user_id: int) -> int | None:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    async def permissions(self, user_id: int) -> int:
+        """Права пользователя из кэша или из БД."""
+        granted = self.get(user_id)
+        if granted is not None:
+            metrics.inc("permission_cache_total", result="hit")
+            return granted
+        metrics.inc("permission_cache_total", result="miss")
+        generation = self._generation
+        async with db_manager.session() as session:
+            granted = await RoleRepository(session).find_user_permissions(user_id)
+        if generation == self._generation:
+            if len(self._entries) >= self.max_size:
+                # самая старая запись (порядок вставки)
+                self._entries.pop(next(iter(self._entries)))
+            self._entries.pop(user_id, None)
+            self._entries[user_id] = (granted, time.monotonic() + self.ttl)
+        return granted
+
+    def invalidate(self, *user_ids: int) -> None:
+        """Сбрасывает права пользователей, без аргументов - всех."""
+        self._generation += 1
+        if not user_ids:
+            self._entries.clear()
+        for user_id in user_ids:
+            self._entries.pop(user_id, None)
+
+    def on_outbox_events(self, events: list[dict]) -> None:
+        """Подписчик `outbox_relay`: изменения ролей из любого воркера."""
+        user_ids = []
+        for event in events:
+            entity = event["entity"]
+            if entity == "role" and event["action"] != "created":
+                self.invalidate()
+                return
+            if entity == "user_role" or (
+                entity == "user"
+                and (
+                    event["action"] == "deleted"
+                    or any(name in event["data"] for name in _USER_FIELDS)
+                )
+            ):
+                user_ids.append(event["entity_id"])
+        if user_ids:
+            self.invalidate(*user_ids)
+
+
+permission_cache = PermissionCache()
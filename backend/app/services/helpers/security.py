@@ -24,6 +24,10 @@ class CustomOAuth2PasswordBearer(OAuth2PasswordBearer):
 
 
 oauth2_scheme = CustomOAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
+# для WebSocket: браузер не может передать заголовок, токен тогда в подпротоколе
+oauth2_scheme_optional = CustomOAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/auth/token", auto_error=False
+)
 
 
 class OAuth2PasswordAndRefreshRequestForm(OAuth2PasswordRequestForm):
@@ -67,14 +71,60 @@ def verify_pwd(plain_pwd: str, hashed_pwd: str) -> bool:
     return bcrypt.checkpw(*to_bits(plain_pwd, hashed_pwd))
 
 
+# Claims токена, версия 2 (`cv`): `sub` - id пользователя (строка),
+# `t` - тип токена, `f` - флаги `TokenUserData`, `exp` - срок действия.
+# Токены версии 1 (`id`, `username`, `is_superuser`, `is_deleted`, `token_type`)
+# принимаются до истечения срока выданных refresh токенов.
+CLAIMS_VERSION = 2
+TOKEN_TYPES = {"access": "a", "refresh": "r", "reset": "p"}
+TOKEN_TYPE_NAMES = {code: name for name, code in TOKEN_TYPES.items()}
+
+
 def encode_token(data: dict) -> str:
-    return jwt.encode(data, settings.SECRET_KEY, settings.ALGORITHM)
+    # без заголовка `typ`: он не проверяется и только удлиняет токен
+    return jwt.encode(
+        data, settings.SECRET_KEY, settings.ALGORITHM, headers={"typ": None}
+    )
 
 
 def decode_token(data) -> dict:
     return jwt.decode(data, settings.SECRET_KEY, [settings.ALGORITHM])
 
 
+def token_claims(user: TokenUserData, token_type: str) -> dict:
+    """Claims токена `token_type` (access, refresh или reset) для пользователя."""
+    return {
+        "sub": str(user.id),
+        "t": TOKEN_TYPES[token_type],
+        "f": user.flags,
+        "cv": CLAIMS_VERSION,
+    }
+
+
+def claims_token_type(claims: dict) -> str | None:
+    if claims.get("cv") == CLAIMS_VERSION:
+        return TOKEN_TYPE_NAMES.get(claims.get("t"))
+    return claims.get("token_type")
+
+
+def claims_user(claims: dict) -> TokenUserData:
+    """Пользователь из claims любой поддерживаемой версии.
+
+    Raises:
+        CredentialsException: Если в claims нет пользователя.
+    """
+    try:
+        if claims.get("cv") == CLAIMS_VERSION:
+            return TokenUserData.from_flags(int(claims["sub"]), claims.get("f", 0))
+        return TokenUserData(
+            int(claims["id"]),
+            bool(claims.get("is_superuser", False)),
+            bool(claims.get("is_deleted", False)),
+        )
+    except (KeyError, TypeError, ValueError):
+        raise exceptions.CREDENTIALS_EXCEPTION_USER
+
+
 def create_token(data: dict, delta: timedelta) -> str:
     """Создает JWT токен.
     Args:
@@ -103,62 +153,59 @@ def create_jwt_tokens(
         `TokenResponse`.
     """
     access_token = create_token(
-        {**user_data.model_dump(), "token_type": "access"},
+        token_claims(user_data, "access"),
         timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
     if not refresh_token:
         refresh_token: str = create_token(
-            {**user_data.model_dump(), "token_type": "refresh"},
+            token_claims(user_data, "refresh"),
             timedelta(hours=settings.REFRESH_TOKEN_EXPIRE_HOURS),
         )
     return TokenResponse(access_token=access_token, refresh_token=refresh_token)
 
 
-def verify_token(token: str, token_type: str | None) -> TokenUserData:
+def verify_token(token: str, token_type: str | None) -> dict:
     """Проверяет токен на валидность.
     Если есть нет типа токена, то тип не проверяется.
     Args:
         token: Закодированный токен,
-        token_type: Тип токена (access или refresh).
+        token_type: Тип токена (access, refresh или reset).
 
     Returns:
-        TokenUserData: Схема данных о пользователе.
+        Проверенные claims токена.
 
     Raises:
         CredentialsException: Если токен недействителен.
     """
     try:
         payload = decode_token(token)
-        if token_type:
-            payload_token_type: str = payload.get("token_type")
-            if not payload_token_type or payload_token_type != token_type:
-                raise exceptions.CREDENTIALS_EXCEPTION_TYPE
-        user = TokenUserData(**payload)
-        if user is None:
-            raise exceptions.CREDENTIALS_EXCEPTION_USER
-        token_expiration: int = payload.get("exp", 0)
-        if token_expiration < now_utc().timestamp():
-            raise exceptions.CREDENTIALS_EXCEPTION_EXPIRED
-
-        return user
+    except jwt.ExpiredSignatureError:
+        raise exceptions.CREDENTIALS_EXCEPTION_EXPIRED
     except jwt.PyJWTError:
         raise exceptions.CREDENTIALS_EXCEPTION_INVALID
+    payload_token_type = claims_token_type(payload)
+    if token_type:
+        if payload_token_type != token_type:
+            raise exceptions.CREDENTIALS_EXCEPTION_TYPE
+    elif payload_token_type == "reset":
+        # ссылка сброса пароля не заменяет access токен
+        raise exceptions.CREDENTIALS_EXCEPTION_TYPE
+    return payload
 
 
 def get_token_user(token, token_type: str | None = None) -> TokenUserData:
     """Возвращает данные пользователя из токена.
 
+    Токен декодируется и проверяется один раз.
+
     Args:
         token: Закодированный токен.
-        token_type: Тип токена (access или refresh).
+        token_type: Тип токена (access, refresh или reset).
 
     Returns:
-        TokenUserData: Схема данных о пользователе.
+        TokenUserData: Данные о пользователе.
 
     Raises:
         CredentialsException: Если токен недействителен.
     """
-    if verify_token(token, token_type):
-        payload = decode_token(token)
-        user = TokenUserData(**payload)
-        return user
+    return claims_user(verify_token(token, token_type))
@@ -0,0 +1,37 @@
+"""Обработчики фоновых задач (`core.jobs.job_queue`)."""
+
+from datetime import timedelta
+
+from core.config import settings
+from core.jobs import job_queue
+from core.session_manager import db_manager
+from repositories.user import UserRepository
+from schemas.auth import TokenUserData
+from services.helpers.email import send_email
+from services.helpers.security import create_token, token_claims
+
+PASSWORD_RESET_EMAIL = "password_reset_email"
+
+
+@job_queue.handler(PASSWORD_RESET_EMAIL)
+async def password_reset_email(payload: dict) -> None:
+    """Письмо со ссылкой для сброса пароля.
+
+    Токен создается при отправке и содержит версию пользователя,
+    поэтому после смены пароля ссылка перестает действовать.
+    """
+    async with db_manager.session() as session:
+        user = await UserRepository(session).find_one_or_none(id=payload["user_id"])
+    if not user or not user.email or user.is_deleted:
+        return
+    token = create_token(
+        {**token_claims(TokenUserData.from_user(user), "reset"), "v": user.version},
+        timedelta(minutes=settings.FORGET_PASSWORD_LINK_EXPIRE_MINUTES),
+    )
+    await send_email(
+        user.email,
+        "Password reset",
+        "To reset your password follow the link "
+        f"(valid for {settings.FORGET_PASSWORD_LINK_EXPIRE_MINUTES} minutes):\n"
+        f"{settings.FORGET_PASSWORD_LINK.format(token=token)}\n",
+    )
@@ -0,0 +1,199 @@
+"""Очистка удаленных (`is_deleted`) пользователей и файлов аватаров.
+
+Строки старше срока хранения удаляются порциями по возрастанию `id`
+(или переносятся в `user_archive`): на порцию одна короткая транзакция,
+в которой сохраняется и позиция в `checkpoint`, поэтому прерванный
+проход продолжается с места остановки. Между порциями - пауза.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from loguru import logger
+
+from core.config import BASE_DIR
+from core.metrics import metrics
+from core.session_manager import db_manager
+from repositories.checkpoint import CheckpointRepository
+from repositories.user import UserRepository
+
+UPLOADS_DIR = BASE_DIR / "uploads"
+
+
+def _list_files(directory: Path, modified_before: float) -> list[str]:
+    if not directory.is_dir():
+        return []
+    with os.scandir(directory) as entries:
+        return [
+            entry.name
+            for entry in entries
+            if entry.is_file() and entry.stat().st_mtime < modified_before
+        ]
+
+
+def _remove_files(paths: list[Path]) -> int:
+    removed = 0
+    for path in paths:
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Cannot remove {}: {}", path, e)
+    return removed
+
+
+class UserPurge:
+    """Проход очистки; `start` запускает его раз в `interval` секунд.
+
+    Проход выполняет один процесс: аренда в `checkpoint` (`lease` секунд,
+    продлевается с каждой порцией) не дает запустить его параллельно.
+    """
+
+    name = "user_purge"
+    lease = 300.0
+
+    def __init__(
+        self,
+        mode: str = "archive",
+        retention_days: int = 30,
+        batch_size: int = 200,
+        sleep: float = 0.2,
+        interval: float = 3600.0,
+        file_grace: float = 3600.0,
+        uploads_dir: Path = UPLOADS_DIR,
+    ) -> None:
+        self.mode = mode
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.sleep = sleep
+        self.interval = interval
+        self.file_grace = file_grace
+        self.uploads_dir = uploads_dir
+        self._task: asyncio.Task | None = None
+
+    async def run(self, scheduled: bool = False) -> dict | None:
+        """Выполняет (или продолжает) проход очистки.
+
+        Args:
+            scheduled: Пропустить, если проход завершился меньше `interval` назад.
+
+        Returns:
+            Статистика прохода или None, если проход выполняет другой процесс.
+        """
+        now = datetime.now(timezone.utc)
+        finished_before = now - timedelta(seconds=self.interval) if scheduled else None
+        async with db_manager.session() as session:
+            checkpoint = await CheckpointRepository(session).acquire(
+                self.name, self.lease, finished_before
+            )
+            if checkpoint is None:
+                return None
+            if checkpoint.finished_at is not None:
+                await CheckpointRepository(session).restart(self.name)
+                position = 0
+            else:
+                position = checkpoint.position
+            await session.commit()
+        try:
+            stats = await self._purge(position, now)
+            stats["files"] += await self.remove_orphaned_files()
+        except BaseException:
+            async with db_manager.session() as session:
+                await CheckpointRepository(session).release(self.name)
+                await session.commit()
+            raise
+        async with db_manager.session() as session:
+            await CheckpointRepository(session).finish(self.name)
+            await session.commit()
+        logger.info("User purge finished: {}", stats)
+        return stats
+
+    async def _purge(self, position: int, now: datetime) -> dict:
+        deleted_before = now - timedelta(days=self.retention_days)
+        archive = self.mode == "archive"
+        stats = {"users": 0, "files": 0, "resumed_from": position}
+        while True:
+            async with db_manager.session() as session:
+                repository = UserRepository(session)
+                ids = await repository.find_purgeable(
+                    position, deleted_before, self.batch_size
+                )
+                if not ids:
+                    return stats
+                rows = await repository.purge(list(ids), deleted_before, archive)
+                position = ids[-1]
+                await CheckpointRepository(session).advance(
+                    self.name, position, len(rows), self.lease
+                )
+                await session.commit()
+            # файлы удаляются после коммита: откат не оставит строк без аватаров
+            images = [self.uploads_dir / row.image for row in rows if row.image]
+            stats["users"] += len(rows)
+            stats["files"] += await asyncio.to_thread(_remove_files, images)
+            metrics.inc("user_purge_total", len(rows), mode=self.mode)
+            await asyncio.sleep(self.sleep)
+
+    async def orphaned_files(self) -> list[Path]:
+        """Файлы из `uploads`, на которые не ссылается ни один пользователь.
+
+        Файлы моложе `file_grace` не учитываются: загрузка могла еще не закоммититься.
+        """
+        candidates = await asyncio.to_thread(
+            _list_files, self.uploads_dir, time.time() - self.file_grace
+        )
+        orphans = []
+        for start in range(0, len(candidates), self.batch_size):
+            names = candidates[start : start + self.batch_size]
+            async with db_manager.session() as session:
+                existing = await UserRepository(session).find_existing_images(names)
+            orphans.extend(
+                self.uploads_dir / name for name in names if name not in existing
+            )
+        return orphans
+
+    async def remove_orphaned_files(self) -> int:
+        removed = await asyncio.to_thread(_remove_files, await self.orphaned_files())
+        if removed:
+            metrics.inc("user_purge_files_total", removed)
+        return removed
+
+    async def preview(self) -> dict:
+        """Что удалит проход сейчас, без изменений (`--dry-run`)."""
+        deleted_before = datetime.now(timezone.utc) - timedelta(
+            days=self.retention_days
+        )
+        users, position = 0, 0
+        async with db_manager.session() as session:
+            repository = UserRepository(session)
+            while ids := await repository.find_purgeable(
+                position, deleted_before, self.batch_size
+            ):
+                users += len(ids)
+                position = ids[-1]
+        return {"users": users, "files": len(await self.orphaned_files())}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run(scheduled=True)
+            except Exception as e:
+                logger.error("User purge failed {}", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="user-purge")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+user_purge = UserPurge()
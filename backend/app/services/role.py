@@ -0,0 +1,73 @@
+from sqlalchemy.exc import IntegrityError
+
+from core import exceptions
+from repositories.role import RoleRepository
+from repositories.user import UserRepository
+from schemas.role import RoleCreateSchema, RoleUpdateSchema
+from services.base import QueryService
+from services.helpers.permissions import permission_cache
+
+
+class RoleService(QueryService):
+    """Роли и их назначения; после коммита сбрасывает кэш прав процесса."""
+
+    repository: RoleRepository
+
+    async def find_all(self):
+        return await RoleRepository(self.session).find_all()
+
+    async def _find_role(self, role_id: int):
+        role = await RoleRepository(self.session).find_one_or_none(id=role_id)
+        if role is None:
+            raise exceptions.ROLE_EXCEPTION_NOT_FOUND
+        return role
+
+    async def _commit(self) -> None:
+        try:
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise exceptions.ROLE_EXCEPTION_CONFLICT_NAME
+
+    async def create_one(self, form: RoleCreateSchema):
+        repository = RoleRepository(self.session)
+        if await repository.find_one_or_none(name=form.name):
+            raise exceptions.ROLE_EXCEPTION_CONFLICT_NAME
+        role = await repository.add_one(form.values())
+        await self._commit()
+        return role
+
+    async def edit_one(self, role_id: int, form: RoleUpdateSchema):
+        data = form.values()
+        if not data:
+            raise exceptions.USER_EXCEPTION_BATCH_EMPTY
+        await self._find_role(role_id)
+        role = await RoleRepository(self.session).edit_one(role_id, data)
+        await self._commit()
+        if "permissions" in data:
+            permission_cache.invalidate()
+        return role
+
+    async def delete_one(self, role_id: int):
+        await self._find_role(role_id)
+        repository = RoleRepository(self.session)
+        user_ids = await repository.delete_assignments(role_id)
+        await repository.delete_one(role_id)
+        await self.session.commit()
+        permission_cache.invalidate(*user_ids)
+        return {"detail": f"Deleted id={role_id}"}
+
+    async def assign(self, role_id: int, user_id: int) -> None:
+        """Назначает роль пользователю (повторное назначение ничего не меняет)."""
+        await self._find_role(role_id)
+        if not await UserRepository(self.session).find_one_or_none(id=user_id):
+            raise exceptions.USER_EXCEPTION_NOT_FOUND_USER
+        if await RoleRepository(self.session).assign(user_id, role_id):
+            await self.session.commit()
+            permission_cache.invalidate(user_id)
+
+    async def unassign(self, role_id: int, user_id: int) -> None:
+        await self._find_role(role_id)
+        if await RoleRepository(self.session).unassign(user_id, role_id):
+            await self.session.commit()
+            permission_cache.invalidate(user_id)
@@ -1,11 +1,31 @@
+import time
+from collections import Counter
+from contextlib import nullcontext
+from typing import AsyncIterator
+
 from core import exceptions
+from core.config import settings
+from core.outbox import event_to_dict, outbox_relay
+from repositories.outbox import OutboxRepository
 from repositories.user import UserRepository
 from schemas.auth import TokenUserData
 from schemas.base import IdResponse
+from schemas.outbox import ChangesResponse
 from schemas.page import PageResponse, PageInfoResponse, PagedParamsSchema
-from schemas.user import UserUpdateSchema, UserResponse, UserFilterSchema
+from schemas.user import (
+    UserBatchResponse,
+    UserBatchSelectSchema,
+    UserBatchUpdateSchema,
+    UserFilterSchema,
+    UserResponse,
+    UserUpdateSchema,
+)
 from services.base import QueryService
+from services.helpers.audit import audit_log
+from services.helpers.auth_state import auth_state_buffer
+from services.helpers.etag import entity_etag, list_etag
 from services.helpers.page import paginate
+from services.helpers.security import now_utc
 
 from services.helpers.upload import handle_file_upload
 
@@ -18,6 +38,7 @@ class UserService(QueryService):
         current_active_user: TokenUserData,
         update_form: UserUpdateSchema,
         image_file: str,
+        version: int | None = None,
     ):
         data = update_form.model_dump(exclude_none=True)
         if image_file:
@@ -32,10 +53,13 @@ class UserService(QueryService):
                 email=update_form.email
             ):
                 raise exceptions.USER_EXCEPTION_CONFLICT_EMAIL_SIGNUP
-        _obj = await UserRepository(self.session).edit_one(current_active_user.id, data)
-        if _obj:
-            await self.session.commit()
-            return UserResponse.model_validate(_obj)
+        _obj = await UserRepository(self.session).edit_one(
+            current_active_user.id, data, version
+        )
+        if not _obj:
+            raise exceptions.EXCEPTION_PRECONDITION_FAILED
+        await self.session.commit()
+        return _obj
 
     async def find_one(
         self,
@@ -46,46 +70,184 @@ class UserService(QueryService):
             return entity
         raise exceptions.USER_EXCEPTION_NOT_FOUND_USER
 
+    async def find_etag(self, user_id: int) -> str | None:
+        """ETag пользователя без загрузки всей строки."""
+        rows = await UserRepository(self.session).find_columns(
+            ("id", "version"), id=user_id
+        )
+        return entity_etag(rows[0]["id"], rows[0]["version"]) if rows else None
+
     async def edit_one(
         self,
         user_id: IdResponse,
         update_form: UserUpdateSchema,
+        version: int | None = None,
+        actor_id: int | None = None,
     ):
-        data = update_form.model_dump()
+        # поля, не переданные в форме, не затираются
+        data = update_form.model_dump(exclude_none=True)
         if update_form.email:
-            if await UserRepository(self.session).find_one(email=data["email"]):
+            if await UserRepository(self.session).find_one_or_none(
+                email=update_form.email
+            ):
                 raise exceptions.USER_EXCEPTION_CONFLICT_EMAIL_SIGNUP
 
         if not await UserRepository(self.session).find_one_or_none(id=user_id):
             raise exceptions.USER_EXCEPTION_NOT_FOUND_USER
 
-        _obj = await UserRepository(self.session).edit_one(user_id, data)
-        if _obj:
-            await self.session.commit()
-            return UserResponse.model_validate(_obj)
+        _obj = await UserRepository(self.session).edit_one(user_id, data, version)
+        if not _obj:
+            raise exceptions.EXCEPTION_PRECONDITION_FAILED
+        await self.session.commit()
+        audit_log.record(
+            "user_update",
+            actor_id,
+            user_id,
+            fields=sorted(data),
+        )
+        return _obj
 
-    async def delete_one(self, user_id: int):
+    async def delete_one(self, user_id: int, actor_id: int | None = None):
         if await UserRepository(self.session).find_one_or_none(id=user_id):
             _obj = await UserRepository(self.session).edit_one(
-                _id=user_id, data=dict(is_deleted=1)
+                _id=user_id, data=dict(is_deleted=1, deleted_at=now_utc())
             )
             if _obj:
                 await self.session.commit()
+                audit_log.record("user_delete", actor_id, user_id)
                 return {"detail": f"Deleted id={_obj.id}"}
 
         raise exceptions.USER_EXCEPTION_NOT_FOUND_USER
 
+    async def _batch_ids(
+        self, selector: UserBatchSelectSchema, **filters
+    ) -> AsyncIterator[list[int]]:
+        """Порции id по `USER_BATCH_CHUNK_SIZE`: из списка или по фильтру (keyset)."""
+        size = settings.USER_BATCH_CHUNK_SIZE
+        if selector.ids is not None:
+            ids = sorted(set(selector.ids))
+            for start in range(0, len(ids), size):
+                yield ids[start : start + size]
+            return
+        filters.update(selector.filter.model_dump(exclude_none=True))
+        after = 0
+        while ids := await UserRepository(self.session).find_ids(
+            after, size, **filters
+        ):
+            yield list(ids)
+            after = ids[-1]
+
+    async def _edit_batch(
+        self,
+        selector: UserBatchSelectSchema,
+        data: dict,
+        status: str,
+        revoke: bool = False,
+        audit: tuple[str, int | None, list[str] | None] | None = None,
+        **filters,
+    ) -> UserBatchResponse:
+        """Пакетное изменение: один UPDATE ... WHERE id IN (...) и коммит на порцию.
+
+        Args:
+            selector: Список id или фильтр,
+            data: Новые значения,
+            status: Результат для найденных id,
+            revoke: Убрать отложенные входы из `auth_state_buffer`,
+            audit: Действие, `actor_id` и измененные поля для журнала аудита
+                (событие на каждый найденный id),
+            **filters: Дополнительные условия выбора по фильтру.
+        """
+        results = []
+        async for ids in self._batch_ids(selector, **filters):
+            # как при выходе: вход из буфера не запишется поверх изменения
+            lock = (
+                auth_state_buffer.lock
+                if revoke and auth_state_buffer.running
+                else nullcontext()
+            )
+            async with lock:
+                objs = await UserRepository(self.session).edit_many(ids, data)
+                await self.session.commit()
+                if revoke:
+                    for _id in ids:
+                        auth_state_buffer.pop(_id)
+            found = {obj.id for obj in objs}
+            if audit:
+                action, actor_id, fields = audit
+                for _id in sorted(found):
+                    audit_log.record(action, actor_id, _id, fields=fields, batch=True)
+            results.extend(
+                {"id": _id, "status": status if _id in found else "not_found"}
+                for _id in ids
+            )
+        return UserBatchResponse(
+            summary=Counter(item["status"] for item in results), results=results
+        )
+
+    async def edit_many(
+        self, form: UserBatchUpdateSchema, actor_id: int | None = None
+    ) -> UserBatchResponse:
+        data = form.values()
+        fields = sorted(data)
+        if data.get("is_deleted"):
+            now = now_utc()
+            data.update(refresh_token=None, last_logout=now, deleted_at=now)
+        elif "is_deleted" in data:
+            data.update(deleted_at=None)
+        return await self._edit_batch(
+            form,
+            data,
+            "updated",
+            revoke=bool(data.get("is_deleted")),
+            audit=("user_update", actor_id, fields),
+        )
+
+    async def delete_many(
+        self, selector: UserBatchSelectSchema, actor_id: int | None = None
+    ) -> UserBatchResponse:
+        """Удаление (скрытие) пользователей с отзывом refresh токенов."""
+        now = now_utc()
+        data = {
+            "is_deleted": True,
+            "refresh_token": None,
+            "last_logout": now,
+            "deleted_at": now,
+        }
+        return await self._edit_batch(
+            selector,
+            data,
+            "deleted",
+            revoke=True,
+            audit=("user_delete", actor_id, None),
+            is_deleted=False,
+        )
+
+    async def list_state(
+        self,
+        limit_offset: PagedParamsSchema,
+        filter_schema: UserFilterSchema,
+    ) -> tuple[str, int]:
+        """ETag страницы списка и общее количество пользователей по фильтру."""
+        filters = filter_schema.model_dump(exclude_none=True)
+        state = await UserRepository(self.session).find_state(**filters)
+        etag = list_etag(
+            dict(state), **filters, **limit_offset.model_dump(exclude_none=True)
+        )
+        return etag, state["total"]
+
     async def find_all(
         self,
         limit_offset: PagedParamsSchema,
         filter_schema: UserFilterSchema,
+        total: int | None = None,
     ):
         filters = filter_schema.model_dump(exclude_none=True)
         limit_offset = limit_offset.model_dump(exclude_none=True)
         page_entities = await UserRepository(self.session).find_by_page(
             **limit_offset, **filters
         )
-        total = await UserRepository(self.session).count(**filters)
+        if total is None:
+            total = await UserRepository(self.session).count(**filters)
         pagination_info = paginate(**limit_offset, total=total)
         if not page_entities:
             raise exceptions.USER_EXCEPTION_NOT_FOUND_PAGE
@@ -93,3 +255,38 @@ class UserService(QueryService):
             page_info=PageInfoResponse(**pagination_info),
             page_data=[UserResponse.model_validate(entity) for entity in page_entities],
         )
+
+    async def find_changes(
+        self, since: int, limit: int, timeout: float = 0
+    ) -> ChangesResponse:
+        """События изменений пользователей после `since` (long-poll).
+
+        Args:
+            since: Последний полученный `seq`,
+            limit: Максимальное количество событий,
+            timeout: Сколько ждать новых событий, если их нет.
+        """
+        repository = OutboxRepository(self.session)
+        deadline = time.monotonic() + timeout
+        while True:
+            # позиция релея до запроса: событие после нее разбудит ожидание.
+            # Она же граница видимости: события после нее могут стоять за
+            # пропуском `id`, который еще закоммитится
+            published = outbox_relay.last_seq
+            events = await repository.find_since(
+                "user",
+                since,
+                limit,
+                until=published if outbox_relay.running else None,
+            )
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                break
+            # соединение не удерживается на время ожидания
+            await self.session.rollback()
+            if not await outbox_relay.wait(published, remaining):
+                break
+        return ChangesResponse(
+            events=[event_to_dict(event) for event in events],
+            last_seq=events[-1].id if events else since,
+        )